@@ -19,6 +19,7 @@
 import os
 import stat
 import subprocess
+import sys
 
 from jupyter_core.paths import jupyter_data_dir
 
@@ -80,3 +81,8 @@
 # the environment
 if "NB_UMASK" in os.environ:
     os.umask(int(os.environ["NB_UMASK"], 8))
+
+# Env-checker extensions serving results of checks executed in the pod on /envchecker/metrics endpoint
+# queue of run.sh runs on /envchecker/runs endpoint and history of check results on /envchecker/history endpoint
+sys.path.append("/home/jovyan/utils")
+c.ServerApp.jpserver_extensions = {"metrics_extension": True, "runs_extension": True, "history_extension": True}
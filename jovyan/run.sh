@@ -8,8 +8,43 @@ reports=("pdf")
 overall_result=0
 pdf_reporting_enabled=true
 html_reporting_enabled=false
+# mode of HTML summary (static|paged), see utils/paged_html_report.py
+html_report_mode=static
 json_reporting_enabled=false
+# format of JSON report (json|ndjson|parquet), see utils/report_export.py
+json_report_format=json
+cell_profile_enabled=false
 clear_out=true
+phases_enabled=false
+checks_started=0
+k8s_cache_enabled=false
+resume_enabled=false
+# order of composite checks by their durations from previous runs (file|spt), see utils/check_history.py
+# and durations in utils/result_history.py
+check_order=file
+# append metrics of checks to local history of results, see utils/result_history.py
+history_enabled=${ENVCHECKER_HISTORY:-false}
+fail_fast=false
+# writes of output notebook during execution (every|end|interval:<seconds>|cells:<n>), see utils/papermill_autosave.py
+autosave_policy=""
+# strip heavy outputs of executed notebooks after PDF is created, see utils/output_slimming.py
+slim_enabled=false
+slim_images=drop
+# spans of run, checks, phases and notebook cells, exported by utils/tracing.py at the end of run
+tracing_enabled=false
+# budget of every notebook execution: RSS in MiB, CPU seconds and wall seconds, see utils/check_budget.py
+check_memory_mb=${ENVCHECKER_CHECK_MEMORY_MB:-}
+check_cpu_seconds=${ENVCHECKER_CHECK_CPU_SECONDS:-}
+check_timeout_seconds=${ENVCHECKER_CHECK_TIMEOUT_SECONDS:-}
+papermill_options=()
+# Sharded run: pods of Indexed Job execute their slices of composite, see utils/composite_sharding.py
+shards=${ENVCHECKER_SHARDS:-1}
+shard_index=${JOB_COMPLETION_INDEX:-0}
+sharded=false
+if ((shards > 1)); then
+    sharded=true
+fi
+shards_merged=false
 git_mode=false
 git_source=""    # DEPRECATED: For backward compatibility with --git=URL format
 relative_path="" # DEPRECATED: For backward compatibility
@@ -31,7 +66,7 @@ print_usage() {
     echo -e "     pass as --param=value on the command line"
     echo -e "     e.g. --namespace=my_ns --app=env-checker"
     echo -e "   \033[1mOptions (o-optional, m-mandatory):\033[0m"
-    echo -e "   \033[1m  -r 1m[s3|monitoring|pdf] (o)\033[0m  \033[36m# Upload results to corresponding services (comma-separated), e.g. -r s3,monitoring,pdf\033[0m"
+    echo -e "   \033[1m  -r 1m[s3|monitoring|metrics|pdf] (o)\033[0m \033[36m# Upload results to corresponding services (comma-separated), e.g. -r s3,monitoring,pdf\033[0m"
     echo -e "   \033[1m  -y 1m (o)\033[0m                  \033[36m# Run YAML configuration provided inline (file path is ignored)\033[0m"
     echo -e "   \033[1m  -j 1m (o)\033[0m                  \033[36m# Run JSON configuration provided inline (file path is ignored)\033[0m"
     echo -e "   \033[1m  -e 1m (o)\033[0m                  \033[36m# Execute a Python script that outputs YAML, then run that YAML\033[0m"
@@ -40,11 +75,34 @@ print_usage() {
     echo -e "   \033[1m  --git=URL 1m (o)\033[0m           \033[36m# DEPRECATED: Old method - fetch from Git URL specified in flag\033[0m"
     echo -e "   \033[1m  --pdf=false 1m (o)\033[0m         \033[36m# Disable PDF report generation\033[0m"
     echo -e "   \033[1m  --html=true 1m (o)\033[0m         \033[36m# Enable HTML summary generation from scrapbook data\033[0m"
+    echo -e "   \033[1m  --html_mode=paged 1m (o)\033[0m  \033[36m# Enable HTML summary rendered page by page in browser with filter and sorting, for very large reports\033[0m"
+    echo -e "   \033[1m  --json_format=ndjson 1m (o)\033[0m \033[36m# Stream JSON report rows as compact JSON lines (ndjson) or Parquet files (parquet) instead of pretty-printed JSON\033[0m"
+    echo -e "   \033[1m  --cell_profile=true 1m (o)\033[0m \033[36m# Generate report with the slowest notebook cells (HTML and JSON)\033[0m"
+    echo -e "   \033[1m  --phases=true 1m (o)\033[0m       \033[36m# Record per-check phase timings into result.yaml and print run summary\033[0m"
+    echo -e "   \033[1m  --k8s_cache=true 1m (o)\033[0m   \033[36m# Share point-in-time snapshots of Kubernetes objects (per namespace) between notebooks of the run\033[0m"
+    echo -e "   \033[1m  --resume=true 1m (o)\033[0m       \033[36m# Checkpoint composite checks, skip completed ones when the same run (ENVCHECKER_RUN_ID, required) is restarted\033[0m"
+    echo -e "   \033[1m  --order=spt 1m (o)\033[0m        \033[36m# Run composite checks shortest first by durations of previous runs, so failures are found earlier\033[0m"
+    echo -e "   \033[1m  --autosave=end 1m (o)\033[0m      \033[36m# Write output notebook once (end), every N seconds (interval:N) or cells (cells:N), not after every cell. Long running cell is still saved by --autosave_cell_every, except with end\033[0m"
+    echo -e "   \033[1m  --autosave_cell_every=N 1m (o)\033[0m \033[36m# Save long running cell output every N seconds (papermill --autosave-cell-every, 0 disables)\033[0m"
+    echo -e "   \033[1m  --slim=true 1m (o)\033[0m         \033[36m# Strip long streams, large images and widget state from executed notebooks before upload and reports\033[0m"
+    echo -e "   \033[1m  --slim_images=externalise 1m (o)\033[0m \033[36m# Save large images of slimmed notebooks to '<notebook>_files' folder instead of dropping (keep - leave as is)\033[0m"
+    echo -e "   \033[1m  --fail_fast=true 1m (o)\033[0m   \033[36m# Stop composite on the first failed check, checks are run shortest first by default\033[0m"
+    echo -e "   \033[1m  --tracing=true 1m (o)\033[0m     \033[36m# Export trace of run (checks, phases, cells) to OTEL_EXPORTER_OTLP_ENDPOINT and './out/traces.jsonl'\033[0m"
+    echo -e "   \033[1m  --history=true 1m (o)\033[0m     \033[36m# Append check results to local history for trend, flakiness and duration queries (ENVCHECKER_HISTORY)\033[0m"
+    echo -e "   \033[1m  --check_memory=MiB 1m (o)\033[0m \033[36m# Kill notebook kernel of a check when its RSS exceeds MiB, the check is failed (ENVCHECKER_CHECK_MEMORY_MB)\033[0m"
+    echo -e "   \033[1m  --check_cpu=N 1m (o)\033[0m      \033[36m# Kill notebook kernel of a check after N seconds of CPU time (ENVCHECKER_CHECK_CPU_SECONDS)\033[0m"
+    echo -e "   \033[1m  --check_timeout=N 1m (o)\033[0m  \033[36m# Kill notebook kernel of a check after N seconds of execution (ENVCHECKER_CHECK_TIMEOUT_SECONDS)\033[0m"
     echo -e "   \033[1mComposite YAML example:\033[0m"
     echo -e "     checks:"
     echo -e "       - path: /home/jovyan/tests/notebooks/test_notebook.ipynb"
     echo -e "         params:"
     echo -e "           namespace: my_namespace"
+    echo -e "       - path: /home/jovyan/tests/notebooks/test_notebook.ipynb"
+    echo -e "         matrix:                    \033[36m# executes notebook once per namespace in one kernel, one output notebook\033[0m"
+    echo -e "           namespace: [ns_1, ns_2]"
+    echo -e "       - path: /home/jovyan/tests/notebooks/test_notebook.ipynb"
+    echo -e "         cache_ttl: 12h             \033[36m# reuses result of the previous run within 12h, if notebook, params and fingerprint files are the same\033[0m"
+    echo -e "         cache_fingerprint: [/etc/cloud-passport/*]"
     echo -e "       - path: /home/jovyan/tests/CompositeUnitTestNotebook.ipynb"
     echo -e "         params:"
     echo -e "           report_name: CompositeUnitTestBulkNotebook"
@@ -54,23 +112,43 @@ print_usage() {
     echo -e "  \tExample: "
     echo -e "          -r s3,pdf: report results to s3 and pdf"
     echo -e "          -r s3: report results to s3 only. Reporting to PDF is disabled here"
+    echo -e "          -r metrics: keep results for /envchecker/metrics endpoint of env-checker pod instead of push to monitoring"
     echo -e "          -r '': disable all reports"
     echo -e ""
 }
 
+# Output folder of active run is marked with RUN_MARKER containing pid of run.sh (see prepareOutput).
+# Runs queued by utils/run_manager.py are executed concurrently, so they must not remove output of each other.
+RUN_MARKER=".run.pid"
+other_runs_active() {
+    local marker pid
+    while IFS= read -r marker; do
+        pid=$(cat "$marker" 2>/dev/null)
+        if [[ -n $pid && $pid != "$$" ]] && kill -0 "$pid" 2>/dev/null; then
+            return 0
+        fi
+    done < <(find /home/jovyan/out -maxdepth 4 -name "$RUN_MARKER" -not -path "*/.env-checker/*" 2>/dev/null)
+    return 1
+}
+
 prepareOutput() {
     if [ "$clear_out" = false ]; then
         return
     fi
 
     if [ -d "/home/jovyan/out" ]; then
-        find /home/jovyan/out -type d -empty -delete      # delete all empty catalogs in './out' folder
-        find /home/jovyan/out -maxdepth 1 -type f -delete # delete all files in './out' folder (except for non-empty subfolders)
-        if [ -f /home/jovyan/shells/remove_out_catalogs.sh ]; then
-            # shellcheck disable=SC1091
-            # shellcheck source=/home/jovyan/shells/remove_out_catalogs.sh
-            # deleting directories and subdirectories in the out folder for the last hour
-            source /home/jovyan/shells/remove_out_catalogs.sh
+        if other_runs_active; then
+            echo "Other runs are active, only output folder of this run is cleaned"
+        else
+            find /home/jovyan/out -type d -empty -delete      # delete all empty catalogs in './out' folder
+            find /home/jovyan/out -maxdepth 1 -type f -delete # delete all files in './out' folder (except for non-empty subfolders)
+            # other shards of the run can still be working in the same folder, so old folders are not removed by shards
+            if [ -f /home/jovyan/shells/remove_out_catalogs.sh ] && ! $sharded; then
+                # shellcheck disable=SC1091
+                # shellcheck source=/home/jovyan/shells/remove_out_catalogs.sh
+                # deleting directories and subdirectories in the out folder for the last hour
+                source /home/jovyan/shells/remove_out_catalogs.sh
+            fi
         fi
         if [[ -n $output_subfolder ]]; then
             rm -rf "/home/jovyan/out/$output_subfolder" # delete subfolder
@@ -79,6 +157,7 @@ prepareOutput() {
         mkdir -p /home/jovyan/out # recreate out folder
     fi
     mkdir -p "/home/jovyan/out/$output_subfolder" # create subfolder if '-o' flag was filled
+    echo "$$" >"/home/jovyan/out/$output_subfolder/$RUN_MARKER"
     composite_result_file_path="/home/jovyan/out/$output_subfolder/result.yaml"
     yq --null-input '{"checks": []}' >"$composite_result_file_path" # create result.yaml file with initial contents
 }
@@ -88,13 +167,152 @@ runComposite() {
     # get composite file content without any comments
     composite_file_content=$(yq -oy '... comments=""' "$1")
     checks_amount=$(echo "$composite_file_content" | yq -oy e '.checks | length')
+    if $resume_enabled; then
+        prepareCheckpoints
+    fi
 
-    for ((i = 0; i < checks_amount; i++)); do
+    if $sharded; then
+        if ! selected_indices=$(python /home/jovyan/utils/composite_sharding.py select "$1" "$shards" "$shard_index" "${ENVCHECKER_SHARD_STRATEGY:-hash}"); then
+            overall_result=1
+        fi
+        read -ra check_indices <<<"$selected_indices"
+        echo "shard $shard_index of $shards executes checks: ${check_indices[*]}"
+    else
+        read -ra check_indices <<<"$(seq -s ' ' 0 $((checks_amount - 1)))"
+    fi
+
+    orderChecks "$1"
+    # composite index is a field of check record, so result.yaml keeps composite order after reordering and merging
+    track_indices=$sharded
+    if [[ $check_order != "file" ]]; then
+        track_indices=true
+    fi
+    composite_started_at=$(date +%s%3N)
+
+    for i in "${check_indices[@]}"; do
+        composite_index_entry=""
+        if $track_indices; then
+            composite_index_entry=", \"composite_index\": $i"
+        fi
+        # checkpoint record keeps composite index of the check
+        if $resume_enabled && restoreCheckpoint "$i"; then
+            continue
+        fi
         notebook_path=$(calculate_composite_notebook_path)
         params="$(echo "$composite_file_content" | yq -oy e ".checks.[$i] | select(.params != null) | .params")"
         out="$(echo "$composite_file_content" | yq -oy e ".checks.[$i] | select(.out != null) | .out")"
-        runSingleNotebook "$notebook_path" "$params" "$out"
+        matrix="$(echo "$composite_file_content" | yq -oy e ".checks.[$i] | select(.matrix != null) | .matrix")"
+        if restoreMemo "$i"; then
+            continue
+        fi
+        if runSingleNotebook "$notebook_path" "$params" "$out" "$matrix"; then
+            if [[ -n $memo_key ]]; then
+                python /home/jovyan/utils/result_memo.py save "$memo_key" "$memo_ttl" "$composite_result_file_path" "$out_path"
+            fi
+            if $resume_enabled; then
+                python /home/jovyan/utils/checkpoints.py save "$checkpoint_dir" "$i" "$composite_result_file_path" "$out_path"
+            fi
+        fi
+        if $fail_fast && ((overall_result != 0)); then
+            echo "check $i failed, the rest of composite is skipped (--fail_fast=true)"
+            break
+        fi
     done
+
+    composite_duration=$(($(date +%s%3N) - composite_started_at))
+    if [[ -n $predicted_duration ]]; then
+        echo "composite duration: predicted $((predicted_duration / 1000))s, actual $((composite_duration / 1000))s"
+    fi
+    if $track_indices && ! $sharded; then
+        python /home/jovyan/utils/composite_sharding.py sort "$out_path"
+    fi
+
+    if $resume_enabled; then
+        # composite is completed, the next run with the same run id starts from scratch
+        rm -rf "$checkpoint_dir"
+    fi
+}
+
+# Reorders check_indices by durations of the checks in previous runs and predicts duration of the composite.
+# $1 - name and full path to composite .yaml file
+orderChecks() {
+    local ordered
+    predicted_duration=""
+    if $fail_fast && [[ $check_order == "file" ]]; then
+        # cheap checks go first, so a failure is found as soon as possible
+        check_order=spt
+    fi
+    if ((${#check_indices[@]} == 0)); then
+        return
+    fi
+    if ! ordered=$(python /home/jovyan/utils/result_history.py order "$1" "$check_order" "${check_indices[@]}"); then
+        check_order=file
+        return
+    fi
+    read -ra check_indices <<<"$(echo "$ordered" | sed -n 1p)"
+    predicted_duration=$(echo "$ordered" | sed -n 2p)
+    if [[ $check_order != "file" ]]; then
+        echo "checks are executed in order ($check_order): ${check_indices[*]}"
+    fi
+}
+
+# Reuses result of idempotent check executed within its 'cache_ttl' (composite field or notebook metadata),
+# see utils/result_memo.py. S3 report is not repeated. Metrics are pushed to monitoring again, so the check does not
+# look stale there, and keep 'last_run' of real execution.
+# $1 - index of check in composite
+restoreMemo() {
+    local cache_ttl cache_fingerprint memo_result restored_notebook_path
+    memo_key=""
+    memo_ttl=0
+    cache_ttl="$(echo "$composite_file_content" | yq -oy e ".checks.[$1] | select(.cache_ttl != null) | .cache_ttl")"
+    # notebook is not parsed, if it does not mention cache_ttl at all
+    if [[ -z $cache_ttl ]] && ! grep -qF '"cache_ttl"' "$notebook_path" 2>/dev/null; then
+        return 1
+    fi
+    cache_fingerprint="$(echo "$composite_file_content" | yq -oj -I0 e ".checks.[$1] | select(.cache_fingerprint != null) | .cache_fingerprint")"
+    read -r memo_ttl memo_key memo_result <<<"$(python /home/jovyan/utils/result_memo.py restore "$notebook_path" "$cache_ttl" "$params" "$matrix" "$cache_fingerprint" "$composite_result_file_path" "$out_path" "$($track_indices && echo "$1")")"
+    if [[ -z $memo_result ]]; then
+        return 1
+    fi
+    echo "check $1 is restored from cache (cache_ttl: ${memo_ttl}s), result: $memo_result"
+    restored_notebook_path=$(yq -oy '.checks[-1].outs[0] // ""' "$composite_result_file_path")
+    if [[ -f $restored_notebook_path ]]; then
+        # restored check has no phases of its own
+        phases_enabled=false reportToMonitoring "$restored_notebook_path"
+    fi
+    if [[ $memo_result != "True" ]]; then
+        overall_result=1
+    fi
+    return 0
+}
+
+# Checkpoints are kept in the state folder on output volume and are keyed by composite content (with output folder)
+# and run id. ENVCHECKER_RUN_ID is the same for all attempts of one Job (e.g. its name), so a restarted pod resumes.
+prepareCheckpoints() {
+    local checkpoints_root composite_hash
+    checkpoints_root="${ENVCHECKER_STATE_DIR:-/home/jovyan/out/.env-checker}/checkpoints"
+    composite_hash=$(printf '%s\n%s' "$composite_file_content" "$out_path" | sha256sum | cut -c1-16)
+    checkpoint_dir="$checkpoints_root/${composite_hash}_${ENVCHECKER_RUN_ID}"
+    python /home/jovyan/utils/checkpoints.py prune "$checkpoints_root"
+    mkdir -p "$checkpoint_dir"
+    echo "checkpoint folder: $checkpoint_dir"
+}
+
+# $1 - index of check in composite
+restoreCheckpoint() {
+    local restored_result
+    if [[ ! -f "$checkpoint_dir/check_$1/record.json" ]]; then
+        return 1
+    fi
+    restored_result=$(python /home/jovyan/utils/checkpoints.py restore "$checkpoint_dir" "$1" "$composite_result_file_path" "$out_path")
+    if [[ -z $restored_result ]]; then
+        return 1
+    fi
+    echo "check $1 is restored from checkpoint, result: $restored_result"
+    if [[ $restored_result != "True" ]]; then
+        overall_result=1
+    fi
+    return 0
 }
 
 calculate_composite_notebook_path() {
@@ -114,44 +332,41 @@ calculate_composite_notebook_path() {
 # $4 - namespace
 extract_notebook_execution_metrics() {
     report_name=$(basename -- "$1" | sed -nr 's/([a-zA-Z0-9_]+)_[0-9]+\.ipynb/\1/p' | awk '{print tolower($0)}')
-    # try to extract 'metrics' scrap from executed notebook
-    metrics=$(python -c "import nb_data_manipulation_utils as m; print(m.extract_metrics_from_nb_scraps('$1'))" 2>/dev/null || echo '{}')
-    if [ "$metrics" != '{}' ]; then
-        # if such scrap was extracted, validate its content with json schema
-        metrics_validation_res=$(python -c "import json_schema_validation as v; print(v.validate_app_metrics_schema('$metrics'))" 2>/dev/null || echo 1)
-        if [[ (-n $metrics_validation_res) && ($metrics_validation_res -eq 0) ]]; then
-            #if scrap structure is valid, check optional fields (report_app, initiator, start_time, duration) and, if they don't present, set them
-            if [[ "$3" != "null" ]]; then
-                # if 'initiator' was provided as shell parameter, use it to set 'initiator' field of all metrics
-                metrics=$(echo "$metrics" | initiator=$3 yq -oj '(.[].initiator)=env(initiator)')
-            else
-                # else check if 'initiator' label is present in all metrics from notebook. If not, set default 'envchecker' value
-                initiator_specified=$(echo "$metrics" | yq -oj '. | all_c(has("initiator"))')
-                if [[ "$initiator_specified" == "false" ]]; then
-                    metrics=$(echo "$metrics" | yq -oj '(.[].initiator)="envchecker"')
-                fi
+    # try to extract 'metrics' scrap from executed notebook and validate its content with json schema in one call.
+    # '{}' is returned if scrap is absent or invalid
+    metrics=$(python -c "import nb_data_manipulation_utils as m; m.extract_valid_metrics_from_nb_scraps('$1')" 2>/dev/null || echo '{}')
+    if [[ -n $metrics && "$metrics" != '{}' ]]; then
+        #if scrap structure is valid, check optional fields (report_app, initiator, start_time, duration) and, if they don't present, set them
+        if [[ "$3" != "null" ]]; then
+            # if 'initiator' was provided as shell parameter, use it to set 'initiator' field of all metrics
+            metrics=$(echo "$metrics" | initiator=$3 yq -oj '(.[].initiator)=env(initiator)')
+        else
+            # else check if 'initiator' label is present in all metrics from notebook. If not, set default 'envchecker' value
+            initiator_specified=$(echo "$metrics" | yq -oj '. | all_c(has("initiator"))')
+            if [[ "$initiator_specified" == "false" ]]; then
+                metrics=$(echo "$metrics" | yq -oj '(.[].initiator)="envchecker"')
             fi
+        fi
 
-            # if labels "report_app", "env", "scope" are not specified, set default value (null) for them
-            metrics=$(echo "$metrics" | yq -oj '(.[] | (select (. | has("report_app") | not)) .report_app) |= "null"' |
-                yq -oj '(.[] | (select (. | has("env") | not)) .env) |= "null"' |
-                yq -oj '(.[] | (select (. | has("scope") | not)) .scope) |= "null"')
+        # if labels "report_app", "env", "scope" are not specified, set default value (null) for them
+        metrics=$(echo "$metrics" | yq -oj '(.[] | (select (. | has("report_app") | not)) .report_app) |= "null"' |
+            yq -oj '(.[] | (select (. | has("env") | not)) .env) |= "null"' |
+            yq -oj '(.[] | (select (. | has("scope") | not)) .scope) |= "null"')
 
-            start_time_specified=$(echo "$metrics" | yq -oj '. | all_c(has("last_run"))')
-            if [[ "$start_time_specified" == "false" ]]; then
-                start_millis=$(date -d "$(yq '.metadata.papermill.start_time' "$1")" +'%s%3N')
-                metrics=$(echo "$metrics" | start_time=$start_millis yq -oj '(.[].last_run)=env(start_time)')
-            fi
+        start_time_specified=$(echo "$metrics" | yq -oj '. | all_c(has("last_run"))')
+        if [[ "$start_time_specified" == "false" ]]; then
+            start_millis=$(date -d "$(yq '.metadata.papermill.start_time' "$1")" +'%s%3N')
+            metrics=$(echo "$metrics" | start_time=$start_millis yq -oj '(.[].last_run)=env(start_time)')
+        fi
 
-            nb_exec_duration=$(yq -oj '.metadata.papermill.duration' "$1" | awk '{print int( $1 * 1000 )}')
-            metrics=$(echo "$metrics" | duration=$nb_exec_duration yq -oj '(.[] | (select (. | has("last_duration") | not)) .last_duration) |= env(duration)')
+        nb_exec_duration=$(yq -oj '.metadata.papermill.duration' "$1" | awk '{print int( $1 * 1000 )}')
+        metrics=$(echo "$metrics" | duration=$nb_exec_duration yq -oj '(.[] | (select (. | has("last_duration") | not)) .last_duration) |= env(duration)')
 
-            # make all labels string values be in lowercase
-            metrics=$(echo "$metrics" | yq -oj '(... | (select(tag=="!!str"))) |= downcase')
-            # add label 's3_link' with default 'null' value and 'report_name' label to each metric in list
-            echo "$metrics" | yq -oj ".[] += {\"s3_link\": \"null\", \"report_name\": \"$report_name\"}"
-            return 0
-        fi
+        # make all labels string values be in lowercase
+        metrics=$(echo "$metrics" | yq -oj '(... | (select(tag=="!!str"))) |= downcase')
+        # add label 's3_link' with default 'null' value and 'report_name' label to each metric in list
+        echo "$metrics" | yq -oj ".[] += {\"s3_link\": \"null\", \"report_name\": \"$report_name\"}"
+        return 0
     fi
 
     # if such scrap is not present in executed notebook, then determine metrics by papermill metadata
@@ -173,7 +388,47 @@ extract_notebook_execution_metrics() {
 # $1 - executed notebook path
 reportToS3() {
     if printf '%s\n' "${reports[@]}" | grep -Fqw 's3'; then
-        python -c "import infra.s3 as s3; s3.uploadReportsByExecutedNotebookPath('$1')"
+        phase_run s3 python -c "import infra.s3 as s3; s3.uploadReportsByExecutedNotebookPath('$1')"
+    fi
+}
+
+# Prints random span id (16 hex digits)
+new_span_id() {
+    od -An -N8 -tx1 /dev/urandom | tr -d ' \n'
+}
+
+# $1 - phase name
+# $2... - command, which is executed as a phase of current check.
+# If '--phases=true' is passed, its duration, peak RSS and amount of spawned processes are recorded to $phases_file
+phase_run() {
+    local phase=$1
+    shift
+    if $phases_enabled; then
+        python /home/jovyan/utils/phase_timing.py run "$phases_file" "$phase" -- "$@"
+    else
+        "$@"
+    fi
+}
+
+# Starts timing of a phase, which can not be run as a separate command (e.g. shell function).
+# Bash builtins are used only, so no extra processes are spawned
+phase_begin() {
+    if $phases_enabled; then
+        phase_started_at=${EPOCHREALTIME/./}
+        read -r _ _ _ _ phase_started_pid </proc/loadavg
+    fi
+}
+
+# $1 - phase name
+phase_end() {
+    if $phases_enabled; then
+        local finished_at=${EPOCHREALTIME/./}
+        local last_pid duration_us
+        read -r _ _ _ _ last_pid </proc/loadavg
+        duration_us=$((finished_at - phase_started_at))
+        mkdir -p "$(dirname "$phases_file")"
+        printf '{"phase": "%s", "start": %d, "duration_ms": %d.%03d, "peak_rss_kb": null, "processes": %d}\n' \
+            "$1" $((phase_started_at / 1000)) $((duration_us / 1000)) $((duration_us % 1000)) $((last_pid - phase_started_pid)) >>"$phases_file"
     fi
 }
 
@@ -196,16 +451,46 @@ runSingleNotebook() {
     fi
     echo "Executed with params: $params"
 
+    # parameters matrix of composite check, the notebook body is executed once per combination in the same kernel
+    matrix=""
+    if [[ -n $4 ]]; then
+        matrix="$4"
+        echo "Executed with matrix: $matrix"
+    fi
+
+    checks_started=$((checks_started + 1))
+    phases_file="$out_path/.phases/check_${checks_started}.jsonl"
+    if $phases_enabled; then
+        export ENVCHECKER_PHASES_FILE=$phases_file
+    fi
+    # notebook kernel and phase commands continue trace of check
+    trace_entry=""
+    if $tracing_enabled; then
+        check_span_id=$(new_span_id)
+        export TRACEPARENT="00-$trace_id-$check_span_id-01"
+        trace_entry=", \"span_id\": \"$check_span_id\""
+    fi
+
+    phase_begin
     if [ -f /home/jovyan/shells/namespace_validator.sh ]; then
         # shellcheck disable=SC1091
         # shellcheck source=/home/jovyan/shells/namespace_validator.sh
         validation=$(. /home/jovyan/shells/namespace_validator.sh "$params")
+        if [[ -n $matrix ]]; then
+            matrix_namespaces=$(echo "$matrix" | yq -oy '[.namespace // []] | flatten | join(",")')
+            if [[ -n $matrix_namespaces ]]; then
+                # shellcheck disable=SC1091
+                validation+=$(. /home/jovyan/shells/namespace_validator.sh "namespaces: [$matrix_namespaces]")
+            fi
+        fi
     else
         validation=""
     fi
+    phase_end namespace_validation
     if [ "$validation" != "" ]; then
         echo "$validation"
         overall_result=1
+        rm -f "$phases_file"
         return 1
     fi
 
@@ -215,21 +500,58 @@ runSingleNotebook() {
     echo "out script name without extension: $out_script_name_without_ext"
     out_script_path="$out_path/${out_script_name_without_ext}.ipynb"
 
+    execution_path=$script_path
+    matrix_entry=""
+    if [[ -n $matrix ]]; then
+        execution_path="$out_path/.matrix/$script_name"
+        matrix_as_json_str=$(echo "$matrix" | yq -oj -I0)
+        if ! phase_run matrix_build python /home/jovyan/utils/matrix_runner.py build "$script_path" "$execution_path" "$matrix_as_json_str"; then
+            overall_result=1
+            rm -f "$phases_file"
+            return 1
+        fi
+        matrix_entry=", \"matrix\": $matrix_as_json_str"
+    fi
+
+    papermill_command=(papermill)
+    if [[ -n $autosave_policy ]]; then
+        papermill_command=(python /home/jovyan/utils/papermill_autosave.py "$autosave_policy")
+    fi
+    papermill_command+=("${papermill_options[@]}")
+    budget_entry=""
+    if $budget_enabled; then
+        budget_file="$out_path/.budget/check_${checks_started}.json"
+        papermill_command=(python /home/jovyan/utils/check_budget.py run "$budget_file" "$out_script_path" -- "${papermill_command[@]}")
+    fi
     if [[ -z $params ]]; then
         printf "run notebook %s\n" "$script_path"
-        papermill "$script_path" -y "result_file_path: $out_script_name_without_ext" -y "out_path: $out_path" "$out_script_path"
+        phase_run papermill "${papermill_command[@]}" "$execution_path" -y "result_file_path: $out_script_name_without_ext" -y "out_path: $out_path" "$out_script_path"
     else
         printf "run notebook %s with params: \n" "$script_path"
-        papermill "$script_path" -y "$params" -y "result_file_path: $out_script_name_without_ext" -y "out_path: $out_path" "$out_script_path"
+        phase_run papermill "${papermill_command[@]}" "$execution_path" -y "$params" -y "result_file_path: $out_script_name_without_ext" -y "out_path: $out_path" "$out_script_path"
+    fi
+
+    if [[ -n $matrix ]]; then
+        rm -f "$execution_path"
     fi
 
-    res=$(python /home/jovyan/utils/parseOut.py <"$out_script_path")
+    res=$(phase_run parse_out python /home/jovyan/utils/parseOut.py <"$out_script_path")
     outs=("$out_script_path")
 
     if [[ -z $res ]]; then
         res=False
     fi
 
+    # peak RSS and CPU seconds of check, over-budget check is failed even if its result cell was executed
+    if $budget_enabled && [[ -f $budget_file ]]; then
+        budget_entry=", \"resources\": $(yq -p json -oj -I0 '.' "$budget_file")"
+        if [[ $(yq -p json -oj '.exceeded' "$budget_file") != null ]]; then
+            res=False
+            budget_entry+=", \"isExceptionOccured\": true"
+        fi
+        rm -f "$budget_file"
+    fi
+
     if [[ $res != "True" ]]; then
         overall_result=1
     fi
@@ -239,22 +561,38 @@ runSingleNotebook() {
         initiator=$(echo "$2" | yq -oy '.initiator // "envchecker" | downcase')
         namespace=$(echo "$2" | yq -oy '.namespace // "null" | downcase')
     fi
+    phase_begin
     metrics=$(extract_notebook_execution_metrics "$out_script_path" $overall_result "$initiator" "$namespace")
+    phase_end metrics_extraction
     outs=("$out_script_path")
 
     reportToPdf "$out_script_name_without_ext"
     outs=("${outs[@]}")
+    # PDF keeps the full content, scraps and result cell are not changed, so it is safe for S3 and report generators
+    if $slim_enabled; then
+        phase_run slim python /home/jovyan/utils/output_slimming.py "$out_script_path" "$slim_images"
+        # externalised images are uploaded and checkpointed with the notebook
+        if [[ -d ${out_script_path%.ipynb}_files ]]; then
+            outs+=("${out_script_path%.ipynb}_files")
+        fi
+    fi
     params_as_json_str=$(echo "$params" | yq -oj -I0)
     if [[ -z "$params_as_json_str" || "$params_as_json_str" == "null" ]]; then params_as_json_str='{}'; fi
 
-    outs_as_json_str=$(echo "[${outs//${IFS:0:1}/,}]" | yq -oj -I0)
-    if [[ -z "$outs_as_json_str" || "$outs_as_json_str" == "null" ]]; then outs_as_json_str='[]'; fi
+    # all files of check: notebook, PDF and '<notebook>_files' folder of slimmed notebook
+    outs_as_json_str=$(python -c 'import json, sys; print(json.dumps(sys.argv[1:]))' "${outs[@]}")
+    if [[ -z "$outs_as_json_str" ]]; then outs_as_json_str='[]'; fi
 
-    output=$(python -c "import env_checker_utils as utils; print(utils.get_related_reports('$out_script_path','$outs_as_json_str','$out_path'))" 2>/dev/null || echo "[]")
+    output=$(phase_run related_reports python -c "import env_checker_utils as utils; print(utils.get_related_reports('$out_script_path','$outs_as_json_str','$out_path'))" 2>/dev/null || echo "[]")
     outs_as_json_str=$output
-    yq ".checks += {\"path\":\"$script_path\", \"outs\": $outs_as_json_str, \"result\":\"$res\", \"params\":$params_as_json_str, \"metrics\":$metrics}" "$composite_result_file_path" -i || true
+    phase_run result_yaml yq ".checks += {\"path\":\"$script_path\", \"outs\": $outs_as_json_str, \"result\":\"$res\", \"params\":$params_as_json_str, \"metrics\":$metrics$matrix_entry$trace_entry$budget_entry${composite_index_entry:-}}" "$composite_result_file_path" -i || true
     reportToS3 "$out_script_path"
     reportToMonitoring "$out_script_path"
+    if $phases_enabled; then
+        # phases of all checks are written into result.yaml once at the end of run
+        [[ -f $phases_file ]] && mv -f "$phases_file" "$out_path/.phases/$(basename "$out_script_path" .ipynb).jsonl"
+        unset ENVCHECKER_PHASES_FILE
+    fi
 
     echo "$res"
 }
@@ -263,7 +601,7 @@ reportToPdf() {
     if $pdf_reporting_enabled; then
         if printf '%s\n' "${reports[@]}" | grep -Fqw 'pdf'; then
             echo "report to $1.pdf"
-            jupyter nbconvert --to pdf "$out_path/$1"
+            phase_run pdf jupyter nbconvert --to pdf "$out_path/$1"
             outs+=("$out_path/$1.pdf")
         else
             echo "report to pdf is disabled"
@@ -276,7 +614,7 @@ reportToHtml() {
         html_reporting_enabled=true
     fi
     if $html_reporting_enabled; then
-        python /home/jovyan/utils/report_generator.py "$out_path"
+        python /home/jovyan/utils/report_generator.py "$out_path" "$html_report_mode"
     fi
 }
 
@@ -285,13 +623,23 @@ reportToJson() {
         json_reporting_enabled=true
     fi
     if $json_reporting_enabled; then
-        /home/jovyan/utils/json_report_generator.py "$out_path"
+        /home/jovyan/utils/json_report_generator.py "$out_path" "$json_report_format"
+    fi
+}
+
+reportToCellProfile() {
+    if $cell_profile_enabled; then
+        python /home/jovyan/utils/profiling_report_generator.py "$out_path"
     fi
 }
 
 reportToMonitoring() {
     if printf '%s\n' "${reports[@]}" | grep -Fqw 'monitoring'; then
-        python -c "from monitoringUtils import MonitoringHelper; MonitoringHelper.pushNotebookExecutionResultsToMonitoringByExecutedNotebookPath('$1')"
+        phase_run monitoring python -c "from monitoringUtils import MonitoringHelper; MonitoringHelper.pushNotebookExecutionResultsToMonitoringByExecutedNotebookPath('$1')"
+    fi
+    # results are served by /envchecker/metrics endpoint of Jupyter server, see utils/metrics_extension.py
+    if printf '%s\n' "${reports[@]}" | grep -Fqw 'metrics'; then
+        phase_run metrics python /home/jovyan/utils/metrics_registry.py spool "$1"
     fi
 }
 
@@ -307,6 +655,17 @@ get_out_script_name_without_ext() {
     echo "${out_script_name_without_ext}_${curr_millis}"
 }
 
+# $1 - option name
+# $2 - option value
+# budgets of checks are numbers of MiB and seconds, see utils/check_budget.py
+require_number_option() {
+    if [[ ! $2 =~ ^[0-9]+([.][0-9]+)?$ ]]; then
+        echo "ERROR. '--$1=$2' must be a number, e.g. '--$1=1024'"
+        print_usage
+        exit 1
+    fi
+}
+
 ###START PROGRAM###
 
 # Output of instructions if run.sh was launched without parameters
@@ -348,12 +707,75 @@ ${OPTARG/'='/': '}"
             if [[ ${OPTARG} == "html=true" ]]; then
                 html_reporting_enabled=true
             fi
+            if [[ ${OPTARG} == html_mode=* ]]; then
+                html_reporting_enabled=true
+                html_report_mode=${OPTARG#html_mode=}
+            fi
             if [[ ${OPTARG} == "json=true" ]]; then
                 json_reporting_enabled=true
             fi
+            if [[ ${OPTARG} == json_format=* ]]; then
+                json_reporting_enabled=true
+                json_report_format=${OPTARG#json_format=}
+            fi
+            if [[ ${OPTARG} == "cell_profile=true" ]]; then
+                cell_profile_enabled=true
+            fi
             if [[ ${OPTARG} == "clear=false" ]]; then
                 clear_out=false
             fi
+            if [[ ${OPTARG} == "phases=true" ]]; then
+                phases_enabled=true
+            fi
+            if [[ ${OPTARG} == "tracing=true" ]]; then
+                # spans of checks are built from their phase timings
+                tracing_enabled=true
+                phases_enabled=true
+            fi
+            if [[ ${OPTARG} == "history=true" ]]; then
+                history_enabled=true
+            fi
+            if [[ ${OPTARG} == "k8s_cache=true" ]]; then
+                k8s_cache_enabled=true
+            fi
+            if [[ ${OPTARG} == "resume=true" ]]; then
+                resume_enabled=true
+            fi
+            if [[ ${OPTARG} == order=* ]]; then
+                check_order=${OPTARG#order=}
+                # checks are executed one by one, so only the time to the first failure depends on order
+                if [[ $check_order != "file" && $check_order != "spt" ]]; then
+                    echo "ERROR. Unsupported '--order=$check_order', supported: file, spt"
+                    exit 1
+                fi
+            fi
+            if [[ ${OPTARG} == "fail_fast=true" ]]; then
+                fail_fast=true
+            fi
+            if [[ ${OPTARG} == "slim=true" ]]; then
+                slim_enabled=true
+            fi
+            if [[ ${OPTARG} == slim_images=* ]]; then
+                slim_images=${OPTARG#slim_images=}
+            fi
+            if [[ ${OPTARG} == autosave=* ]]; then
+                autosave_policy=${OPTARG#autosave=}
+            fi
+            if [[ ${OPTARG} == autosave_cell_every=* ]]; then
+                papermill_options+=(--autosave-cell-every "${OPTARG#autosave_cell_every=}")
+            fi
+            if [[ ${OPTARG} == check_memory=* ]]; then
+                check_memory_mb=${OPTARG#check_memory=}
+                require_number_option check_memory "$check_memory_mb"
+            fi
+            if [[ ${OPTARG} == check_cpu=* ]]; then
+                check_cpu_seconds=${OPTARG#check_cpu=}
+                require_number_option check_cpu "$check_cpu_seconds"
+            fi
+            if [[ ${OPTARG} == check_timeout=* ]]; then
+                check_timeout_seconds=${OPTARG#check_timeout=}
+                require_number_option check_timeout "$check_timeout_seconds"
+            fi
             if [[ ${OPTARG} == "git=false" ]]; then
                 git_mode=false
             fi
@@ -400,6 +822,17 @@ ${OPTARG/'='/': '}"
     esac
 done
 
+# without run id a restarted run cannot be told apart from other invocations of the same composite
+if $resume_enabled && [[ -z ${ENVCHECKER_RUN_ID:-} ]]; then
+    echo "ERROR. '--resume=true' flag requires ENVCHECKER_RUN_ID, the same for all attempts of the run (e.g. Job name)"
+    exit 1
+fi
+# shards of the same run find each other by run id
+if $sharded && [[ -z ${ENVCHECKER_RUN_ID:-} ]]; then
+    echo "ERROR. ENVCHECKER_SHARDS=$shards requires ENVCHECKER_RUN_ID, the same for all shards of the run (e.g. Job name)"
+    exit 1
+fi
+
 # DEPRECATED: Backward compatibility - handle old --git=URL format
 #If receive data from GIT, will added the relative path of its new location to the executed COMPOSITE_FILE_PATH|NOTEBOOK_FILE_PATH.
 if [[ -n $git_source ]]; then
@@ -422,6 +855,12 @@ else
     file_path=${*:$OPTIND:1} # get value after all options (COMPOSITE_FILE_PATH|NOTEBOOK_FILE_PATH)
 fi
 
+# every shard works in its own subfolder, the last finished shard merges them into the run folder
+if $sharded; then
+    merged_out_path="/home/jovyan/out${output_subfolder:+/$output_subfolder}"
+    output_subfolder="${output_subfolder:+$output_subfolder/}shard_$shard_index"
+fi
+
 #Concatenate subfolders to './out' if they were passed using the '-o' flag
 if [ -n "$output_subfolder" ]; then
     out_path="/home/jovyan/out/$output_subfolder"
@@ -429,6 +868,29 @@ else
     out_path="/home/jovyan/out"
 fi
 
+# resources of every check are accounted and limited, if any budget is set
+budget_enabled=false
+if [[ -n $check_memory_mb$check_cpu_seconds$check_timeout_seconds ]]; then
+    budget_enabled=true
+    export ENVCHECKER_CHECK_MEMORY_MB=$check_memory_mb
+    export ENVCHECKER_CHECK_CPU_SECONDS=$check_cpu_seconds
+    export ENVCHECKER_CHECK_TIMEOUT_SECONDS=$check_timeout_seconds
+fi
+
+# Kubernetes objects are listed once per run and shared by all notebooks, see utils/k8s_snapshot_cache.py
+if $k8s_cache_enabled; then
+    k8s_cache_root="${ENVCHECKER_STATE_DIR:-/home/jovyan/out/.env-checker}/k8s_cache"
+    # folders of killed runs are not removed at the end of run, they are removed by the next one
+    for stale_cache_dir in "$k8s_cache_root"/run_*; do
+        if [[ -d $stale_cache_dir ]] && ! kill -0 "${stale_cache_dir##*/run_}" 2>/dev/null; then
+            rm -rf "$stale_cache_dir"
+        fi
+    done
+    k8s_cache_dir="$k8s_cache_root/run_$$"
+    rm -rf "$k8s_cache_dir"
+    export ENVCHECKER_K8S_CACHE_DIR=$k8s_cache_dir
+fi
+
 # Handle Git mode first - fetch repository (NEW METHOD - uses environment variables)
 if [[ $git_mode == true ]]; then
     prepareOutput
@@ -445,6 +907,27 @@ if [[ $git_mode == true ]]; then
     fi
 fi
 
+# Root span of run.sh invocation. If run.sh is called with TRACEPARENT, run becomes a part of caller trace.
+# Shards of the same run share trace and root span, see utils/tracing.py
+if $tracing_enabled; then
+    caller_traceparent=""
+    if [[ ${TRACEPARENT:-} =~ ^00-([0-9a-f]{32})-[0-9a-f]{16}-[0-9a-f]{2}$ ]]; then
+        caller_traceparent=$TRACEPARENT
+        trace_id=${BASH_REMATCH[1]}
+    fi
+    if $sharded; then
+        run_hash=$(printf '%s' "$ENVCHECKER_RUN_ID" | sha256sum)
+        trace_id=${trace_id:-${run_hash:0:32}}
+        root_span_id=${run_hash:32:16}
+    else
+        trace_id=${trace_id:-$(od -An -N16 -tx1 /dev/urandom | tr -d ' \n')}
+        root_span_id=$(new_span_id)
+    fi
+    root_traceparent="00-$trace_id-$root_span_id-01"
+    export TRACEPARENT=$root_traceparent
+    trace_started_at=${EPOCHREALTIME/./}
+fi
+
 # Now handle notebook execution (independent of git mode)
 if [[ -n $json_config ]]; then
     prepareOutput
@@ -460,7 +943,9 @@ elif [[ -n $prepared_yaml ]]; then
     runComposite "$out_path/input.yaml"
 elif [[ $file_path == *.ipynb ]]; then
     prepareOutput
-    runSingleNotebook "$file_path" "$params"
+    if ! $sharded || ((shard_index == 0)); then
+        runSingleNotebook "$file_path" "$params"
+    fi
 elif [[ $file_path == *.yaml || $file_path == *.yml ]]; then
     prepareOutput
     runComposite "$file_path"
@@ -469,9 +954,50 @@ else
     overall_result=1
 fi
 
+if $phases_enabled && [[ -f $composite_result_file_path ]]; then
+    python /home/jovyan/utils/phase_timing.py attach "$composite_result_file_path" "$out_path/.phases"
+fi
+
+if $k8s_cache_enabled; then
+    rm -rf "$k8s_cache_dir"
+    unset ENVCHECKER_K8S_CACHE_DIR
+fi
+
 echo "overall_result: $overall_result"
 txt_result_file_path="$out_path/result.txt"
 echo "$overall_result" >>"$txt_result_file_path"
 
-reportToHtml
-reportToJson
+if $sharded; then
+    if [[ $(python /home/jovyan/utils/composite_sharding.py finish "$merged_out_path" "$shards" "$shard_index" "$ENVCHECKER_RUN_ID") == "merged" ]]; then
+        shards_merged=true
+        out_path=$merged_out_path
+        composite_result_file_path="$merged_out_path/result.yaml"
+        overall_result=$(tail -n 1 "$merged_out_path/result.txt")
+        echo "results of $shards shards are merged into $merged_out_path, overall_result: $overall_result"
+    else
+        echo "shard $shard_index is completed, results are merged by the last completed shard (or by timeout)"
+    fi
+fi
+
+# run summaries are created once per run, by the shard, which merged results
+if ! $sharded || $shards_merged; then
+    # history is kept if it is enabled or if durations of checks order checks (--order, --fail_fast)
+    # or balance shards of next runs
+    if ($history_enabled || [[ $check_order != "file" || ${ENVCHECKER_SHARD_STRATEGY:-hash} == "cost" ]]) && [[ -f $composite_result_file_path ]]; then
+        python /home/jovyan/utils/result_history.py record "$composite_result_file_path" || echo "Cannot record history of results"
+    fi
+
+    if $phases_enabled && [[ -f $composite_result_file_path ]]; then
+        python /home/jovyan/utils/phase_timing.py summary "$composite_result_file_path"
+    fi
+
+    if $tracing_enabled && [[ -f $composite_result_file_path ]]; then
+        python /home/jovyan/utils/tracing.py export "$composite_result_file_path" "$root_traceparent" "$trace_started_at" $caller_traceparent
+    fi
+
+    reportToHtml
+    reportToJson
+    reportToCellProfile
+fi
+
+rm -f "$out_path/$RUN_MARKER"
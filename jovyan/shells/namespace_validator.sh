@@ -1,12 +1,34 @@
 #!/bin/bash
 
+# Existence of every namespace is read once per run into the run-scoped cache of k8s_snapshot_cache.py
+# (shared with its namespace_exists), so namespaces of the cluster are never listed.
+# Only NotFound is cached as absence, other errors (RBAC, timeouts) are reported and retried by the next check.
 check_namespace() {
     local namespace="$1"
-    if ! kubectl get namespace "$namespace" >/dev/null 2>&1; then
+    local status_dir=""
+    local error
+    if [[ -n $ENVCHECKER_K8S_CACHE_DIR ]]; then
+        status_dir="$ENVCHECKER_K8S_CACHE_DIR/namespace"
+        if [[ -f "$status_dir/$namespace.exists" ]]; then
+            return 0
+        fi
+        if [[ -f "$status_dir/$namespace.absent" ]]; then
+            printf "\033[0;31mERROR: namespace=%s does not exist.\033[0m\n" "$namespace"
+            return 1
+        fi
+        mkdir -p "$status_dir"
+    fi
+    if error=$(kubectl get namespace "$namespace" 2>&1 >/dev/null); then
+        [[ -n $status_dir ]] && touch "$status_dir/$namespace.exists"
+        return 0
+    fi
+    if [[ $error == *NotFound* ]]; then
+        [[ -n $status_dir ]] && touch "$status_dir/$namespace.absent"
         printf "\033[0;31mERROR: namespace=%s does not exist.\033[0m\n" "$namespace"
-        return 1
+    else
+        printf "\033[0;31mERROR: cannot check namespace=%s: %s\033[0m\n" "$namespace" "$error"
     fi
-    return 0
+    return 1
 }
 
 params="$1"
@@ -0,0 +1,90 @@
+import argparse
+import datetime
+import glob
+import json
+import os
+import sys
+import time
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import check_timing  # noqa: E402
+import custom_reporter  # noqa: E402
+import env_checker_utils  # noqa: E402
+
+BENCHMARK_NAME = 'check_timing'
+DEFAULT_CHECKS = 100000
+
+
+def measure(func, checks: int) -> float:
+    started_at = time.perf_counter()
+    func(checks)
+    return (time.perf_counter() - started_at) * 1e9 / checks
+
+
+def bare_checks(checks: int):
+    for i in range(checks):
+        pass
+
+
+def timed_checks(checks: int):
+    for i in range(checks):
+        with check_timing.CheckTiming() as timing:
+            timing.value = 'OK'
+
+
+def report_appends(checks: int):
+    report = custom_reporter.Report('namespace', 'resource', report_name='benchmark_report')
+    for i in range(checks):
+        report.append('check', 'OK', namespace=f'namespace-{i % 50}', resource=f'resource-{i}')
+
+
+def report_timed_appends(checks: int):
+    report = custom_reporter.Report('namespace', 'resource', report_name='benchmark_report')
+    for i in range(checks):
+        with report.timed('check', namespace=f'namespace-{i % 50}', resource=f'resource-{i}') as check:
+            check.value = 'OK'
+
+
+def get_previous_result(benchmarks_dir: str):
+    results = sorted(glob.glob(os.path.join(benchmarks_dir, f'{BENCHMARK_NAME}_*.json')))
+    if not results:
+        return None
+    with open(results[-1], 'r') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures overhead of check timing per check')
+    parser.add_argument('--checks', type=int, default=DEFAULT_CHECKS, help='amount of timed checks')
+    parser.add_argument('--output-dir', default=None, help='directory for JSON results')
+    args = parser.parse_args()
+
+    benchmarks_dir = args.output_dir or env_checker_utils.get_state_dir('benchmarks')
+    previous = get_previous_result(benchmarks_dir)
+    timer_ns = measure(timed_checks, args.checks) - measure(bare_checks, args.checks)
+    append_ns = measure(report_appends, args.checks)
+    timed_append_ns = measure(report_timed_appends, args.checks)
+    current = {
+        'benchmark': BENCHMARK_NAME,
+        'timestamp': datetime.datetime.now().isoformat(),
+        'checks': args.checks,
+        'timer_overhead_ns': round(timer_ns),
+        'report_append_ns': round(append_ns),
+        'report_timed_append_ns': round(timed_append_ns),
+        'report_timed_overhead_ns': round(timed_append_ns - append_ns)
+    }
+
+    result_path = os.path.join(benchmarks_dir, f"{BENCHMARK_NAME}_{datetime.datetime.now():%Y%m%d%H%M%S}.json")
+    with open(result_path, 'w') as f:
+        json.dump(current, f, indent=4)
+    print(f"{'measure':<28}{'ns/check':>10}{'previous':>10}")
+    for key in ('timer_overhead_ns', 'report_append_ns', 'report_timed_append_ns', 'report_timed_overhead_ns'):
+        previous_value = previous.get(key, '') if previous else ''
+        print(f'{key:<28}{current[key]:>10}{previous_value:>10}')
+    print(f'Benchmark results are saved to {result_path}')
+
+
+if __name__ == '__main__':
+    main()
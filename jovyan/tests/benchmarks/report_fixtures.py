@@ -0,0 +1,113 @@
+import argparse
+import datetime
+import json
+import os
+import random
+
+SCRAP_MIME_TYPE = 'application/scrapbook.scrap.json+json'
+STATUSES = ['OK', 'OK Everything is fine', 'PASSED', 'FAILED Pod is not ready', 'ERROR Cannot connect', 'NONE']
+
+
+def create_scrap_output(name: str, data) -> dict:
+    # the same output format as scrapbook.glue(name, data) produces
+    return {
+        'output_type': 'display_data',
+        'data': {SCRAP_MIME_TYPE: {'name': name, 'data': data, 'encoder': 'json', 'version': 1}},
+        'metadata': {'scrapbook': {'name': name, 'data': True, 'display': False}}
+    }
+
+
+def create_report_scrap(report_name: str, rows: int, check_columns: list[str], rng: random.Random) -> dict:
+    """
+    Creates 'report' scrap in custom_reporter.Report.dict() format: value fields + 'checks' dict per row.
+    """
+
+    values = []
+    for i in range(rows):
+        values.append({
+            'checks': {check: rng.choice(STATUSES) for check in check_columns},
+            'namespace': f'namespace-{i % 500}',
+            'resource': f'resource-{i}'
+        })
+    return {'name': report_name, 'values': values, 'isExceptionOccured': False}
+
+
+def create_executed_notebook(report_scrap: dict) -> dict:
+    start_time = datetime.datetime.now()
+    return {
+        'cells': [
+            {
+                'cell_type': 'code', 'execution_count': 1, 'id': 'report', 'source': 'sb.glue("report", report.dict())',
+                'metadata': {'tags': [], 'papermill': {'duration': 0.1, 'exception': False}},
+                'outputs': [create_scrap_output('report', report_scrap)]
+            },
+            {
+                'cell_type': 'code', 'execution_count': 2, 'id': 'result', 'source': 'True',
+                'metadata': {'tags': ['result'], 'papermill': {'duration': 0.01, 'exception': False}},
+                'outputs': [{'output_type': 'execute_result', 'execution_count': 2, 'metadata': {},
+                             'data': {'text/plain': ['True']}}]
+            }
+        ],
+        'metadata': {
+            'kernelspec': {'name': 'python3', 'display_name': 'Python 3', 'language': 'python'},
+            'papermill': {'start_time': start_time.isoformat(), 'duration': 0.11, 'parameters': {}}
+        },
+        'nbformat': 4,
+        'nbformat_minor': 5
+    }
+
+
+def write_report_notebooks(directory: str, rows: int, check_columns: int = 5, schemas: int = 1,
+                           notebooks: int = 10, report_name: str = 'benchmark_report', seed: int = 0,
+                           sidecar_rows: int = None) -> list[str]:
+    """
+    Writes executed notebooks with 'report' scraps, which are read by report_generator.py and
+    json_report_generator.py.
+
+    Args:
+        directory (str): directory for notebooks.
+        rows (int): total amount of report rows, split evenly between notebooks.
+        check_columns (int): amount of check columns in each schema.
+        schemas (int): amount of distinct column sets (schemas) within the same report name.
+        notebooks (int): amount of notebooks.
+        report_name (str): name of report.
+        seed (int): seed for check statuses, so fixtures are reproducible.
+        sidecar_rows (int): reports with at least this amount of rows are stored in side-car files
+            (see report_storage.store_report), all reports are kept in scraps if not set.
+
+    Returns:
+        list[str]: paths of written notebooks.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    timestamp = int(datetime.datetime.now().timestamp() * 1000)
+    for i in range(notebooks):
+        schema = i % schemas
+        columns = [f'check_{schema}_{c}' for c in range(check_columns)]
+        notebook_rows = rows // notebooks + (1 if i < rows % notebooks else 0)
+        report_scrap = create_report_scrap(report_name, notebook_rows, columns, rng)
+        if sidecar_rows is not None:
+            import report_storage
+            report_scrap = report_storage.store_report(report_scrap, directory, min_rows=sidecar_rows)
+        nb = create_executed_notebook(report_scrap)
+        path = os.path.join(directory, f'benchmark_notebook_{i}_{timestamp + i}.ipynb')
+        with open(path, 'w') as f:
+            json.dump(nb, f)
+        paths.append(path)
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Writes executed notebooks with synthetic report scraps')
+    parser.add_argument('directory')
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--check-columns', type=int, default=5)
+    parser.add_argument('--schemas', type=int, default=1)
+    parser.add_argument('--notebooks', type=int, default=10)
+    parser.add_argument('--report-name', default='benchmark_report')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    written = write_report_notebooks(args.directory, args.rows, args.check_columns, args.schemas, args.notebooks,
+                                     args.report_name, args.seed)
+    print(f'{len(written)} notebooks are written to {args.directory}')
@@ -0,0 +1,146 @@
+import argparse
+import datetime
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import custom_reporter  # noqa: E402
+import env_checker_utils  # noqa: E402
+import report_fixtures  # noqa: E402
+
+REPORT_GENERATOR = '/home/jovyan/utils/report_generator.py'
+JSON_REPORT_GENERATOR = '/home/jovyan/utils/json_report_generator.py'
+DEFAULT_ROWS = [1000, 10000, 50000]
+BENCHMARK_NAME = 'report_generation'
+
+
+def measure_command(command: list[str]) -> dict:
+    started_at = time.monotonic()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, rusage = os.wait4(process.pid, 0)
+    return {
+        'wall_ms': round((time.monotonic() - started_at) * 1000, 3),
+        'peak_rss_kb': rusage.ru_maxrss,
+        'exit_code': os.waitstatus_to_exitcode(status)
+    }
+
+
+def measure_report_append(rows: int, check_columns: int) -> dict:
+    checks = [f'check_{c}' for c in range(check_columns)]
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    report = custom_reporter.Report('namespace', 'resource', report_name='benchmark_report')
+    for i in range(rows):
+        for check in checks:
+            report.append(check, 'OK', namespace=f'namespace-{i % 500}', resource=f'resource-{i}')
+    scrap = report.dict()
+    elapsed = time.perf_counter() - started_at
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    appends = rows * check_columns
+    return {
+        'appends': appends,
+        'rows': len(scrap['values']),
+        'wall_ms': round(elapsed * 1000, 3),
+        'appends_per_second': round(appends / elapsed),
+        'peak_traced_kb': peak // 1024
+    }
+
+
+def run_size(rows: int, args) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        notebooks = report_fixtures.write_report_notebooks(directory, rows, args.check_columns, args.schemas,
+                                                           args.notebooks, sidecar_rows=args.sidecar_rows)
+        notebooks_size = sum(os.path.getsize(nb) for nb in notebooks)
+        notebooks_size += sum(os.path.getsize(f) for f in glob.glob(os.path.join(directory, '*.arrow')))
+        html = measure_command([sys.executable, REPORT_GENERATOR, directory, args.html_mode])
+        html['output_bytes'] = sum(os.path.getsize(f) for f in glob.glob(os.path.join(directory, '*.html')))
+        json_report = measure_command([sys.executable, JSON_REPORT_GENERATOR, directory, args.json_format])
+        json_report['output_bytes'] = sum(os.path.getsize(f)
+                                          for f in glob.glob(os.path.join(directory, f'*.{args.json_format}')))
+    return {
+        'rows': rows,
+        'notebooks_bytes': notebooks_size,
+        'html': html,
+        'json': json_report,
+        'report_append': measure_report_append(rows, args.check_columns)
+    }
+
+
+def get_previous_result(benchmarks_dir: str):
+    results = sorted(glob.glob(os.path.join(benchmarks_dir, f'{BENCHMARK_NAME}_*.json')))
+    if not results:
+        return None
+    with open(results[-1], 'r') as f:
+        return json.load(f)
+
+
+def format_change(current: float, previous: float) -> str:
+    if not previous:
+        return ''
+    return f'{current / previous - 1:+.0%}'
+
+
+def print_comparison(current: dict, previous: dict):
+    previous_runs = {run['rows']: run for run in previous['runs']} if previous else {}
+    print(f"{'rows':>8}{'html, s':>10}{'html rss, MiB':>15}{'json, s':>10}{'json rss, MiB':>15}"
+          f"{'appends/s':>12}{'html vs prev':>14}{'json vs prev':>14}")
+    for run in current['runs']:
+        previous_run = previous_runs.get(run['rows'], {})
+        html_change = format_change(run['html']['wall_ms'], previous_run.get('html', {}).get('wall_ms'))
+        json_change = format_change(run['json']['wall_ms'], previous_run.get('json', {}).get('wall_ms'))
+        print(f"{run['rows']:>8}{run['html']['wall_ms'] / 1000:>10.2f}{run['html']['peak_rss_kb'] / 1024:>15.1f}"
+              f"{run['json']['wall_ms'] / 1000:>10.2f}{run['json']['peak_rss_kb'] / 1024:>15.1f}"
+              f"{run['report_append']['appends_per_second']:>12}{html_change:>14}{json_change:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures HTML/JSON report generation and Report.append')
+    parser.add_argument('--rows', default=','.join(str(r) for r in DEFAULT_ROWS),
+                        help='comma-separated amounts of report rows')
+    parser.add_argument('--check-columns', type=int, default=5)
+    parser.add_argument('--schemas', type=int, default=1, help='distinct column sets per report name')
+    parser.add_argument('--notebooks', type=int, default=10, help='amount of notebooks, rows are split between them')
+    parser.add_argument('--sidecar-rows', type=int, default=None,
+                        help='store reports with at least this amount of rows in Arrow side-car files')
+    parser.add_argument('--json-format', default='json', choices=['json', 'ndjson', 'parquet'],
+                        help='output format of json_report_generator.py')
+    parser.add_argument('--html-mode', default='static', choices=['static', 'paged'],
+                        help='mode of report_generator.py')
+    parser.add_argument('--output-dir', default=None, help='directory for JSON results')
+    args = parser.parse_args()
+
+    benchmarks_dir = args.output_dir or env_checker_utils.get_state_dir('benchmarks')
+    previous = get_previous_result(benchmarks_dir)
+    current = {
+        'benchmark': BENCHMARK_NAME,
+        'timestamp': datetime.datetime.now().isoformat(),
+        'check_columns': args.check_columns,
+        'schemas': args.schemas,
+        'notebooks': args.notebooks,
+        'sidecar_rows': args.sidecar_rows,
+        'json_format': args.json_format,
+        'html_mode': args.html_mode,
+        'runs': []
+    }
+    for rows in [int(r) for r in args.rows.split(',') if r]:
+        print(f'Generating reports for {rows} rows...')
+        current['runs'].append(run_size(rows, args))
+
+    result_path = os.path.join(benchmarks_dir, f"{BENCHMARK_NAME}_{datetime.datetime.now():%Y%m%d%H%M%S}.json")
+    with open(result_path, 'w') as f:
+        json.dump(current, f, indent=4)
+    print_comparison(current, previous)
+    print(f'Benchmark results are saved to {result_path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+import argparse
+import datetime
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import yaml
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import env_checker_utils  # noqa: E402
+import phase_timing  # noqa: E402
+
+RUN_SH = '/home/jovyan/run.sh'
+TRIVIAL_NOTEBOOK = '/home/jovyan/tests/notebooks/test_notebook.ipynb'
+DEFAULT_SIZES = [1, 10, 100, 500]
+BENCHMARK_NAME = 'run_sh'
+
+YQ_SHIM = """#!/bin/bash
+echo >>"$BENCHMARK_YQ_CALLS_FILE"
+exec {real_yq} "$@"
+"""
+
+
+def create_composite(size: int, directory: str) -> str:
+    composite_path = os.path.join(directory, f'composite_{size}.yaml')
+    checks = [{'path': TRIVIAL_NOTEBOOK, 'params': {'bulk_check_file_name': f'benchmark_{i}'}} for i in range(size)]
+    with open(composite_path, 'w') as f:
+        yaml.dump({'checks': checks}, f)
+    return composite_path
+
+
+def create_yq_shim(directory: str) -> str:
+    """
+    Creates 'yq' wrapper, which counts its calls, and returns directory, which must be prepended to PATH.
+    """
+
+    real_yq = shutil.which('yq')
+    if real_yq is None:
+        raise FileNotFoundError('yq is not found in PATH')
+    shim_dir = os.path.join(directory, 'bin')
+    os.makedirs(shim_dir, exist_ok=True)
+    shim_path = os.path.join(shim_dir, 'yq')
+    with open(shim_path, 'w') as f:
+        f.write(YQ_SHIM.format(real_yq=real_yq))
+    os.chmod(shim_path, 0o755)
+    return shim_dir
+
+
+def count_lines(path: str) -> int:
+    if not os.path.isfile(path):
+        return 0
+    with open(path, 'r') as f:
+        return sum(1 for _ in f)
+
+
+def get_notebook_execution_ms(executed_notebook_path: str) -> float:
+    with open(executed_notebook_path, 'r') as f:
+        nb = json.load(f)
+    cells_duration = sum(cell.get('metadata', {}).get('papermill', {}).get('duration') or 0 for cell in nb['cells'])
+    return cells_duration * 1000
+
+
+def run_composite(size: int, directory: str, shim_dir: str, reports: str, phases: bool) -> dict:
+    composite_path = create_composite(size, directory)
+    yq_calls_file = os.path.join(directory, f'yq_calls_{size}.txt')
+    output_subfolder = f'benchmark_{BENCHMARK_NAME}_{size}'
+    env = dict(os.environ, PATH=f"{shim_dir}:{os.environ.get('PATH', '')}", BENCHMARK_YQ_CALLS_FILE=yq_calls_file)
+    command = ['bash', RUN_SH, '-r', reports, '-o', output_subfolder, composite_path]
+    if phases:
+        # phase records cost an extra process per phase, so overhead is measured with them disabled as well
+        command.insert(2, '--phases=true')
+
+    last_pid = phase_timing.read_last_pid()
+    started_at = time.monotonic()
+    completed = subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wall_ms = (time.monotonic() - started_at) * 1000
+    processes = phase_timing.read_last_pid() - last_pid
+
+    result_file_path = f'/home/jovyan/out/{output_subfolder}/result.yaml'
+    with open(result_file_path, 'r') as f:
+        checks = (yaml.safe_load(f) or {}).get('checks', [])
+    phases = {row['phase']: row for row in phase_timing.summarize_phases(checks)}
+    executed_notebooks = glob.glob(f'/home/jovyan/out/{output_subfolder}/*.ipynb')
+    notebooks_ms = sum(get_notebook_execution_ms(nb) for nb in executed_notebooks)
+    yq_calls = count_lines(yq_calls_file)
+    return {
+        'size': size,
+        'exit_code': completed.returncode,
+        'executed_notebooks': len(executed_notebooks),
+        'wall_ms': round(wall_ms, 3),
+        'per_check_wall_ms': round(wall_ms / size, 3),
+        # everything, which is not a notebook execution itself (including papermill and kernel start),
+        # is an orchestration overhead
+        'per_check_overhead_ms': round((wall_ms - notebooks_ms) / size, 3),
+        'processes': processes,
+        'per_check_processes': round(processes / size, 2),
+        'yq_calls': yq_calls,
+        'per_check_yq_calls': round(yq_calls / size, 2),
+        'result_yaml_rewrite_ms': round(phases.get('result_yaml', {}).get('total_ms', 0.0), 3),
+        'phases': {name: {'total_ms': round(row['total_ms'], 3), 'mean_ms': round(row['mean_ms'], 3)}
+                   for name, row in phases.items()}
+    }
+
+
+def get_previous_result(benchmarks_dir: str):
+    results = sorted(glob.glob(os.path.join(benchmarks_dir, f'{BENCHMARK_NAME}_*.json')))
+    if not results:
+        return None
+    with open(results[-1], 'r') as f:
+        return json.load(f)
+
+
+def print_comparison(current: dict, previous: dict):
+    previous_runs = {run['size']: run for run in previous['runs']} if previous else {}
+    print(f"{'size':>6}{'wall, s':>10}{'overhead/check, ms':>20}{'processes/check':>17}{'yq/check':>10}"
+          f"{'vs previous':>13}")
+    for run in current['runs']:
+        previous_run = previous_runs.get(run['size'])
+        delta = ''
+        if previous_run and previous_run['per_check_overhead_ms']:
+            delta = f"{run['per_check_overhead_ms'] / previous_run['per_check_overhead_ms'] - 1:+.0%}"
+        print(f"{run['size']:>6}{run['wall_ms'] / 1000:>10.1f}{run['per_check_overhead_ms']:>20.1f}"
+              f"{run['per_check_processes']:>17.1f}{run['per_check_yq_calls']:>10.1f}{delta:>13}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures run.sh orchestration overhead on synthetic composites')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='comma-separated amounts of notebooks in composite')
+    parser.add_argument('--reports', default='', help="value of run.sh '-r' flag, no reports by default")
+    parser.add_argument('--output-dir', default=None, help='directory for JSON results')
+    parser.add_argument('--without-phases', action='store_true',
+                        help='do not record phase timings, overhead is measured without their cost')
+    args = parser.parse_args()
+
+    benchmarks_dir = args.output_dir or env_checker_utils.get_state_dir('benchmarks')
+    previous = get_previous_result(benchmarks_dir)
+    current = {
+        'benchmark': BENCHMARK_NAME,
+        'timestamp': datetime.datetime.now().isoformat(),
+        'reports': args.reports,
+        'phases': not args.without_phases,
+        'runs': []
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        shim_dir = create_yq_shim(directory)
+        for size in [int(s) for s in args.sizes.split(',') if s]:
+            print(f'Running composite of {size} notebooks...')
+            current['runs'].append(run_composite(size, directory, shim_dir, args.reports, not args.without_phases))
+
+    result_path = os.path.join(benchmarks_dir, f"{BENCHMARK_NAME}_{datetime.datetime.now():%Y%m%d%H%M%S}.json")
+    with open(result_path, 'w') as f:
+        json.dump(current, f, indent=4)
+    print_comparison(current, previous)
+    print(f'Benchmark results are saved to {result_path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 import json
 import os
 
+import check_timing
+
 
 class JsonReport:
 
@@ -47,6 +49,25 @@ def add_check_with_existing_json(
         self.update_overall_result()
         return self.checks
 
+    def timed_check(self, name, description=""):
+        """
+        Returns context manager (or decorator), which adds check with measured 'time_exec' (see check_timing.py).
+        Status is taken from 'status' attribute of context manager or returned by decorated function, check is Passed
+        if it is not set and Failed if exception is raised (exception is not suppressed).
+
+        Example:
+            with json_report.timed_check("Checks the creation of .html") as check:
+                check.status = "Passed" if os.path.isfile(html_path) else "Failed"
+        """
+        return check_timing.CheckTiming(
+            lambda timing, exc: self._add_timed_check(name, description, timing, exc))
+
+    def _add_timed_check(self, name, description, timing, exc):
+        status = getattr(timing, "status", None) or timing.value or ("Failed" if exc is not None else "Passed")
+        error_description = getattr(timing, "error_description", None) or (str(exc) if exc is not None else "")
+        self.add_check(name, status, description, error_description, f"{timing.wall_ms / 1000:.3f}s")
+        self.checks[-1]["timing"] = timing.as_dict()
+
     def update_overall_result(self):
         if any(check["status"] == "Failed" for check in self.checks):
             self.overall_result = "Failed"
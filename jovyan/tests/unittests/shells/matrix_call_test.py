@@ -0,0 +1,36 @@
+import unittest
+import subprocess
+import os
+import yaml
+
+
+class MatrixCallTest(unittest.TestCase):
+
+    def test_matrix_call(self):
+
+        # namespaces, which exist in any cluster, because namespaces are validated before execution
+        yaml_content = """
+            checks:
+              - path: /home/jovyan/tests/notebooks/test_notebook.ipynb
+                params:
+                    report_name: matrix_report
+                matrix:
+                    namespace: [default, kube-system]
+        """
+
+        command = ['bash', '/home/jovyan/run.sh', '-o', 'matrix_check', '-y', yaml_content]
+        subprocess.run(command, check=True)
+
+        ipynb_files = [f for f in os.listdir('/home/jovyan/out/matrix_check') if f.endswith('.ipynb')]
+        self.assertEqual(len(ipynb_files), 1, f"Matrix must be executed as one notebook, AR={len(ipynb_files)}")
+
+        with open('/home/jovyan/out/matrix_check/result.yaml', 'r') as f:
+            checks = yaml.safe_load(f)['checks']
+        self.assertEqual(len(checks), 1)
+        self.assertEqual(checks[0]['result'], 'True')
+        self.assertEqual(checks[0]['matrix'], {'namespace': ['default', 'kube-system']})
+        self.assertEqual([m['report_namespace'] for m in checks[0]['metrics']], ['default', 'kube-system'])
+
+
+if __name__ == '__main__':
+    unittest.main()
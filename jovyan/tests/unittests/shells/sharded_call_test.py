@@ -0,0 +1,41 @@
+import unittest
+import subprocess
+import os
+import yaml
+
+
+class ShardedCallTest(unittest.TestCase):
+
+    def test_sharded_call(self):
+
+        yaml_content = """
+            checks:
+              - path: /home/jovyan/tests/notebooks/test_notebook.ipynb
+                params:
+                    bulk_check_file_name: shard_report_1
+              - path: /home/jovyan/tests/notebooks/test_notebook.ipynb
+                params:
+                    bulk_check_file_name: shard_report_2
+              - path: /home/jovyan/tests/notebooks/test_notebook.ipynb
+                params:
+                    bulk_check_file_name: shard_report_3
+        """
+
+        # processes stand in for pods of Indexed Job
+        command = ['python', '/home/jovyan/utils/composite_sharding.py', 'run-local', '2', '--',
+                   '-r', '', '-o', 'sharded_check', '-y', yaml_content]
+        subprocess.run(command, check=True)
+
+        with open('/home/jovyan/out/sharded_check/result.yaml', 'r') as f:
+            checks = yaml.safe_load(f)['checks']
+        self.assertEqual([c['params']['bulk_check_file_name'] for c in checks],
+                         ['shard_report_1', 'shard_report_2', 'shard_report_3'])
+        with open('/home/jovyan/out/sharded_check/result.txt', 'r') as f:
+            self.assertEqual(f.read().split()[-1], '0')
+        ipynb_files = [f for root, _, files in os.walk('/home/jovyan/out/sharded_check')
+                       for f in files if f.endswith('.ipynb')]
+        self.assertEqual(len(ipynb_files), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import subprocess
+import os
+import shutil
+import tempfile
+
+import nbformat
+import yaml
+
+# PNG of random pixels, it is bigger than image limit of slimming, so it is saved to '<notebook>_files' folder
+IMAGE_CELL = """
+import os
+import struct
+import zlib
+from IPython.display import Image, display
+
+
+def chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+size = 128
+pixels = b''.join(b'\\x00' + os.urandom(size * 3) for _ in range(size))
+display(Image(data=b'\\x89PNG\\r\\n\\x1a\\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0))
+              + chunk(b'IDAT', zlib.compress(pixels)) + chunk(b'IEND', b''), format='png'))
+"""
+
+
+class SlimCallTest(unittest.TestCase):
+
+    def test_slim_call(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        notebook = nbformat.read('/home/jovyan/tests/notebooks/test_notebook.ipynb', as_version=4)
+        notebook.cells.insert(1, nbformat.v4.new_code_cell(IMAGE_CELL))
+        notebook_path = os.path.join(directory, 'slim_notebook.ipynb')
+        nbformat.write(notebook, notebook_path)
+
+        command = ['bash', '/home/jovyan/run.sh', '-o', 'slim_check', '--slim=true', '--slim_images=externalise',
+                   notebook_path]
+        subprocess.run(command, check=True)
+
+        with open('/home/jovyan/out/slim_check/result.yaml', 'r') as f:
+            checks = yaml.safe_load(f)['checks']
+        self.assertEqual(len(checks), 1)
+        outs = checks[0]['outs']
+        executed_notebook = outs[0]
+        self.assertTrue(executed_notebook.endswith('.ipynb'))
+        # externalised images and PDF are uploaded, checkpointed and cached with the notebook
+        self.assertIn(executed_notebook[:-len('.ipynb')] + '_files', outs)
+        self.assertIn(executed_notebook[:-len('.ipynb')] + '.pdf', outs)
+        self.assertTrue(all(os.path.exists(out) for out in outs), f"Some outs do not exist: {outs}")
+
+
+if __name__ == '__main__':
+    unittest.main()
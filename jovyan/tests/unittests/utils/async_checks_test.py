@@ -0,0 +1,87 @@
+import threading
+import time
+import unittest
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import async_checks  # noqa: E402
+import custom_reporter  # noqa: E402
+
+
+class ProbeHandler(BaseHTTPRequestHandler):
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with ProbeHandler.lock:
+            ProbeHandler.active += 1
+            ProbeHandler.max_active = max(ProbeHandler.max_active, ProbeHandler.active)
+        time.sleep(0.05)
+        with ProbeHandler.lock:
+            ProbeHandler.active -= 1
+        self.send_response(500 if self.path.startswith('/fail') else 200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class AsyncChecksTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), ProbeHandler)
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        ProbeHandler.max_active = 0
+
+    def test_results_are_appended_to_report(self):
+        urls = [f'{self.url}/ok/{i}' for i in range(20)] + [f'{self.url}/fail', 'http://127.0.0.1:1/closed']
+        report = custom_reporter.ConcurrentReport('url', report_name='async_checks_test')
+        results = async_checks.check_http_endpoints(urls, report=report, timeout=5)
+        self.assertEqual([r['url'] for r in results], urls)
+        self.assertEqual(sum(r['ok'] for r in results), 20)
+        self.assertEqual(results[20]['status'], 500)
+        self.assertIsNone(results[21]['status'])
+        values = report.dict()['values']
+        self.assertEqual(len(values), 22)
+        self.assertTrue(values[21]['checks']['connection'].startswith('FAILED'))
+
+    def test_concurrency_is_bounded(self):
+        urls = [f'{self.url}/ok/{i}' for i in range(30)]
+        started_at = time.monotonic()
+        results = async_checks.check_http_endpoints(urls, concurrency=5, limit_per_host=10)
+        self.assertTrue(all(r['ok'] for r in results))
+        self.assertLessEqual(ProbeHandler.max_active, 5)
+        # 30 requests by 50 ms with 5 simultaneous requests, serial execution would take 1.5 s
+        self.assertLess(time.monotonic() - started_at, 1.2)
+
+    def test_run_in_threads(self):
+        report = custom_reporter.ConcurrentReport('item', report_name='async_checks_test')
+
+        def probe(item):
+            if item == 3:
+                raise ValueError('broken')
+            report.append('check', 'OK', item=item)
+            return item * 2
+
+        results = async_checks.run_in_threads(probe, range(100), concurrency=8)
+        self.assertEqual(results[10], 20)
+        self.assertIsInstance(results[3], ValueError)
+        self.assertEqual(len(report.dict()['values']), 99)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import check_budget  # noqa: E402
+
+# papermill stand-in: runs "kernel" as a child process and fails when the kernel dies
+PAPERMILL = 'import subprocess, sys; sys.exit(1 if subprocess.call([sys.executable, "-c", sys.argv[1]]) else 0)'
+ALLOCATING_KERNEL = 'import time; data = bytearray(300 * 2 ** 20); time.sleep(60)'
+BUSY_KERNEL = 'while True: pass'
+SLEEPING_KERNEL = 'import time; time.sleep(60)'
+FAST_KERNEL = 'print("done")'
+
+
+class CheckBudgetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.budget_file = os.path.join(self.directory, '.budget', 'check_1.json')
+        self.notebook_path = os.path.join(self.directory, 'check.ipynb')
+        nb = {'metadata': {}, 'cells': [{'cell_type': 'code', 'source': [], 'metadata': {}, 'outputs': [
+            {'output_type': 'display_data', 'metadata': {'scrapbook': {'name': 'report'}}, 'data': {
+                check_budget.SCRAPBOOK_MIME: {'name': 'report', 'data': {
+                    'name': 'pods', 'values': [], 'isExceptionOccured': False}, 'encoder': 'json', 'version': 1}}}]}]}
+        with open(self.notebook_path, 'w') as f:
+            json.dump(nb, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_kernel(self, kernel: str, **budget) -> tuple:
+        limits = {check_budget.MEMORY: None, check_budget.CPU: None, check_budget.DEADLINE: None}
+        limits.update(budget)
+        started_at = time.monotonic()
+        exit_code = check_budget.run_within_budget(self.budget_file, self.notebook_path,
+                                                   [sys.executable, '-c', PAPERMILL, kernel], limits)
+        with open(self.budget_file, 'r') as f:
+            return exit_code, json.load(f), time.monotonic() - started_at
+
+    def load_report_scrap(self) -> dict:
+        with open(self.notebook_path, 'r') as f:
+            nb = json.load(f)
+        return nb['cells'][0]['outputs'][0]['data'][check_budget.SCRAPBOOK_MIME]['data']
+
+    def test_check_within_budget_is_accounted(self):
+        exit_code, usage, seconds = self.run_kernel(FAST_KERNEL, memory=1024, cpu=60, deadline=60)
+
+        self.assertEqual(0, exit_code)
+        self.assertIsNone(usage['exceeded'])
+        self.assertGreater(usage['peak_rss_kb'], 0)
+        self.assertGreater(usage['cpu_seconds'], 0)
+        # short checks are not delayed by sampling interval
+        self.assertLess(seconds, 5)
+        self.assertFalse(self.load_report_scrap()['isExceptionOccured'])
+
+    def test_kernel_exceeding_memory_is_killed(self):
+        exit_code, usage, seconds = self.run_kernel(ALLOCATING_KERNEL, memory=100)
+
+        self.assertEqual(1, exit_code)
+        self.assertEqual(check_budget.MEMORY, usage['exceeded'])
+        self.assertGreater(usage['peak_rss_kb'], 100 * 1024)
+        self.assertLess(seconds, 30)
+        self.assertTrue(self.load_report_scrap()['isExceptionOccured'])
+
+    def test_kernel_exceeding_cpu_time_is_killed(self):
+        exit_code, usage, seconds = self.run_kernel(BUSY_KERNEL, cpu=1)
+
+        self.assertEqual(1, exit_code)
+        self.assertEqual(check_budget.CPU, usage['exceeded'])
+        self.assertGreaterEqual(usage['cpu_seconds'], 1)
+        self.assertLess(seconds, 30)
+
+    def test_kernel_exceeding_deadline_is_killed(self):
+        exit_code, usage, seconds = self.run_kernel(SLEEPING_KERNEL, deadline=1)
+
+        self.assertEqual(1, exit_code)
+        self.assertEqual(check_budget.DEADLINE, usage['exceeded'])
+        self.assertLess(usage['cpu_seconds'], 1)
+        self.assertLess(seconds, 30)
+
+    def test_process_tree_usage(self):
+        processes = {1: (0, 10, 0.5), 10: (1, 100, 1.0), 11: (10, 200, 2.0), 12: (11, 300, 3.0), 20: (1, 1000, 9.0)}
+        pids, rss_kb, cpu_seconds = check_budget.get_tree_usage(10, processes)
+        self.assertEqual(10, pids[0])
+        self.assertEqual({10, 11, 12}, set(pids))
+        self.assertEqual((600, 6.0), (rss_kb, cpu_seconds))
+        self.assertEqual(([], 0, 0), check_budget.get_tree_usage(99, processes))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import sys
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import check_history  # noqa: E402
+
+
+class CheckHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.checks = [{'path': f'notebook_{i}.ipynb', 'params': {}} for i in range(4)]
+
+    def test_record_duration(self):
+        phases = [{'name': 'execute', 'duration_ms': 1500}, {'name': 'cell', 'duration_ms': 700, 'part_of': 'execute'},
+                  {'name': 'report', 'duration_ms': 500}]
+        self.assertEqual(2000, check_history.get_record_duration({'phases': phases, 'metrics': []}))
+        self.assertEqual(300, check_history.get_record_duration({'metrics': [{'last_duration': 100},
+                                                                             {'last_duration': 300}]}))
+        self.assertIsNone(check_history.get_record_duration({'metrics': [{'last_duration': 'null'}]}))
+
+    def test_order_by_durations(self):
+        # the last check has no history and is considered as average one (2000)
+        durations = {check_history.get_check_key(self.checks[i]): d for i, d in enumerate([1000, 3000, 2000])}
+        indices = [0, 1, 2, 3]
+        self.assertEqual(check_history.order_checks(self.checks, indices, 'spt', durations), [0, 2, 3, 1])
+        self.assertEqual(check_history.order_checks(self.checks, indices, 'file', durations), indices)
+        self.assertEqual(check_history.predict_run_duration(self.checks, [0, 3], durations), 3000)
+
+    def test_order_without_history(self):
+        self.assertEqual(check_history.order_checks(self.checks, [2, 0], 'spt', {}), [2, 0])
+        self.assertIsNone(check_history.predict_run_duration(self.checks, [2, 0], {}))
+        # longest first does not shorten sequential run
+        for order in ('random', 'lpt'):
+            with self.assertRaises(ValueError):
+                check_history.order_checks(self.checks, [0], order, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import threading
+import time
+import unittest
+import sys
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import requests
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+if "/home/jovyan/tests/test_utils" not in sys.path:
+    sys.path.append("/home/jovyan/tests/test_utils")
+
+import check_timing  # noqa: E402
+import custom_reporter  # noqa: E402
+import json_parsing  # noqa: E402
+import report_storage  # noqa: E402
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CheckTimingTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), OkHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_wall_time_cpu_time_and_calls_are_measured(self):
+        with check_timing.CheckTiming() as timing:
+            time.sleep(0.05)
+            requests.get(self.url, timeout=5)
+            requests.get(self.url, timeout=5)
+
+        self.assertGreaterEqual(timing.wall_ms, 50)
+        # sleep does not consume CPU
+        self.assertLess(timing.cpu_ms, timing.wall_ms)
+        self.assertEqual(2, timing.calls)
+
+    def test_calls_of_other_threads_are_not_counted(self):
+        thread = threading.Thread(target=lambda: requests.get(self.url, timeout=5))
+        with check_timing.CheckTiming() as timing:
+            thread.start()
+            thread.join()
+
+        self.assertEqual(0, timing.calls)
+
+    def test_report_rows_get_timing_columns(self):
+        report = custom_reporter.Report('namespace', report_name='timed_report')
+        with report.timed('pods_ready', namespace='fast') as check:
+            check.value = 'OK'
+        with report.timed('pods_ready', namespace='slow') as check:
+            time.sleep(0.02)
+            requests.get(self.url, timeout=5)
+            check.value = 'FAILED not ready'
+
+        @report.timed('services', namespace='slow')
+        def check_services():
+            return 'OK'
+        self.assertEqual('OK', check_services())
+        with self.assertRaises(ValueError):
+            with report.timed('ingresses', namespace='slow'):
+                raise ValueError('no ingress')
+        report.append('manual', 'OK', namespace='untimed')
+
+        table = report_storage.report_to_table(report.dict())
+        self.assertEqual(['namespace', 'pods_ready', 'services', 'ingresses', 'manual', 'time_ms', 'cpu_ms',
+                          'outbound_calls'], list(table.columns))
+        slow = table[table['namespace'] == 'slow'].iloc[0]
+        self.assertEqual('ERROR no ingress', slow['ingresses'])
+        self.assertGreaterEqual(slow['time_ms'], 20)
+        self.assertEqual(1, slow['outbound_calls'])
+
+        ordered = check_timing.sort_by_time(table)
+        self.assertEqual(['slow', 'fast', 'untimed'], list(ordered['namespace']))
+
+    def test_concurrent_report_is_timed_from_threads(self):
+        report = custom_reporter.ConcurrentReport('namespace', report_name='timed_report')
+
+        def check(i):
+            with report.timed('check', namespace=f'namespace-{i}') as timing:
+                requests.get(self.url, timeout=5)
+                timing.value = 'OK'
+        threads = [threading.Thread(target=check, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        rows = report.dict()['values']
+        self.assertEqual(8, len(rows))
+        self.assertTrue(all(row['timings']['check']['outbound_calls'] == 1 for row in rows))
+
+    def test_json_report_check_gets_time_exec(self):
+        json_report = json_parsing.JsonReport()
+        with json_report.timed_check('Checks the creation of .html', 'html report') as check:
+            check.status = 'Passed'
+        with self.assertRaises(AssertionError):
+            with json_report.timed_check('Checks the creation of .pdf'):
+                raise AssertionError('pdf is not created')
+
+        self.assertEqual(['Passed', 'Failed'], [check['status'] for check in json_report.checks])
+        self.assertEqual('pdf is not created', json_report.checks[1]['error_description'])
+        self.assertRegex(json_report.checks[0]['time_exec'], r'^\d+\.\d{3}s$')
+        self.assertEqual('Failed', json_report.overall_result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+
+import yaml
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import checkpoints  # noqa: E402
+
+
+class CheckpointsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.out_path = os.path.join(self.directory, 'out')
+        self.checkpoint_dir = os.path.join(self.directory, 'checkpoints', 'composite_run')
+        os.makedirs(self.out_path)
+        self.result_file_path = os.path.join(self.out_path, 'result.yaml')
+        self.notebook_path = os.path.join(self.out_path, 'test_notebook_1700000000000.ipynb')
+        with open(self.notebook_path, 'w') as f:
+            f.write('{}')
+        # externalised images of slimmed notebook
+        self.files_dir = os.path.join(self.out_path, 'test_notebook_1700000000000_files')
+        os.makedirs(self.files_dir)
+        with open(os.path.join(self.files_dir, 'image.png'), 'wb') as f:
+            f.write(b'png')
+        record = {'path': 'test_notebook.ipynb', 'outs': [self.notebook_path, self.files_dir], 'result': 'True',
+                  'params': {},
+                  'metrics': [{'report_namespace': 'ns', 'status': 0}]}
+        with open(self.result_file_path, 'w') as f:
+            yaml.dump({'checks': [record]}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_restore_after_output_is_removed(self):
+        checkpoints.save_checkpoint(self.checkpoint_dir, 0, self.result_file_path, self.out_path)
+        # the next attempt of the run starts with empty output, as prepareOutput cleans it
+        shutil.rmtree(self.out_path)
+        os.makedirs(self.out_path)
+        with open(self.result_file_path, 'w') as f:
+            yaml.dump({'checks': []}, f)
+
+        self.assertEqual(checkpoints.restore_checkpoint(self.checkpoint_dir, 0, self.result_file_path, self.out_path),
+                         'True')
+        self.assertTrue(os.path.isfile(self.notebook_path))
+        self.assertTrue(os.path.isfile(os.path.join(self.files_dir, 'image.png')))
+        with open(self.result_file_path, 'r') as f:
+            checks = yaml.safe_load(f)['checks']
+        self.assertEqual(checks[0]['outs'], [self.notebook_path, self.files_dir])
+        self.assertEqual(checks[0]['metrics'][0]['report_namespace'], 'ns')
+
+    def test_missing_checkpoint(self):
+        self.assertEqual(checkpoints.restore_checkpoint(self.checkpoint_dir, 1, self.result_file_path, self.out_path),
+                         '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import concurrent.futures
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+import sys
+
+import yaml
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import check_history  # noqa: E402
+import composite_sharding  # noqa: E402
+
+
+class CompositeShardingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.checks = [{'path': f'notebook_{i}.ipynb', 'params': {'namespace': f'ns-{i}'}} for i in range(7)]
+        self.composite_path = os.path.join(self.directory, 'composite.yaml')
+        with open(self.composite_path, 'w') as f:
+            yaml.dump({'checks': self.checks}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_every_check_is_selected_once(self):
+        selected = [composite_sharding.select_checks(self.composite_path, 3, index) for index in range(3)]
+        self.assertEqual(sorted(i for indices in selected for i in indices), list(range(7)))
+        # assignment is stable between pods and runs
+        self.assertEqual(selected[1], composite_sharding.select_checks(self.composite_path, 3, 1))
+
+    def test_cost_balanced_assignment(self):
+        durations = {check_history.get_check_key(check): (i + 1) * 100 for i, check in enumerate(self.checks)}
+        assignment = composite_sharding.assign_by_cost(self.checks, 3, durations)
+        loads = [sum((i + 1) * 100 for i, shard in enumerate(assignment) if shard == s) for s in range(3)]
+        self.assertEqual(sorted(loads), [900, 900, 1000])
+
+    def write_shard(self, out_path: str, shard: int, indices: list[int], result: int):
+        shard_path = os.path.join(out_path, f'shard_{shard}')
+        os.makedirs(shard_path)
+        with open(os.path.join(shard_path, 'result.yaml'), 'w') as f:
+            yaml.dump({'checks': [dict(self.checks[i], result='True', composite_index=i) for i in indices]}, f)
+        with open(os.path.join(shard_path, 'result.txt'), 'w') as f:
+            f.write(f'{result}\n')
+
+    def test_last_shard_merges_results(self):
+        out_path = os.path.join(self.directory, 'out')
+        self.write_shard(out_path, 0, [1, 2], 0)
+        self.write_shard(out_path, 1, [3, 0], 1)
+
+        # the first completed shard waits for the others
+        with concurrent.futures.ThreadPoolExecutor(1) as executor, \
+                mock.patch.object(composite_sharding, 'POLL_INTERVAL_SECONDS', 0.01):
+            first = executor.submit(composite_sharding.finish_shard, out_path, 2, 1, 'run', 10)
+            while not os.path.isfile(os.path.join(out_path, '.shards', 'run', 'done_1')):
+                time.sleep(0.01)
+            self.assertTrue(composite_sharding.finish_shard(out_path, 2, 0, 'run'))
+            self.assertFalse(first.result())
+        with open(os.path.join(out_path, 'result.yaml'), 'r') as f:
+            checks = yaml.safe_load(f)['checks']
+        self.assertEqual([c['path'] for c in checks], [f'notebook_{i}.ipynb' for i in range(4)])
+        self.assertEqual([c['shard'] for c in checks], [1, 0, 0, 1])
+        self.assertNotIn('composite_index', checks[0])
+        with open(os.path.join(out_path, 'result.txt'), 'r') as f:
+            self.assertEqual(f.read(), '1\n')
+
+    def test_completed_shards_are_merged_by_timeout(self):
+        out_path = os.path.join(self.directory, 'out')
+        self.write_shard(out_path, 0, [1, 2], 0)
+        self.write_shard(out_path, 2, [0], 0)
+
+        # shard 1 is not completed, e.g. its pod was evicted, shard 0 is slow
+        self.assertTrue(composite_sharding.finish_shard(out_path, 3, 2, 'run', timeout=0.1))
+        with open(os.path.join(out_path, 'result.yaml'), 'r') as f:
+            checks = yaml.safe_load(f)['checks']
+        # records of shard 0 are not merged, it has not completed yet
+        self.assertEqual([c['shard'] for c in checks], [2])
+        with open(os.path.join(out_path, 'result.txt'), 'r') as f:
+            self.assertEqual(f.read(), '1\n')
+        # shard completed after timeout does not merge again
+        self.assertFalse(composite_sharding.finish_shard(out_path, 3, 0, 'run', timeout=0.1))
+        with open(os.path.join(out_path, 'result.txt'), 'r') as f:
+            self.assertEqual(f.read(), '1\n')
+
+    def test_records_are_sorted_by_composite_index(self):
+        out_path = os.path.join(self.directory, 'out')
+        self.write_shard(out_path, 0, [2, 0, 1], 0)
+        result_file_path = os.path.join(out_path, 'shard_0', 'result.yaml')
+        with open(result_file_path, 'r') as f:
+            result = yaml.safe_load(f)
+        # record of check without index, e.g. single notebook
+        result['checks'].insert(0, {'path': 'other.ipynb'})
+        with open(result_file_path, 'w') as f:
+            yaml.dump(result, f)
+
+        composite_sharding.sort_result_file(os.path.join(out_path, 'shard_0'))
+        with open(result_file_path, 'r') as f:
+            checks = yaml.safe_load(f)['checks']
+        self.assertEqual([c['path'] for c in checks],
+                         ['notebook_0.ipynb', 'notebook_1.ipynb', 'notebook_2.ipynb', 'other.ipynb'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import base64
+import io
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+import unittest
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import env_checker_utils  # noqa: E402
+
+
+class ContentBase64Test(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, file_name: str, content: bytes) -> str:
+        path = os.path.join(self.directory, file_name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_chunked_content_is_the_same_as_whole_file_base64(self):
+        for size in (0, 1, 2, 3, 4, 1000, 3 * 1024 + 1):
+            content = os.urandom(size)
+            path = self.write('report.pdf', content)
+            expected = base64.b64encode(content).decode('ascii')
+            for use_mmap in (False, True):
+                chunks = list(env_checker_utils.iter_base64_chunks(path, chunk_size=100, use_mmap=use_mmap))
+                self.assertEqual(expected, b''.join(chunks).decode('ascii'), (size, use_mmap))
+            self.assertEqual(expected, env_checker_utils.get_pdf_base64(path))
+            self.assertEqual(expected, env_checker_utils.get_content_from_file(self.directory, 'report.pdf'))
+
+    def test_text_content_keeps_universal_newlines(self):
+        text = 'namespace: ü\r\nпроверка ✓\r\n' * 1000
+        path = self.write('report.html', text.encode('utf-8'))
+        # text files were read in text mode before, so CRLF is encoded as LF
+        expected = base64.b64encode(text.replace('\r\n', '\n').encode('utf-8')).decode('ascii')
+
+        self.assertEqual(expected, env_checker_utils.get_text_content_as_base64(path))
+        chunks = env_checker_utils.iter_base64_chunks(path, binary=False, chunk_size=10)
+        self.assertEqual(expected, b''.join(chunks).decode('ascii'))
+        self.assertIsNone(env_checker_utils.get_content_from_file_by_path(os.path.join(self.directory, 'none.html')))
+
+    def test_content_is_written_to_sink_and_lazy_handle(self):
+        content = os.urandom(10000)
+        path = self.write('report.pdf', content)
+        expected = base64.b64encode(content)
+
+        binary_sink = io.BytesIO()
+        self.assertEqual(len(expected), env_checker_utils.write_content_as_base64(path, binary_sink, chunk_size=999))
+        self.assertEqual(expected, binary_sink.getvalue())
+
+        lazy = env_checker_utils.get_content_from_file_by_path(path, lazy=True)
+        self.assertIsInstance(lazy, env_checker_utils.Base64Content)
+        text_sink = io.StringIO()
+        lazy.write_to(text_sink)
+        self.assertEqual(expected.decode('ascii'), text_sink.getvalue())
+        self.assertEqual(expected.decode('ascii'), str(lazy))
+
+    def test_peak_memory_is_bounded_by_chunk(self):
+        path = self.write('report.pdf', os.urandom(16 * 2 ** 20))
+        with open(os.devnull, 'wb') as sink:
+            tracemalloc.start()
+            env_checker_utils.write_content_as_base64(path, sink, chunk_size=2 ** 20, use_mmap=True)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        self.assertLess(peak, 4 * 2 ** 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import sys
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import json_schema_validation  # noqa: E402
+
+
+class JsonSchemaValidationTest(unittest.TestCase):
+
+    def test_valid_metrics(self):
+        metrics = [{"report_namespace": "ns", "status": 0, "last_run": 1700000000000, "last_duration": 10}]
+        self.assertEqual(json_schema_validation.get_app_metrics_schema_errors(metrics), [])
+        self.assertTrue(json_schema_validation.validate_app_metrics_schema_as_dict(metrics))
+
+    def test_structured_errors(self):
+        metrics = [{"report_namespace": "ns", "status": 2}, {"status": 0}]
+        errors = json_schema_validation.get_app_metrics_schema_errors(metrics)
+        self.assertEqual([e["path"] for e in errors], ["0/status", "1"])
+        self.assertEqual([e["validator"] for e in errors], ["maximum", "required"])
+        self.assertFalse(json_schema_validation.validate_app_metrics_schema_as_dict(metrics))
+
+    def test_bulk_validation(self):
+        namespaces = [{"report_namespace": f"ns-{i}", "status": i % 2} for i in range(5000)]
+        res = json_schema_validation.validate_app_metrics_bulk({
+            "valid.ipynb": namespaces,
+            "invalid.ipynb": namespaces + [{"report_namespace": "ns"}]
+        })
+        self.assertEqual(res["valid.ipynb"], [])
+        self.assertEqual(len(res["invalid.ipynb"]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
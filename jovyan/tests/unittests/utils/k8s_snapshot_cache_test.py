@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+import unittest
+import sys
+from unittest import mock
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import k8s_snapshot_cache  # noqa: E402
+
+
+def create_pod(namespace, name, labels):
+    return {"metadata": {"namespace": namespace, "name": name, "labels": labels}, "status": {"phase": "Running"}}
+
+
+class K8sSnapshotCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.previous_cache_dir = os.environ.get(k8s_snapshot_cache.CACHE_DIR_ENV)
+        os.environ[k8s_snapshot_cache.CACHE_DIR_ENV] = self.cache_dir.name
+        k8s_snapshot_cache._snapshots.clear()
+        # snapshot is written as if it was listed by the first check of the run, so API server is not called
+        pods = [
+            create_pod("ns-1", "app-1", {"app": "app", "tier": "backend"}),
+            create_pod("ns-1", "db-1", {"app": "db"}),
+            create_pod("ns-2", "app-2", {"app": "app", "tier": "frontend"})
+        ]
+        with open(os.path.join(self.cache_dir.name, "pods.json"), "w") as f:
+            json.dump({"kind": "pods", "namespace": None, "items": pods}, f)
+        with open(os.path.join(self.cache_dir.name, "pods.ns-1.json"), "w") as f:
+            json.dump({"kind": "pods", "namespace": "ns-1", "items": pods[:2]}, f)
+        with open(os.path.join(self.cache_dir.name, "namespaces.json"), "w") as f:
+            json.dump({"kind": "namespaces", "items": [{"metadata": {"name": "ns-1"}}, {"metadata": {"name": "ns-2"}}]},
+                      f)
+        status_dir = os.path.join(self.cache_dir.name, k8s_snapshot_cache.NAMESPACE_STATUS_DIR_NAME)
+        os.makedirs(status_dir)
+        for status_file in ("ns-2.exists", "ns-3.absent"):
+            open(os.path.join(status_dir, status_file), "w").close()
+
+    def tearDown(self):
+        if self.previous_cache_dir is None:
+            os.environ.pop(k8s_snapshot_cache.CACHE_DIR_ENV, None)
+        else:
+            os.environ[k8s_snapshot_cache.CACHE_DIR_ENV] = self.previous_cache_dir
+        k8s_snapshot_cache._snapshots.clear()
+        self.cache_dir.cleanup()
+
+    def test_filter_by_namespace(self):
+        self.assertEqual([p["metadata"]["name"] for p in k8s_snapshot_cache.get_pods("ns-1")], ["app-1", "db-1"])
+        self.assertEqual(len(k8s_snapshot_cache.get_pods()), 3)
+
+    def test_namespaced_snapshot_is_listed_once(self):
+        pods = [create_pod("ns-4", "app-4", {"app": "app"})]
+        with mock.patch.object(k8s_snapshot_cache, "_list_from_api", return_value=pods) as list_from_api:
+            self.assertEqual(k8s_snapshot_cache.get_pods("ns-4", label_selector="app=app"), pods)
+            self.assertEqual(k8s_snapshot_cache.get_pods("ns-4"), pods)
+        # only objects of the namespace are listed, cluster-wide snapshot is not used
+        list_from_api.assert_called_once_with("pods", "ns-4")
+        self.assertTrue(os.path.isfile(os.path.join(self.cache_dir.name, "pods.ns-4.json")))
+
+    def test_filter_by_label_selector(self):
+        pods = k8s_snapshot_cache.get_pods(label_selector="app=app,tier!=frontend")
+        self.assertEqual([p["metadata"]["name"] for p in pods], ["app-1"])
+        pods = k8s_snapshot_cache.get_pods(label_selector="!tier")
+        self.assertEqual([p["metadata"]["name"] for p in pods], ["db-1"])
+
+    def test_namespaces(self):
+        self.assertEqual(k8s_snapshot_cache.get_namespaces(), ["ns-1", "ns-2"])
+        self.assertTrue(k8s_snapshot_cache.namespace_exists("ns-2"))
+        self.assertFalse(k8s_snapshot_cache.namespace_exists("ns-3"))
+
+    def test_unsupported_kind(self):
+        with self.assertRaises(ValueError):
+            k8s_snapshot_cache.list_resources("secrets")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import nbformat
+import scrapbook as sb
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import matrix_runner  # noqa: E402
+
+
+def create_notebook(result_source: str = "all(x == 1 for x in result_list)") -> dict:
+    nb = nbformat.v4.new_notebook()
+    nb.metadata['kernelspec'] = {'name': 'python3', 'display_name': 'Python 3', 'language': 'python'}
+    nb.cells = [nbformat.v4.new_code_cell("import scrapbook as sb"),
+                nbformat.v4.new_code_cell("namespace = None", metadata={'tags': ['parameters']}),
+                nbformat.v4.new_markdown_cell("# Check"),
+                nbformat.v4.new_code_cell("if namespace == 'broken':\n    raise RuntimeError('no access')\n"
+                                          "result_list = [1]"),
+                nbformat.v4.new_code_cell("sb.glue('report', {'name': 'r', 'values': [namespace]})"),
+                nbformat.v4.new_code_cell(result_source, metadata={'tags': ['result']})]
+    return nbformat.from_dict(nb)
+
+
+class MatrixRunnerTest(unittest.TestCase):
+
+    def test_combinations_are_expanded_in_order_of_values(self):
+        self.assertEqual([{'namespace': 'a', 'mode': 'full', 'size': 1}, {'namespace': 'a', 'mode': 'full', 'size': 2},
+                          {'namespace': 'b', 'mode': 'full', 'size': 1}, {'namespace': 'b', 'mode': 'full', 'size': 2}],
+                         matrix_runner.get_combinations({'namespace': ['a', 'b'], 'mode': 'full', 'size': [1, 2]}))
+        for matrix in ({}, ['a', 'b'], {'namespace': []}):
+            with self.assertRaises(ValueError):
+                matrix_runner.get_combinations(matrix)
+
+    def test_body_is_copied_per_combination(self):
+        expanded = matrix_runner.build_matrix_notebook(create_notebook(), {'namespace': ['a', 'b']})
+        cells = expanded['cells']
+
+        # cells up to parameters cell are executed once
+        self.assertEqual(1, sum(c['source'] == 'import scrapbook as sb' for c in cells))
+        self.assertEqual(2, sum('# Check' == c['source'] for c in cells))
+        starts = [c['source'] for c in cells if c['source'].startswith(matrix_runner.GENERATED_MARKER + "\nnamespace")]
+        self.assertEqual(["namespace = 'a'", "namespace = 'b'"], [s.splitlines()[1] for s in starts])
+        # only the last cell is a result cell, copied result cells assign their value explicitly
+        result_cells = [i for i, c in enumerate(cells) if 'result' in c['metadata'].get('tags', [])]
+        self.assertEqual([len(cells) - 1], result_cells)
+        recorded = [c['source'] for c in cells if "_matrix_runs[-1]['result'] = all(" in c['source']]
+        self.assertEqual(2, len(recorded))
+        # exception in copied cell does not stop notebook, generated cells are not tagged
+        for cell in cells:
+            tags = cell['metadata'].get('tags', [])
+            if cell['cell_type'] == 'code' and not cell['source'].startswith(matrix_runner.GENERATED_MARKER):
+                self.assertEqual(matrix_runner.RAISES_EXCEPTION_TAG in tags, cell in cells[2:-1])
+        self.assertEqual(len(cells), len({c['id'] for c in cells}))
+        self.assertEqual(5, expanded['nbformat_minor'])
+
+    def test_result_cell_keeps_its_statements(self):
+        expanded = matrix_runner.build_matrix_notebook(create_notebook("ok = True\n(ok and\n len(result_list) == 1)"),
+                                                       {'namespace': ['a']})
+        recorded = [c['source'] for c in expanded['cells'] if "_matrix_runs[-1]['result'] = (" in c['source']]
+        self.assertEqual(["ok = True\n_matrix_runs[-1]['result'] = (ok and\n len(result_list) == 1)\n"
+                          "_matrix_runs[-1]['result']"], recorded)
+        for source in ("ok = True", "%time 1", ""):
+            with self.assertRaises(ValueError):
+                matrix_runner.build_matrix_notebook(create_notebook(source), {'namespace': ['a']})
+
+    def test_failed_combination_does_not_stop_the_others(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        input_path = os.path.join(directory, 'matrix.ipynb')
+        output_path = os.path.join(directory, 'out.ipynb')
+        nbformat.write(nbformat.from_dict(matrix_runner.build_matrix_notebook(
+            create_notebook(), {'namespace': ['a', 'broken', 'c']})), input_path)
+
+        # papermill fails, but the notebook is executed to the end
+        process = subprocess.run(['papermill', input_path, output_path, '--no-progress-bar'], capture_output=True)
+        self.assertNotEqual(0, process.returncode)
+
+        scraps = sb.read_notebook(output_path).scraps
+        self.assertEqual(['a', 'c'], scraps['report'].data['values'])
+        self.assertEqual([0, 1, 0], [m['status'] for m in scraps['metrics'].data])
+        self.assertEqual([True, False, True], [run['result'] for run in scraps['matrix'].data])
+        self.assertEqual([None, 'RuntimeError: no access', None], [run['exception'] for run in scraps['matrix'].data])
+        result_cell = nbformat.read(output_path, as_version=4).cells[-1]
+        self.assertEqual('False', result_cell.outputs[0]['data']['text/plain'])
+
+
+if __name__ == '__main__':
+    unittest.main()
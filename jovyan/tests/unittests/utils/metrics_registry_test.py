@@ -0,0 +1,76 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import metrics_registry  # noqa: E402
+
+STATUS = metrics_registry.ENVCHECKER_SOLUTION_CORRECTNESS_STATUS
+LAST_RUN = metrics_registry.ENVCHECKER_SOLUTION_CORRECTNESS_LAST_RUN
+
+
+class MetricsRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.spool_path = os.path.join(self.directory, 'spool.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_latest_value_of_series_is_rendered(self):
+        registry = metrics_registry.MetricsRegistry(self.spool_path)
+        self.assertEqual('', registry.render())
+
+        metrics_registry.spool_series([(STATUS, {'report_name': 'a'}, 0), (LAST_RUN, {'report_name': 'a'}, 1)],
+                                      self.spool_path)
+        metrics_registry.spool_series([(STATUS, {'report_name': 'a'}, 1), (STATUS, {'report_name': 'b'}, 0),
+                                       (LAST_RUN, {'report_name': 'a'}, 1761000000123)], self.spool_path)
+        text = registry.render()
+
+        self.assertEqual(f'# TYPE {LAST_RUN} gauge\n'
+                         f'{LAST_RUN}{{report_name="a"}} 1761000000123\n'
+                         f'# TYPE {STATUS} gauge\n'
+                         f'{STATUS}{{report_name="a"}} 1\n'
+                         f'{STATUS}{{report_name="b"}} 0\n', text)
+        # nothing is changed, the same rendered text is returned
+        self.assertIs(text, registry.render())
+
+    def test_labels_are_escaped_and_none_values_are_skipped(self):
+        registry = metrics_registry.MetricsRegistry(self.spool_path)
+        registry.update([(STATUS, {'report_name': 'a "b"\\c', 'env': None}, 1.5), (LAST_RUN, {}, None)])
+
+        self.assertEqual(f'# TYPE {STATUS} gauge\n{STATUS}{{report_name="a \\"b\\"\\\\c"}} 1.5\n', registry.render())
+
+    def test_partially_written_and_broken_lines_are_skipped(self):
+        registry = metrics_registry.MetricsRegistry(self.spool_path)
+        with open(self.spool_path, 'w') as f:
+            f.write('not a json\n')
+            f.write(json.dumps({'series': [[STATUS, {}, 1]]}))
+        self.assertEqual('', registry.render())
+
+        with open(self.spool_path, 'a') as f:
+            f.write('\n')
+        self.assertEqual(f'# TYPE {STATUS} gauge\n{STATUS} 1\n', registry.render())
+
+    def test_spool_is_compacted_to_latest_values(self):
+        registry = metrics_registry.MetricsRegistry(self.spool_path, spool_max_bytes=1024)
+        for i in range(100):
+            metrics_registry.spool_series([(STATUS, {'report_name': f'check_{i % 3}'}, i)], self.spool_path)
+        text = registry.render()
+
+        self.assertLessEqual(os.path.getsize(self.spool_path), 1024)
+        metrics_registry.spool_series([(STATUS, {'report_name': 'check_0'}, 100)], self.spool_path)
+        self.assertIn(f'{STATUS}{{report_name="check_0"}} 100\n', registry.render())
+        # a new registry (e.g. after restart of Jupyter server) restores all series from compacted spool
+        restarted = metrics_registry.MetricsRegistry(self.spool_path).render()
+        self.assertEqual(text.replace('"check_0"} 99', '"check_0"} 100'), restarted)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import base64
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+
+import nbformat
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import output_slimming  # noqa: E402
+
+
+class OutputSlimmingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.notebook_path = os.path.join(self.directory, 'executed_check_1700000000000.ipynb')
+        image = base64.b64encode(os.urandom(64 * 1024)).decode('ascii')
+        scrap_data = {'name': 'report', 'data': {'rows': 1}, 'encoder': 'json', 'version': 1}
+        scrap = {'application/scrapbook.scrap.json+json': scrap_data}
+        nb = nbformat.v4.new_notebook()
+        nb.metadata['papermill'] = {'duration': 1.5}
+        nb.metadata['widgets'] = {'application/vnd.jupyter.widget-state+json': {'state': {}}}
+        loop_cell = nbformat.v4.new_code_cell('for i in range(1000): print("waiting")')
+        loop_cell.outputs = [nbformat.v4.new_output('stream', name='stdout', text='waiting\n' * 500),
+                             nbformat.v4.new_output('stream', name='stdout', text='waiting\n' * 500 + 'x' * 50000)]
+        plot_cell = nbformat.v4.new_code_cell('plot()')
+        plot_cell.outputs = [nbformat.v4.new_output('display_data', data={'image/png': image,
+                                                                          'text/plain': '<Figure>'}),
+                             nbformat.v4.new_output('display_data', data=scrap,
+                                                    metadata={'scrapbook': {'name': 'report', 'data': True}})]
+        result_cell = nbformat.v4.new_code_cell('result', metadata={'tags': ['result']})
+        result_cell.outputs = [nbformat.v4.new_output('execute_result', data={'text/plain': 'True'},
+                                                      execution_count=3)]
+        nb.cells = [loop_cell, plot_cell, result_cell]
+        nbformat.write(nb, self.notebook_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_slim_notebook(self):
+        before, after = output_slimming.slim_notebook(self.notebook_path, max_stream_chars=1000)
+        self.assertLess(after, before / 10)
+        nb = nbformat.read(self.notebook_path, as_version=4)
+        stream = nb.cells[0].outputs
+        self.assertEqual(len(stream), 1)
+        self.assertTrue(stream[0].text.startswith('waiting\n... previous line is repeated 999 more times\n'))
+        self.assertIn('characters are truncated', stream[0].text)
+        self.assertNotIn('image/png', nb.cells[1].outputs[0].data)
+        self.assertIn('dropped from notebook]', nb.cells[1].outputs[0].data['text/plain'])
+        self.assertIn('application/scrapbook.scrap.json+json', nb.cells[1].outputs[1].data)
+        self.assertNotIn('widgets', nb.metadata)
+        self.assertEqual(nb.metadata['papermill'], {'duration': 1.5})
+        # result cell is read by parseOut.py as the first line of its output
+        with open(self.notebook_path, 'r') as f:
+            self.assertEqual(json.load(f)['cells'][2]['outputs'][0]['data']['text/plain'], ['True'])
+
+    def test_dropped_image_refers_to_pdf_report(self):
+        open(self.notebook_path.replace('.ipynb', '.pdf'), 'w').close()
+        output_slimming.slim_notebook(self.notebook_path)
+        nb = nbformat.read(self.notebook_path, as_version=4)
+        self.assertIn('dropped from notebook, see PDF report', nb.cells[1].outputs[0].data['text/plain'])
+
+    def test_externalise_images(self):
+        output_slimming.slim_notebook(self.notebook_path, images='externalise')
+        files_dir = output_slimming.get_files_dir(self.notebook_path)
+        self.assertEqual(self.notebook_path.replace('.ipynb', '_files'), files_dir)
+        self.assertEqual(len(os.listdir(files_dir)), 1)
+        nb = nbformat.read(self.notebook_path, as_version=4)
+        self.assertIn('externalised to executed_check_1700000000000_files/', nb.cells[1].outputs[0].data['text/plain'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import base64
+import gzip
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import unittest
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import custom_reporter  # noqa: E402
+import paged_html_report  # noqa: E402
+import report_export  # noqa: E402
+
+
+def write_notebook(path: str, report: dict):
+    # the same output as scrapbook.glue('report', report.dict()) produces
+    output = {'output_type': 'display_data', 'metadata': {'scrapbook': {'name': 'report', 'data': True}},
+              'data': {'application/scrapbook.scrap.json+json': {
+                  'name': 'report', 'data': report, 'encoder': 'json', 'version': 1}}}
+    nb = {'cells': [{'cell_type': 'code', 'execution_count': 1, 'id': 'report', 'source': '', 'metadata': {},
+                     'outputs': [output]}],
+          'metadata': {'kernelspec': {'name': 'python3', 'display_name': 'Python 3', 'language': 'python'}},
+          'nbformat': 4, 'nbformat_minor': 5}
+    with open(path, 'w') as f:
+        json.dump(nb, f)
+
+
+def load_payload(path: str) -> list:
+    with open(path, 'r') as f:
+        document = f.read()
+    payload = re.search(r'<script type="application/gzip" id="payload">(.*?)</script>', document, re.S).group(1)
+    return [json.loads(line) for line in gzip.decompress(base64.b64decode(payload)).decode('utf-8').splitlines()]
+
+
+class PagedHtmlReportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        pods = custom_reporter.Report('namespace', report_name='pods')
+        for i in range(1000):
+            pods.append('ready', 'OK' if i % 10 else 'FAILED <b>not ready</b>', namespace=f'namespace-{i}')
+        interrupted = custom_reporter.Report('namespace', report_name='pods')
+        interrupted.append('ready', 'OK', namespace='last')
+        interrupted_report = interrupted.dict()
+        interrupted_report['isExceptionOccured'] = True
+        services = custom_reporter.Report('service', report_name='<services>')
+        services.append('endpoints', 'NONE', service='web')
+        self.notebooks = []
+        for i, report in enumerate([pods.dict(), interrupted_report, services.dict()]):
+            self.notebooks.append(os.path.join(self.directory, f'check_{i}.ipynb'))
+            write_notebook(self.notebooks[-1], report)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_rows_are_embedded_as_compressed_lines(self):
+        paths = paged_html_report.write_paged_reports(self.notebooks, self.directory)
+        self.assertEqual([os.path.join(self.directory, 'pods.html'), os.path.join(self.directory, '<services>.html')],
+                         paths)
+
+        lines = load_payload(paths[0])
+        schema_id = report_export.get_schema_id(['namespace', 'ready'])
+        self.assertEqual({'schema': schema_id, 'columns': ['namespace', 'ready']}, lines[0])
+        self.assertEqual({'schema': schema_id, 'notebook': self.notebooks[0]}, lines[1])
+        self.assertEqual({'schema': schema_id, 'values': ['namespace-0', 'FAILED <b>not ready</b>']}, lines[2])
+        self.assertEqual({'schema': schema_id, 'notebook': self.notebooks[1], 'isExceptionOccured': True},
+                         lines[1002])
+        self.assertEqual(1004, len(lines))
+
+    def test_document_size_does_not_depend_on_rendering(self):
+        paths = paged_html_report.write_paged_reports(self.notebooks, self.directory)
+        with open(paths[0], 'r') as f:
+            document = f.read()
+        # rows are rendered by script, values are never parsed as HTML
+        self.assertNotIn('<b>not ready</b>', document)
+        self.assertNotIn('<td>', document)
+        self.assertIn('Loading 1001 rows', document)
+        self.assertLess(len(document), 32 * 1024)
+
+        with open(paths[1], 'r') as f:
+            document = f.read()
+        self.assertIn('<title>&lt;services&gt;</title>', document)
+        lines = load_payload(paths[1])
+        self.assertEqual({'service': 'web', 'endpoints': 'NONE'}, dict(zip(lines[0]['columns'], lines[2]['values'])))
+
+
+if __name__ == '__main__':
+    unittest.main()
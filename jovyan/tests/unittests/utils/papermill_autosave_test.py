@@ -0,0 +1,78 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+import sys
+
+import nbformat
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import papermill_autosave  # noqa: E402
+
+
+class PapermillAutosaveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.notebook_path = os.path.join(self.directory, 'loop_check.ipynb')
+        nb = nbformat.v4.new_notebook()
+        nb.cells = [nbformat.v4.new_code_cell(f"print('row {i}')") for i in range(20)]
+        nb.metadata['kernelspec'] = {'name': 'python3', 'display_name': 'Python 3', 'language': 'python'}
+        nbformat.write(nb, self.notebook_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def execute(self, policy: str, notebook_path: str = None, options: list[str] = ()) -> tuple:
+        name = policy.replace(':', '_')
+        out_path = os.path.join(self.directory, f'out_{name}.ipynb')
+        phases_file = os.path.join(self.directory, f'{name}.jsonl')
+        process = subprocess.run(['python', papermill_autosave.__file__, policy, notebook_path or self.notebook_path,
+                                  out_path, '--no-progress-bar', *options],
+                                 env=dict(os.environ, ENVCHECKER_PHASES_FILE=phases_file),
+                                 capture_output=True, text=True, check=True)
+        with open(out_path, 'r') as f:
+            # kernel can split printed line into several stream outputs
+            outputs = [''.join(''.join(o['text']) for o in cell['outputs'] if o['output_type'] == 'stream')
+                       for cell in json.load(f)['cells']]
+        if notebook_path is None:
+            self.assertEqual(outputs[-1], 'row 19\n')
+        with open(phases_file, 'r') as f:
+            phase = json.loads(f.readline())
+        self.assertIn(f'autosave policy {policy}', process.stderr)
+        return phase['writes'], phase['skipped_writes']
+
+    def test_policies(self):
+        # papermill writes notebook on start, before and after every cell and twice at the end
+        self.assertEqual(self.execute('every'), (43, 0))
+        self.assertEqual(self.execute('end')[0], 1)
+        writes, skipped = self.execute('cells:5')
+        self.assertEqual(writes + skipped, 43)
+        self.assertEqual(writes, 5)
+
+    def test_long_running_cell_is_saved(self):
+        notebook_path = os.path.join(self.directory, 'long_check.ipynb')
+        nb = nbformat.v4.new_notebook()
+        nb.cells = [nbformat.v4.new_code_cell("import time\nfor i in range(8):\n    print(i, flush=True)\n"
+                                              "    time.sleep(0.5)")]
+        nb.metadata['kernelspec'] = {'name': 'python3', 'display_name': 'Python 3', 'language': 'python'}
+        nbformat.write(nb, notebook_path)
+        # cells policy does not suppress papermill saves of running cell, 'end' policy does
+        options = ['--autosave-cell-every', '1']
+        end_writes = self.execute('end', notebook_path, options)[0]
+        self.assertEqual(end_writes, 1)
+        self.assertGreater(self.execute('cells:100', notebook_path, options)[0], end_writes)
+
+    def test_invalid_policy(self):
+        for policy in ('cells:0', 'interval', 'always'):
+            with self.assertRaises(ValueError):
+                papermill_autosave.parse_policy(policy)
+        self.assertEqual(papermill_autosave.parse_policy('interval:30'), ('interval', 30))
+
+
+if __name__ == '__main__':
+    unittest.main()
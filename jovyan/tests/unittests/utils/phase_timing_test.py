@@ -0,0 +1,99 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import yaml
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import phase_timing  # noqa: E402
+
+ALLOCATING_COMMAND = [sys.executable, '-c', 'data = bytearray(64 * 2 ** 20); data[::4096] = b"x" * len(data[::4096])']
+
+
+class PhaseTimingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.phases_dir = os.path.join(self.directory, '.phases')
+        self.phases_file = os.path.join(self.phases_dir, 'check_1.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_notebook(self, name: str) -> str:
+        path = os.path.join(self.directory, name)
+        nb = {'metadata': {'papermill': {'start_time': '2026-01-01T10:00:00.000000'}}, 'cells': [
+            {'cell_type': 'code', 'metadata': {'papermill': {'start_time': '2026-01-01T10:00:01.500000'}}}]}
+        with open(path, 'w') as f:
+            json.dump(nb, f)
+        return path
+
+    def test_phase_record_has_resource_usage_of_command(self):
+        self.assertEqual(0, phase_timing.run_phase(self.phases_file, 'papermill', ALLOCATING_COMMAND))
+        self.assertEqual(3, phase_timing.run_phase(self.phases_file, 'pdf', [sys.executable, '-c', 'exit(3)']))
+        self.assertEqual(127, phase_timing.run_phase(self.phases_file, 's3', [os.path.join(self.directory, 'none')]))
+
+        phases = phase_timing.load_phases(self.phases_file)
+        self.assertEqual(['papermill', 'pdf'], [p['phase'] for p in phases])
+        # peak RSS of waited child, not of the test process
+        self.assertGreater(phases[0]['peak_rss_kb'], 64 * 1024)
+        self.assertGreater(phases[0]['duration_ms'], 0)
+        self.assertEqual([0, 3], [p['exit_code'] for p in phases])
+
+    def test_phases_are_attached_once_at_the_end_of_run(self):
+        executed = [self.write_notebook(f'check_{i}_1.ipynb') for i in range(3)]
+        checks = [{'path': f'check_{i}.ipynb', 'outs': [executed[i], f'{executed[i]}.pdf'], 'result': 'True'}
+                  for i in range(3)]
+        # the last check is restored from cache, its phases are kept
+        checks[2]['phases'] = [{'phase': 'papermill', 'duration_ms': 5.0}]
+        result_file_path = os.path.join(self.directory, 'result.yaml')
+        with open(result_file_path, 'w') as f:
+            yaml.dump({'checks': checks}, f)
+        for i in range(2):
+            phase_timing.append_phase(phase_timing.get_check_phases_file(self.phases_dir, executed[i]),
+                                      {'phase': 'papermill', 'duration_ms': 2000.0 * (i + 1)})
+
+        self.assertEqual(2, phase_timing.attach_phases_to_result_file(result_file_path, self.phases_dir))
+        with open(result_file_path, 'r') as f:
+            checks = yaml.safe_load(f)['checks']
+        self.assertEqual(['papermill', phase_timing.KERNEL_START_PHASE], [p['phase'] for p in checks[0]['phases']])
+        self.assertEqual(1500.0, checks[0]['phases'][1]['duration_ms'])
+        self.assertEqual(4000.0, checks[1]['phases'][0]['duration_ms'])
+        self.assertEqual([{'phase': 'papermill', 'duration_ms': 5.0}], checks[2]['phases'])
+        self.assertEqual([], os.listdir(self.phases_dir))
+
+    def test_summary_shares_exclude_kernel_start(self):
+        checks = [{'phases': [{'phase': 'papermill', 'duration_ms': 3000.0, 'peak_rss_kb': 2048, 'processes': 5},
+                              {'phase': 'pdf', 'duration_ms': 1000.0, 'peak_rss_kb': 1024, 'processes': 2},
+                              {'phase': phase_timing.KERNEL_START_PHASE, 'duration_ms': 500.0,
+                               'part_of': 'papermill'}]},
+                  {'phases': [{'phase': 'papermill', 'duration_ms': 4000.0, 'peak_rss_kb': 4096, 'processes': 5}]}]
+        rows = phase_timing.summarize_phases(checks)
+        self.assertEqual(['papermill', 'pdf', phase_timing.KERNEL_START_PHASE], [r['phase'] for r in rows])
+        papermill = rows[0]
+        self.assertEqual((2, 7000.0, 3500.0, 4000.0, 4096),
+                         tuple(papermill[key] for key in ('count', 'total_ms', 'mean_ms', 'max_ms', 'max_rss_kb')))
+
+        result_file_path = os.path.join(self.directory, 'result.yaml')
+        with open(result_file_path, 'w') as f:
+            yaml.dump({'checks': checks}, f)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            phase_timing.print_summary(result_file_path)
+        lines = {line.split()[0]: line.split() for line in output.getvalue().splitlines()[2:]}
+        self.assertEqual('88%', lines['papermill'][5])
+        self.assertEqual('12%', lines['pdf'][5])
+        # kernel start is a part of papermill phase, it has no share
+        self.assertEqual(7, len(lines[phase_timing.KERNEL_START_PHASE]))
+        self.assertEqual(8, len(lines['pdf']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import profiling_report_generator  # noqa: E402
+
+
+def write_notebook(path: str, durations: list):
+    cells = [{'cell_type': 'markdown', 'id': 'title', 'metadata': {}, 'source': '# Title'}]
+    for i, duration in enumerate(durations):
+        cells.append({'cell_type': 'code', 'id': f'cell-{i}', 'source': f'step_{i}()',
+                      'metadata': {'tags': ['parameters'] if i == 0 else [],
+                                   'papermill': {'duration': duration, 'exception': False}}})
+    with open(path, 'w') as f:
+        json.dump({'cells': cells, 'metadata': {}}, f)
+
+
+class ProfilingReportGeneratorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_notebook_base_name_has_no_timestamp_and_extension(self):
+        self.assertEqual('pods_check', profiling_report_generator.get_notebook_base_name(
+            '/home/jovyan/out/pods_check_1792426540890.ipynb'))
+        self.assertEqual('pods_check', profiling_report_generator.get_notebook_base_name('out/pods_check.ipynb'))
+        self.assertEqual('check_v2', profiling_report_generator.get_notebook_base_name('check_v2_17.ipynb'))
+
+    def test_profile_is_compared_with_baseline(self):
+        notebooks = [os.path.join(self.directory, 'pods_1.ipynb'), os.path.join(self.directory, 'pods_2.ipynb'),
+                     os.path.join(self.directory, 'services.ipynb')]
+        write_notebook(notebooks[0], [0.5, 3.0])
+        write_notebook(notebooks[1], [0.5, 1.0])
+        write_notebook(notebooks[2], [2.0])
+        baseline = {'pods:cell-1': 1.0, 'services:cell-0': 2.5}
+
+        cells = profiling_report_generator.process_notebook_files(notebooks, self.directory, baseline, {})
+
+        # the same notebook executed twice within a run gets its own keys
+        self.assertEqual(['pods:cell-0', 'pods:cell-1', 'pods#1:cell-0', 'pods#1:cell-1', 'services:cell-0'],
+                         [c['key'] for c in cells])
+        with open(os.path.join(self.directory, f'{profiling_report_generator.PROFILE_FILE_NAME}.json'), 'r') as f:
+            profile = json.load(f)
+        self.assertEqual(7.0, profile['total_duration'])
+        self.assertEqual(('pods:cell-1', 2.0), (profile['regressions'][0]['key'], profile['regressions'][0]['delta']))
+        self.assertEqual(1, len(profile['regressions']))
+        self.assertEqual('pods_1.ipynb', profile['by_notebook'][0]['notebook'])
+        self.assertEqual({'parameters': 3, profiling_report_generator.UNTAGGED: 2},
+                         {row['tag']: row['cells'] for row in profile['by_tag']})
+        self.assertTrue(os.path.isfile(
+            os.path.join(self.directory, f'{profiling_report_generator.PROFILE_FILE_NAME}.html')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import pyarrow.parquet as pq
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import custom_reporter  # noqa: E402
+import report_export  # noqa: E402
+
+
+def write_notebook(path: str, report: dict):
+    # the same output as scrapbook.glue('report', report.dict()) produces
+    output = {'output_type': 'display_data', 'metadata': {'scrapbook': {'name': 'report', 'data': True}},
+              'data': {'application/scrapbook.scrap.json+json': {
+                  'name': 'report', 'data': report, 'encoder': 'json', 'version': 1}}}
+    nb = {'cells': [{'cell_type': 'code', 'execution_count': 1, 'id': 'report', 'source': '', 'metadata': {},
+                     'outputs': [output]}],
+          'metadata': {'kernelspec': {'name': 'python3', 'display_name': 'Python 3', 'language': 'python'}},
+          'nbformat': 4, 'nbformat_minor': 5}
+    with open(path, 'w') as f:
+        json.dump(nb, f)
+
+
+class ReportExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        pods = custom_reporter.Report('namespace', report_name='pods')
+        pods.append('ready', 'OK', namespace='first')
+        pods.append('ready', 'FAILED not ready', namespace='second')
+        pods.append('restarts', 'OK', namespace='second')
+        # the same columns in other order and a timed check with another column set
+        other_pods = custom_reporter.Report('Namespace', report_name='pods')
+        other_pods.append('restarts', 'OK', Namespace='third')
+        other_pods.append('ready', 'OK', Namespace='third')
+        timed_pods = custom_reporter.Report('namespace', report_name='pods')
+        with timed_pods.timed('ready', namespace='fourth') as check:
+            check.value = 'OK'
+        services = custom_reporter.Report('service', report_name='services')
+        services.append('endpoints', 'OK', service='web')
+        self.notebooks = []
+        for i, report in enumerate([pods, other_pods, timed_pods, services]):
+            self.notebooks.append(os.path.join(self.directory, f'check_{i}.ipynb'))
+            write_notebook(self.notebooks[-1], report.dict())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_ndjson_export(self):
+        paths = report_export.export_reports(self.notebooks, self.directory, report_export.NDJSON_FORMAT)
+        self.assertEqual([os.path.join(self.directory, 'pods.ndjson'), os.path.join(self.directory, 'services.ndjson')],
+                         paths)
+        with open(paths[0], 'r') as f:
+            lines = [json.loads(line) for line in f]
+
+        schema_id = report_export.get_schema_id(['namespace', 'ready', 'restarts'])
+        timed_schema_id = report_export.get_schema_id(['namespace', 'ready', 'time_ms', 'cpu_ms', 'outbound_calls'])
+        self.assertEqual({'schema': schema_id, 'columns': ['namespace', 'ready', 'restarts']}, lines[0])
+        self.assertEqual({'schema': schema_id, 'notebook': self.notebooks[0]}, lines[1])
+        self.assertEqual({'schema': schema_id, 'values': ['first', 'OK', None]}, lines[2])
+        self.assertEqual({'schema': schema_id, 'values': ['second', 'FAILED not ready', 'OK']}, lines[3])
+        # columns of the second notebook are aligned to the schema of the first one
+        self.assertEqual({'schema': schema_id, 'notebook': self.notebooks[1]}, lines[4])
+        self.assertEqual({'schema': schema_id, 'values': ['third', 'OK', 'OK']}, lines[5])
+        self.assertEqual(timed_schema_id, lines[6]['schema'])
+        self.assertEqual(['namespace', 'ready', 'time_ms', 'cpu_ms', 'outbound_calls'], lines[6]['columns'])
+        self.assertEqual(['fourth', 'OK'], lines[8]['values'][:2])
+        self.assertEqual(9, len(lines))
+
+    def test_parquet_export(self):
+        paths = report_export.export_reports(self.notebooks, self.directory, report_export.PARQUET_FORMAT)
+        schema_id = report_export.get_schema_id(['namespace', 'ready', 'restarts'])
+        pods_path = os.path.join(self.directory, f'pods.{schema_id}.parquet')
+        self.assertIn(pods_path, paths)
+        self.assertEqual(3, len(paths))
+
+        parquet_file = pq.ParquetFile(pods_path)
+        # row group per notebook
+        self.assertEqual(2, parquet_file.num_row_groups)
+        table = parquet_file.read().to_pydict()
+        self.assertEqual([self.notebooks[0]] * 2 + [self.notebooks[1]], table[report_export.NOTEBOOK_COLUMN])
+        self.assertEqual(['first', 'second', 'third'], table['namespace'])
+        self.assertEqual([None, 'OK', 'OK'], table['restarts'])
+
+        timed_path = next(path for path in paths if path.startswith(os.path.join(self.directory, 'pods.'))
+                          and path != pods_path)
+        timed_table = pq.read_table(timed_path)
+        self.assertEqual('double', str(timed_table.schema.field('time_ms').type))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import custom_reporter  # noqa: E402
+import report_storage  # noqa: E402
+
+
+class ReportStorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def create_report(self, rows: int, offset: int = 0) -> dict:
+        report = custom_reporter.Report('namespace', 'pod', report_name='pods_report')
+        for i in range(offset, offset + rows):
+            report.append('Pod is ready', 'OK' if i % 3 else 'FAILED Pod is not ready', namespace='ns', pod=f'pod-{i}')
+            report.append('Restarts', 'OK', namespace='ns', pod=f'pod-{i}')
+        return report.dict()
+
+    def test_large_report_is_stored_in_sidecar(self):
+        report = self.create_report(100)
+        scrap = report_storage.store_report(report, self.directory, min_rows=50)
+        self.assertEqual(scrap['values'], [])
+        self.assertEqual(scrap['storage']['rows'], 100)
+        self.assertTrue(os.path.isfile(report_storage.get_sidecar_path(scrap, self.directory)))
+
+        table = report_storage.load_report_table(scrap, self.directory)
+        self.assertTrue(table.equals(report_storage.report_to_table(report)))
+        self.assertEqual(list(table.columns), ['namespace', 'pod', 'Pod is ready', 'Restarts'])
+        self.assertEqual(table.iloc[0]['Pod is ready'], 'FAILED Pod is not ready')
+
+    def test_sidecar_is_read_slice_by_slice(self):
+        report = self.create_report(100)
+        scrap = report_storage.store_report(report, self.directory, min_rows=50)
+        batches = list(report_storage.iter_report_batches(scrap, self.directory, batch_rows=40))
+        self.assertEqual([40, 40, 20], [len(batch) for batch in batches])
+        self.assertEqual([f'pod-{i}' for i in range(100)], [pod for batch in batches for pod in batch['pod']])
+        # reports kept in scrap are read at once
+        self.assertEqual([10], [len(batch) for batch in report_storage.iter_report_batches(self.create_report(10))])
+
+    def test_small_report_is_kept_in_scrap(self):
+        report = self.create_report(10)
+        self.assertIs(report_storage.store_report(report, self.directory, min_rows=50), report)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_merge_reports_of_matrix_combinations(self):
+        stored = report_storage.store_report(self.create_report(60), self.directory, min_rows=50)
+        merged = report_storage.merge_reports([stored, self.create_report(5, offset=60)], self.directory)
+        self.assertEqual(merged['storage']['rows'], 65)
+        # side-car files of combinations are replaced with the merged one
+        self.assertEqual(os.listdir(self.directory), [merged['storage']['path']])
+        self.assertEqual(list(report_storage.load_report_table(merged, self.directory)['pod'])[-1], 'pod-64')
+
+
+if __name__ == '__main__':
+    unittest.main()
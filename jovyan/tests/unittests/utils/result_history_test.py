@@ -0,0 +1,138 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import yaml
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import result_history  # noqa: E402
+
+NOW_MS = 1800000000000
+MINUTE_MS = 60 * 1000
+
+
+def get_metric(last_run: int, status: int, duration: int, namespace: str = 'first') -> dict:
+    # the same labels as run.sh extract_notebook_execution_metrics sets
+    return {'last_run': last_run, 'last_duration': duration, 'status': status, 'report_namespace': namespace,
+            'report_app': 'null', 'initiator': 'envchecker', 's3_link': 'null', 'env': 'null', 'scope': 'null',
+            'report_name': 'pods'}
+
+
+class ResultHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.directory, result_history.HISTORY_DB_NAME)
+        os.environ.pop('ENVCHECKER_HISTORY_RAW_DAYS', None)
+        os.environ.pop('ENVCHECKER_HISTORY_DAYS', None)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def record(self, run: int, metrics: list[dict], now_ms: int = NOW_MS) -> int:
+        result_file_path = os.path.join(self.directory, 'result.yaml')
+        with open(result_file_path, 'w') as f:
+            yaml.safe_dump({'checks': [{'path': '/home/jovyan/notebooks/pods.ipynb', 'result': 'True',
+                                        'params': {'namespace': 'first'}, 'metrics': metrics}]}, f)
+        return result_history.record_result_file(result_file_path, f'run-{run}', self.db_path, now_ms)
+
+    def query(self, function, **kwargs) -> list[dict]:
+        connection = result_history.connect(self.db_path)
+        try:
+            return function(connection, now_ms=NOW_MS, **kwargs)
+        finally:
+            connection.close()
+
+    def test_results_are_appended_once(self):
+        self.assertEqual(2, self.record(1, [get_metric(NOW_MS - MINUTE_MS, 0, 100),
+                                            get_metric(NOW_MS - MINUTE_MS, 1, 100, namespace='second')]))
+        # the same result restored from cache by the next run is not duplicated
+        self.assertEqual(1, self.record(2, [get_metric(NOW_MS - MINUTE_MS, 0, 100), get_metric(NOW_MS, 0, 300)]))
+
+        trend = self.query(result_history.get_trend, days=1)
+        self.assertEqual(1, len(trend))
+        self.assertEqual((3, 1), (trend[0]['runs'], trend[0]['failures']))
+        self.assertAlmostEqual(500 / 3, trend[0]['mean_ms'])
+        self.assertEqual(300, trend[0]['max_ms'])
+        self.assertEqual(1, self.query(result_history.get_trend, days=1, namespace='second')[0]['runs'])
+
+    def test_flaky_series_and_percentiles(self):
+        statuses = [0, 1, 0, 1, 0, 0, 0, 0, 0, 0]
+        for i, status in enumerate(statuses):
+            self.record(i, [get_metric(NOW_MS - (10 - i) * MINUTE_MS, status, (i + 1) * 100),
+                            get_metric(NOW_MS - (10 - i) * MINUTE_MS, 0, 50, namespace='stable')])
+
+        flaky = self.query(result_history.get_flakiness, days=1)
+        self.assertEqual(1, len(flaky))
+        self.assertEqual(('first', 10, 2, 4), (flaky[0]['namespace'], flaky[0]['runs'], flaky[0]['failures'],
+                                               flaky[0]['flips']))
+        self.assertAlmostEqual(4 / 9, flaky[0]['flip_rate'])
+
+        percentiles = self.query(result_history.get_duration_percentiles, days=1)
+        self.assertEqual(['first', 'stable'], [row['namespace'] for row in percentiles])
+        self.assertEqual((500, 900, 1000, 1000), tuple(percentiles[0][f'p{p}'] for p in (50, 90, 95, 99)))
+        self.assertEqual(50, percentiles[1]['p99'])
+
+    def test_durations_of_checks_are_smoothed(self):
+        self.record(1, [get_metric(NOW_MS - MINUTE_MS, 0, 1000)], now_ms=NOW_MS - MINUTE_MS)
+        self.record(2, [get_metric(NOW_MS, 0, 2500), get_metric(NOW_MS, 0, 3000, namespace='second')])
+        key = result_history.check_history.get_check_key({'path': '/home/jovyan/notebooks/pods.ipynb',
+                                                          'params': {'namespace': 'first'}})
+        # duration of check is the longest of its metrics
+        self.assertEqual({key: 2000}, result_history.load_durations(self.db_path))
+
+        # durations are removed with raw results
+        os.environ['ENVCHECKER_HISTORY_RAW_DAYS'] = '1'
+        self.record(3, [], now_ms=NOW_MS + 2 * result_history.DAY_MS)
+        self.assertEqual({}, result_history.load_durations(self.db_path))
+
+    def test_old_results_are_downsampled_and_removed(self):
+        os.environ['ENVCHECKER_HISTORY_RAW_DAYS'] = '2'
+        os.environ['ENVCHECKER_HISTORY_DAYS'] = '5'
+        for day in range(7):
+            then_ms = NOW_MS - day * result_history.DAY_MS
+            self.record(day * 2, [get_metric(then_ms, 0, 100)], now_ms=then_ms)
+            self.record(day * 2 + 1, [get_metric(then_ms + MINUTE_MS, 1, 300)], now_ms=then_ms + MINUTE_MS)
+        self.record(100, [get_metric(NOW_MS + 2 * MINUTE_MS, 0, 200)], now_ms=NOW_MS + 2 * MINUTE_MS)
+
+        connection = result_history.connect(self.db_path)
+        raw_days = [row[0] for row in connection.execute(
+            f'SELECT DISTINCT last_run / {result_history.DAY_MS} FROM results ORDER BY 1')]
+        daily = connection.execute('SELECT day, runs, failures, duration_sum, duration_min, duration_max, '
+                                   'duration_p50 FROM daily ORDER BY day').fetchall()
+        connection.close()
+        today = NOW_MS // result_history.DAY_MS
+        self.assertEqual([today - 2, today - 1, today], raw_days)
+        self.assertEqual(list(range(today - 5, today - 2)), [row['day'] for row in daily])
+        self.assertEqual((2, 1, 400, 100, 300, 100), tuple(daily[0])[1:])
+
+        # trend is continuous across downsampled and recent days
+        trend = self.query(result_history.get_trend, days=6)
+        self.assertEqual(6, len(trend))
+        self.assertEqual([2] * 5 + [3], [row['runs'] for row in trend])
+        self.assertEqual(200, trend[0]['mean_ms'])
+
+    def test_downsampled_day_is_merged_when_retention_is_increased(self):
+        os.environ['ENVCHECKER_HISTORY_RAW_DAYS'] = '1'
+        then_ms = NOW_MS - 3 * result_history.DAY_MS
+        self.record(1, [get_metric(then_ms, 0, 100)], now_ms=then_ms)
+        self.record(2, [get_metric(NOW_MS, 0, 100)])
+        # results of the downsampled day are accepted again and downsampled with the next run
+        os.environ['ENVCHECKER_HISTORY_RAW_DAYS'] = '5'
+        self.assertEqual(1, self.record(3, [get_metric(then_ms + MINUTE_MS, 1, 300)]))
+        os.environ['ENVCHECKER_HISTORY_RAW_DAYS'] = '1'
+        self.record(4, [get_metric(NOW_MS + MINUTE_MS, 0, 100)], now_ms=NOW_MS + MINUTE_MS)
+
+        connection = result_history.connect(self.db_path)
+        daily = connection.execute('SELECT runs, failures, duration_sum, duration_min, duration_max, duration_p50 '
+                                   'FROM daily').fetchall()
+        connection.close()
+        self.assertEqual([(2, 1, 400, 100, 300, 100)], [tuple(row) for row in daily])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+from unittest import mock
+
+import yaml
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import result_memo  # noqa: E402
+
+
+class ResultMemoTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.environment = mock.patch.dict(os.environ, {'ENVCHECKER_STATE_DIR': os.path.join(self.directory, 'state')})
+        self.environment.start()
+        self.notebook_path = os.path.join(self.directory, 'static_check.ipynb')
+        with open(self.notebook_path, 'w') as f:
+            json.dump({'cells': [], 'metadata': {'env-checker': {'cache_ttl': '1h'}}}, f)
+        self.fingerprint_path = os.path.join(self.directory, 'passport.yaml')
+        with open(self.fingerprint_path, 'w') as f:
+            f.write('version: 1\n')
+
+    def tearDown(self):
+        self.environment.stop()
+        shutil.rmtree(self.directory)
+
+    def execute(self, out_path: str, result: str = 'True'):
+        os.makedirs(out_path, exist_ok=True)
+        executed_path = os.path.join(out_path, 'static_check_1700000000000.ipynb')
+        with open(executed_path, 'w') as f:
+            f.write('{}')
+        record = {'path': self.notebook_path, 'outs': [executed_path], 'result': result, 'params': {},
+                  'metrics': [{'last_run': 1700000000000}]}
+        with open(os.path.join(out_path, 'result.yaml'), 'w') as f:
+            yaml.dump({'checks': [record]}, f)
+
+    def restore(self, out_path: str, composite_ttl=''):
+        os.makedirs(out_path, exist_ok=True)
+        result_file_path = os.path.join(out_path, 'result.yaml')
+        if not os.path.isfile(result_file_path):
+            with open(result_file_path, 'w') as f:
+                yaml.dump({'checks': []}, f)
+        return result_memo.restore(self.notebook_path, composite_ttl, {'namespace': 'ns'}, None,
+                                   self.fingerprint_path, result_file_path, out_path)
+
+    def test_restore_within_ttl(self):
+        first_out, second_out = os.path.join(self.directory, 'run_1'), os.path.join(self.directory, 'run_2')
+        ttl, key, result = self.restore(first_out)
+        self.assertEqual((ttl, result), (3600, ''))
+        self.execute(first_out)
+        self.assertTrue(result_memo.save(key, ttl, os.path.join(first_out, 'result.yaml'), first_out))
+
+        self.assertEqual(self.restore(second_out), (3600, key, 'True'))
+        with open(os.path.join(second_out, 'result.yaml'), 'r') as f:
+            record = yaml.safe_load(f)['checks'][0]
+        self.assertTrue(record['cached'])
+        self.assertEqual(record['metrics'][0]['last_run'], 1700000000000)
+        self.assertEqual(record['outs'], [os.path.join(second_out, 'static_check_1700000000000.ipynb')])
+        self.assertTrue(os.path.isfile(record['outs'][0]))
+
+    def test_changed_fingerprint_and_failed_check(self):
+        out_path = os.path.join(self.directory, 'run')
+        ttl, key, _ = self.restore(out_path)
+        self.execute(out_path, result='False')
+        self.assertFalse(result_memo.save(key, ttl, os.path.join(out_path, 'result.yaml'), out_path))
+        self.execute(out_path)
+        result_memo.save(key, ttl, os.path.join(out_path, 'result.yaml'), out_path)
+        with open(self.fingerprint_path, 'w') as f:
+            f.write('version: 2\n')
+        self.assertEqual(self.restore(os.path.join(self.directory, 'next_run'))[2], '')
+
+    def test_disabled_and_invalid_ttl(self):
+        self.assertEqual(self.restore(os.path.join(self.directory, 'run'), composite_ttl='0'), (0, '', ''))
+        with self.assertRaises(ValueError):
+            self.restore(os.path.join(self.directory, 'run'), composite_ttl='hour')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import run_manager  # noqa: E402
+
+# stands in for run.sh: records its arguments and the time it was running, exits with code of RUN_EXIT_CODE
+FAKE_RUN_SH = '''
+import json, os, sys, time
+started = time.time()
+time.sleep(float(os.environ['RUN_SECONDS']))
+with open(os.path.join(os.environ['RUNS_LOG_DIR'], os.environ['ENVCHECKER_RUN_ID'] + '.json'), 'w') as f:
+    json.dump({'args': sys.argv[1:], 'started': started, 'finished': time.time()}, f)
+sys.exit(int(os.environ.get('RUN_EXIT_CODE', '0')))
+'''
+
+
+class RunManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.runs_log_dir = os.path.join(self.directory, 'executed')
+        os.makedirs(self.runs_log_dir)
+        fake_run_sh = os.path.join(self.directory, 'run.py')
+        with open(fake_run_sh, 'w') as f:
+            f.write(FAKE_RUN_SH)
+        self.environ = dict(os.environ)
+        os.environ.update({
+            'ENVCHECKER_STATE_DIR': os.path.join(self.directory, 'state'),
+            run_manager.RUN_COMMAND_ENV: f'{sys.executable} {fake_run_sh}',
+            run_manager.MAX_RUNS_ENV: '2',
+            'RUNS_LOG_DIR': self.runs_log_dir,
+            'RUN_SECONDS': '1',
+            'PYTHONPATH': os.pathsep.join(sys.path),
+        })
+
+    def tearDown(self):
+        for run in run_manager.list_runs():
+            run_manager.cancel(run['run_id'])
+        os.environ.clear()
+        os.environ.update(self.environ)
+        shutil.rmtree(self.directory)
+
+    def wait_for_runs(self, timeout: float = 30) -> list[dict]:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            runs = run_manager.list_runs()
+            if all(run['status'] not in run_manager.ACTIVE_STATUSES for run in runs):
+                return runs
+            time.sleep(0.2)
+        self.fail(f'Runs are not finished: {runs}')
+
+    def executed(self, run_id: str) -> dict:
+        with open(os.path.join(self.runs_log_dir, f'{run_id}.json'), 'r') as f:
+            return json.load(f)
+
+    def write_cgroup(self, **files):
+        cgroup_root = os.path.join(self.directory, 'cgroup')
+        os.makedirs(cgroup_root, exist_ok=True)
+        for name, value in files.items():
+            with open(os.path.join(cgroup_root, name.replace('_', '.')), 'w') as f:
+                f.write(value + '\n')
+        return cgroup_root
+
+    def test_max_runs_are_derived_from_pod_limits(self):
+        del os.environ[run_manager.MAX_RUNS_ENV]
+        # 2.5 CPU and 3 GiB
+        cgroup_root = self.write_cgroup(cpu_max='250000 100000', memory_max=str(3 * 2 ** 30))
+        self.assertEqual(2, run_manager.get_max_runs(cgroup_root))
+        os.environ[run_manager.RUN_MEMORY_ENV] = '2048'
+        self.assertEqual(1, run_manager.get_max_runs(cgroup_root))
+
+        cgroup_root = self.write_cgroup(cpu_max='max 100000', memory_max='max')
+        self.assertEqual(os.cpu_count(), run_manager.get_max_runs(cgroup_root))
+        # limits less than one run still let runs execute one by one
+        cgroup_root = self.write_cgroup(cpu_max='50000 100000', memory_max='max')
+        self.assertEqual(1, run_manager.get_max_runs(cgroup_root))
+
+        os.environ[run_manager.MAX_RUNS_ENV] = '4'
+        self.assertEqual(4, run_manager.get_max_runs(cgroup_root))
+
+    def test_every_run_gets_own_workspace(self):
+        self.assertEqual(['-o', 'run-1', '-r', 'html', 'composite.yaml'],
+                         run_manager.get_workspace_args(['-r', 'html', 'composite.yaml'], 'run-1'))
+        self.assertEqual(['-o', 'run-1/nightly', '-f', 'composite.yaml'],
+                         run_manager.get_workspace_args(['-o', 'nightly/', '-f', 'composite.yaml'], 'run-1'))
+        self.assertEqual(['-o', 'run-1/nightly', '--phases=true', 'check.ipynb'],
+                         run_manager.get_workspace_args(['-onightly', '--phases=true', 'check.ipynb'], 'run-1'))
+
+    def test_runs_are_queued_and_executed_with_limited_concurrency(self):
+        # longer than polling of queue, so the second run starts before the first one is finished
+        os.environ['RUN_SECONDS'] = '3'
+        submitted = [run_manager.submit(['-r', 'html', f'composite_{i}.yaml']) for i in range(3)]
+        self.assertTrue(all(run['status'] == run_manager.QUEUED for run in submitted))
+        self.assertEqual(3, len({run['out_path'] for run in submitted}))
+
+        runs = self.wait_for_runs()
+        self.assertEqual([run['run_id'] for run in submitted], [run['run_id'] for run in runs])
+        self.assertTrue(all(run['status'] == run_manager.SUCCEEDED and run['exit_code'] == 0 for run in runs))
+
+        executed = [self.executed(run['run_id']) for run in runs]
+        self.assertEqual(['-o', runs[0]['run_id'], '-r', 'html', 'composite_0.yaml'], executed[0]['args'])
+        # the first two runs are executed concurrently, the third one waits for a free slot
+        self.assertLess(executed[1]['started'], executed[0]['finished'])
+        self.assertGreaterEqual(executed[2]['started'], min(executed[0]['finished'], executed[1]['finished']))
+
+    def test_failed_and_cancelled_runs(self):
+        os.environ[run_manager.MAX_RUNS_ENV] = '1'
+        os.environ['RUN_EXIT_CODE'] = '1'
+        failed = run_manager.submit(['check.ipynb'])
+        self.wait_for_runs()
+        self.assertEqual(run_manager.FAILED, run_manager.load_run(failed['run_id'])['status'])
+
+        os.environ['RUN_SECONDS'] = '60'
+        running = run_manager.submit(['check.ipynb'])
+        queued = run_manager.submit(['check.ipynb'])
+        deadline = time.time() + 10
+        while run_manager.load_run(running['run_id'])['status'] != run_manager.RUNNING and time.time() < deadline:
+            time.sleep(0.1)
+        self.assertEqual(run_manager.QUEUED, run_manager.load_run(queued['run_id'])['status'])
+
+        self.assertEqual(run_manager.CANCELLED, run_manager.cancel(queued['run_id'])['status'])
+        self.assertEqual(run_manager.CANCELLED, run_manager.cancel(running['run_id'])['status'])
+        runs = self.wait_for_runs(timeout=10)
+        self.assertEqual([run_manager.FAILED, run_manager.CANCELLED, run_manager.CANCELLED],
+                         [run['status'] for run in runs])
+        self.assertFalse(os.path.exists(os.path.join(self.runs_log_dir, f"{running['run_id']}.json")))
+        self.assertIsNone(run_manager.load_run('unknown'))
+
+    def test_finished_runs_are_pruned(self):
+        now = time.time()
+        runs_dir = run_manager.get_runs_dir()
+        for run_id, status, finished in (('old', run_manager.SUCCEEDED, now - 8 * 24 * 3600),
+                                         ('first', run_manager.FAILED, now - 3),
+                                         ('second', run_manager.CANCELLED, now - 2),
+                                         ('third', run_manager.SUCCEEDED, now - 1),
+                                         ('queued', run_manager.QUEUED, None)):
+            run_manager._save_run({'run_id': run_id, 'status': status, 'submitted': (finished or now) - 1,
+                                   'finished': finished, 'pid': None})
+            open(os.path.join(runs_dir, f'{run_id}.log'), 'w').close()
+
+        self.assertEqual(['first', 'old'], run_manager.prune_runs(retention_days=7, history_size=2))
+        self.assertEqual(['second', 'third', 'queued'], [run['run_id'] for run in run_manager.list_runs()])
+        self.assertEqual(['queued.log', 'second.log', 'third.log'],
+                         sorted(name for name in os.listdir(runs_dir) if name.endswith('.log')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import io
+import json
+import os
+import unittest
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+# settings of env-checker pod, which are read on import of infra.s3
+os.environ.setdefault('CLOUD_PUBLIC_HOST', 'apps.test-cloud.example.com')
+os.environ.setdefault('ENVCHECKER_STORAGE_BUCKET', 'storage-env-checker')
+os.environ.setdefault('ENVIRONMENT_CHECKER_STORAGE_BUCKET_EXPIRATION_DAYS', '14')
+
+import constants  # noqa: E402
+import infra.s3 as s3  # noqa: E402
+
+
+def client_error(code: str, operation: str) -> ClientError:
+    return ClientError({'Error': {'Code': code}}, operation)
+
+
+class FakeS3Client:
+    """
+    Keeps objects in memory and supports conditional requests as S3 does.
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.get_requests = 0
+        # amount of concurrent writes, which happen between read and conditional write of manifest
+        self.concurrent_writes = 0
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None):
+        self.get_requests += 1
+        if Key not in self.objects:
+            raise client_error('NoSuchKey', 'GetObject')
+        etag, body = self.objects[Key]
+        if IfNoneMatch == etag:
+            raise client_error('304', 'GetObject')
+        return {'ETag': etag, 'Body': io.BytesIO(body)}
+
+    def put_object(self, Bucket, Key, Body, ContentType, IfMatch=None, IfNoneMatch=None):
+        if self.concurrent_writes:
+            self.concurrent_writes -= 1
+            body = self.objects.get(Key, (None, b''))[1] + b'{"report_name": "concurrent", "last_run": 0}\n'
+            self.objects[Key] = (uuid.uuid4().hex, body)
+        current = self.objects.get(Key)
+        if (IfNoneMatch == '*' and current) or (IfMatch and (not current or current[0] != IfMatch)):
+            raise client_error('PreconditionFailed', 'PutObject')
+        self.objects[Key] = (uuid.uuid4().hex, Body)
+
+
+class S3ReportIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeS3Client()
+        self.patches = [mock.patch.object(s3, 's3_client', self.client),
+                        mock.patch.object(s3, '_index_cache', {}),
+                        mock.patch.object(s3.time, 'sleep')]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+
+    def upload(self, report_name: str, last_run: datetime, status: int = 1) -> str:
+        nb_exec_data = {
+            constants.REPORT_NAME_LABEL: report_name,
+            constants.INITIATOR_LABEL: 'cronjob',
+            constants.LAST_RUN: int(last_run.timestamp() * 1000),
+            constants.ENV_LABEL: 'null',
+            constants.SCOPE_LABEL: 'null',
+            constants.STATUS: status,
+            constants.LAST_DURATION: 1000,
+        }
+        report_path = s3.format_report_path_with_nb_exec_data(nb_exec_data)
+        self.assertTrue(s3.append_to_report_index(nb_exec_data, report_path, 100))
+        return report_path
+
+    def test_history_is_read_from_daily_manifests(self):
+        now = datetime.now(timezone.utc).replace(hour=12, minute=0)
+        old = self.upload('check', now - timedelta(days=3))
+        other = self.upload('other_check', now - timedelta(days=1))
+        newest = self.upload('check', now)
+        second = self.upload('check', now - timedelta(minutes=5))
+
+        requests = self.client.get_requests
+        self.assertEqual([newest, second], [entry['key'] for entry in s3.get_report_history('check', limit=2)])
+        # limit is reached by manifest of today, manifests of earlier days are not read
+        self.assertEqual(requests + 1, self.client.get_requests)
+        self.assertEqual([newest, second, old], [entry['key'] for entry in s3.get_report_history('check')])
+        self.assertEqual([other], [entry['key'] for entry in s3.get_report_history(initiator='cronjob', days=3)
+                                   if entry['report_name'] == 'other_check'])
+        entry = s3.get_report_history('check', limit=1)[0]
+        self.assertEqual({'status': 1, 'last_duration': 1000, 'size': 100, 'initiator': 'cronjob'},
+                         {key: entry[key] for key in ('status', 'last_duration', 'size', 'initiator')})
+
+    def test_manifests_of_past_days_are_cached(self):
+        now = datetime.now(timezone.utc)
+        self.upload('check', now - timedelta(days=5))
+        s3.get_report_history('check', days=7)
+        requests = self.client.get_requests
+
+        self.upload('check', now)
+        history = s3.get_report_history('check', days=7)
+
+        self.assertEqual(2, len(history))
+        # manifest of today is revalidated and the new one is read, today and yesterday are requested again
+        self.assertEqual(requests + 1 + 2, self.client.get_requests)
+
+    def test_concurrent_update_of_manifest_is_retried(self):
+        self.client.concurrent_writes = 2
+        report_path = self.upload('check', datetime.now(timezone.utc))
+
+        index_key = s3.format_index_path(datetime.now(timezone.utc).strftime('%Y-%m-%d'))
+        entries = [json.loads(line) for line in self.client.objects[index_key][1].decode().splitlines()]
+        self.assertEqual(['concurrent', 'concurrent', 'check'], [entry['report_name'] for entry in entries])
+        self.assertEqual(report_path, entries[-1]['key'])
+
+    def test_update_is_given_up_after_attempts(self):
+        self.client.concurrent_writes = s3.INDEX_UPDATE_ATTEMPTS
+        nb_exec_data = {constants.REPORT_NAME_LABEL: 'check', constants.INITIATOR_LABEL: 'cronjob',
+                        constants.LAST_RUN: 1761000000000, constants.ENV_LABEL: 'null', constants.SCOPE_LABEL: 'null'}
+
+        self.assertFalse(s3.append_to_report_index(nb_exec_data, 'path.zip', 100))
+
+    def test_connection_error_does_not_fail_upload(self):
+        nb_exec_data = {constants.REPORT_NAME_LABEL: 'check', constants.INITIATOR_LABEL: 'cronjob',
+                        constants.LAST_RUN: 1761000000000, constants.ENV_LABEL: 'null', constants.SCOPE_LABEL: 'null'}
+        error = EndpointConnectionError(endpoint_url='https://s3.example.com')
+        with mock.patch.object(self.client, 'get_object', side_effect=error):
+            self.assertFalse(s3.append_to_report_index(nb_exec_data, 'path.zip', 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import unittest
+import sys
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import yaml
+
+if "/home/jovyan/utils" not in sys.path:
+    sys.path.append("/home/jovyan/utils")
+
+import tracing  # noqa: E402
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+ROOT_SPAN_ID = '00f067aa0ba902b7'
+CHECK_SPAN_ID = 'b7ad6b7169203331'
+CALLER_SPAN_ID = '53995c3f42cd8ad8'
+
+
+class CollectorStandIn(BaseHTTPRequestHandler):
+    """
+    Receives OTLP/HTTP JSON export requests as OpenTelemetry collector does.
+    """
+    requests = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        CollectorStandIn.requests.append((self.path, dict(self.headers), json.loads(body)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TracingTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), CollectorStandIn)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        CollectorStandIn.requests = []
+        self.directory = tempfile.mkdtemp()
+        self.notebook_path = os.path.join(self.directory, 'check_1761000000000.ipynb')
+        cells = [
+            {'cell_type': 'code', 'source': ['namespace = "default"'], 'metadata': {
+                'tags': ['parameters'],
+                'papermill': {'start_time': '2025-10-20T22:40:01.000000', 'end_time': '2025-10-20T22:40:01.500000'}}},
+            {'cell_type': 'markdown', 'source': ['# Check'], 'metadata': {}},
+            {'cell_type': 'code', 'source': ['raise ValueError()\n'], 'metadata': {'papermill': {
+                'start_time': '2025-10-20T22:40:01.500000', 'end_time': '2025-10-20T22:40:03.000000',
+                'exception': True}}},
+        ]
+        with open(self.notebook_path, 'w') as f:
+            json.dump({'cells': cells, 'metadata': {}}, f)
+        start = 1761000000000
+        result = {'checks': [
+            {'path': '/home/jovyan/notebooks/check.ipynb', 'outs': [self.notebook_path], 'result': 'False',
+             'span_id': CHECK_SPAN_ID, 'phases': [
+                 {'phase': 'namespace_validation', 'start': start, 'duration_ms': 10, 'processes': 2},
+                 {'phase': 'papermill', 'start': start + 10, 'duration_ms': 3000, 'exit_code': 1},
+                 {'phase': 'parse_out', 'start': start + 3010, 'duration_ms': 90, 'exit_code': 0},
+                 {'phase': 'kernel_start', 'duration_ms': 900, 'part_of': 'papermill'}]},
+            # check executed without tracing (e.g. restored from checkpoint) has no spans
+            {'path': '/home/jovyan/notebooks/other.ipynb', 'outs': [], 'result': 'True'},
+        ]}
+        self.result_file_path = os.path.join(self.directory, 'result.yaml')
+        with open(self.result_file_path, 'w') as f:
+            yaml.dump(result, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def export(self, *caller_traceparent: str) -> subprocess.CompletedProcess:
+        env = dict(os.environ, OTEL_EXPORTER_OTLP_ENDPOINT=f'http://127.0.0.1:{self.server.server_port}',
+                   OTEL_EXPORTER_OTLP_HEADERS='x-scope-orgid=env-checker', OTEL_SERVICE_NAME='env-checker-test',
+                   PYTHONPATH=os.pathsep.join(sys.path))
+        return subprocess.run([sys.executable, tracing.__file__, 'export', self.result_file_path,
+                               f'00-{TRACE_ID}-{ROOT_SPAN_ID}-01', '1760999999000000', *caller_traceparent],
+                              env=env, capture_output=True, text=True)
+
+    def test_spans_of_run_are_exported_to_collector_and_file(self):
+        process = self.export()
+        self.assertEqual(0, process.returncode, process.stderr)
+
+        self.assertEqual(1, len(CollectorStandIn.requests))
+        path, headers, request = CollectorStandIn.requests[0]
+        self.assertEqual('/v1/traces', path)
+        self.assertEqual('env-checker', headers['x-scope-orgid'])
+        resource_spans = request['resourceSpans'][0]
+        self.assertEqual({'key': 'service.name', 'value': {'stringValue': 'env-checker-test'}},
+                         resource_spans['resource']['attributes'][0])
+        spans = {span['name']: span for span in resource_spans['scopeSpans'][0]['spans']}
+        self.assertEqual(['run.sh', 'check.ipynb', 'namespace_validation', 'papermill', 'parse_out', 'kernel_start',
+                          'cell 0', 'cell 2'], list(spans))
+        self.assertTrue(all(span['traceId'] == TRACE_ID for span in spans.values()))
+
+        self.assertNotIn('parentSpanId', spans['run.sh'])
+        self.assertEqual(ROOT_SPAN_ID, spans['run.sh']['spanId'])
+        self.assertEqual(CHECK_SPAN_ID, spans['check.ipynb']['spanId'])
+        self.assertEqual(ROOT_SPAN_ID, spans['check.ipynb']['parentSpanId'])
+        self.assertEqual(str(1761000000000 * 10 ** 6), spans['check.ipynb']['startTimeUnixNano'])
+        self.assertEqual(str(1761000003100 * 10 ** 6), spans['check.ipynb']['endTimeUnixNano'])
+        self.assertEqual(2, spans['check.ipynb']['status']['code'])
+        for phase in ('namespace_validation', 'papermill', 'parse_out'):
+            self.assertEqual(CHECK_SPAN_ID, spans[phase]['parentSpanId'])
+        self.assertNotIn('status', spans['parse_out'])
+        self.assertEqual('exit code 1', spans['papermill']['status']['message'])
+
+        papermill_span_id = spans['papermill']['spanId']
+        for name in ('kernel_start', 'cell 0', 'cell 2'):
+            self.assertEqual(papermill_span_id, spans[name]['parentSpanId'])
+        self.assertEqual(str(1761000001000 * 10 ** 6), spans['cell 0']['startTimeUnixNano'])
+        self.assertEqual(str(1761000003000 * 10 ** 6), spans['cell 2']['endTimeUnixNano'])
+        self.assertIn({'key': 'notebook.cell.tags', 'value': {'stringValue': 'parameters'}},
+                      spans['cell 0']['attributes'])
+        self.assertEqual('cell raised exception', spans['cell 2']['status']['message'])
+
+        with open(os.path.join(self.directory, tracing.TRACE_FILE_NAME), 'r') as f:
+            self.assertEqual([request], [json.loads(line) for line in f])
+
+    def test_run_is_a_part_of_caller_trace(self):
+        process = self.export(f'00-{TRACE_ID}-{CALLER_SPAN_ID}-01')
+        self.assertEqual(0, process.returncode, process.stderr)
+
+        spans = CollectorStandIn.requests[0][2]['resourceSpans'][0]['scopeSpans'][0]['spans']
+        self.assertEqual(CALLER_SPAN_ID, spans[0]['parentSpanId'])
+
+    def test_traceparent_is_validated(self):
+        self.assertEqual((TRACE_ID, ROOT_SPAN_ID), tracing.parse_traceparent(f'00-{TRACE_ID}-{ROOT_SPAN_ID}-01'))
+        self.assertEqual((None, None), tracing.parse_traceparent('00-abc-def-01'))
+        self.assertEqual((None, None), tracing.parse_traceparent(None))
+        with self.assertRaises(ValueError):
+            tracing.build_trace(self.result_file_path, 'invalid', 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import asyncio
+import concurrent.futures
+import time
+
+import aiohttp
+
+DEFAULT_CONCURRENCY = 50
+DEFAULT_LIMIT_PER_HOST = 10
+DEFAULT_TIMEOUT = 10
+
+
+def run(coroutine):
+    """
+    Runs coroutine to completion and returns its result.
+    Notebook kernels already run an event loop, so there the coroutine is executed in a separate thread
+    with its own loop. In notebook cells 'await coroutine' can be used directly as well.
+
+    Args:
+        coroutine: coroutine to run.
+
+    Returns:
+        result of coroutine.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+async def gather_bounded(probe, items, concurrency: int = DEFAULT_CONCURRENCY) -> list:
+    """
+    Calls 'await probe(item)' for every item, no more than concurrency probes at once.
+
+    Args:
+        probe: coroutine function with one argument.
+        items: items to probe.
+        concurrency (int): maximum amount of simultaneous probes.
+
+    Returns:
+        list: results in order of items. Exception raised by probe is returned instead of its result.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(item):
+        async with semaphore:
+            return await probe(item)
+
+    return await asyncio.gather(*(bounded(item) for item in items), return_exceptions=True)
+
+
+def run_in_threads(func, items, concurrency: int = DEFAULT_CONCURRENCY) -> list:
+    """
+    Calls blocking func(item) (e.g. kubernetes client or subprocess call) for every item in thread pool.
+    Use custom_reporter.ConcurrentReport, if func appends to report.
+
+    Args:
+        func: function with one argument.
+        items: items to process.
+        concurrency (int): amount of threads.
+
+    Returns:
+        list: results in order of items. Exception raised by func is returned instead of its result.
+    """
+    def call(item):
+        try:
+            return func(item)
+        except Exception as e:
+            return e
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(call, items))
+
+
+def create_session(limit_per_host: int = DEFAULT_LIMIT_PER_HOST, timeout: float = DEFAULT_TIMEOUT,
+                   headers: dict = None, verify_ssl: bool = False) -> aiohttp.ClientSession:
+    """
+    Creates HTTP session with connection pool, which keeps connections alive between probes of the same host.
+    Must be created within a running event loop and closed after use ('async with create_session() as session').
+    """
+    connector = aiohttp.TCPConnector(limit=0, limit_per_host=limit_per_host, ssl=None if verify_ssl else False)
+    return aiohttp.ClientSession(connector=connector, headers=headers,
+                                 timeout=aiohttp.ClientTimeout(total=timeout))
+
+
+async def probe_http(session: aiohttp.ClientSession, url: str, method: str = 'GET',
+                     expected_statuses: tuple = (200,)) -> dict:
+    """
+    Sends HTTP request and checks its status code. Response body is not read.
+
+    Returns:
+        dict: 'url', 'ok', 'status' (None if request failed), 'error' and 'duration_ms'.
+    """
+    started_at = time.monotonic()
+    try:
+        async with session.request(method, url) as response:
+            status = response.status
+        ok = status in expected_statuses
+        error = None if ok else f'Unexpected status code {status}'
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        status, ok = None, False
+        error = str(e) or e.__class__.__name__
+    return {'url': url, 'ok': ok, 'status': status, 'error': error,
+            'duration_ms': round((time.monotonic() - started_at) * 1000, 3)}
+
+
+async def check_http_endpoints_async(urls: list[str], concurrency: int = DEFAULT_CONCURRENCY,
+                                     limit_per_host: int = DEFAULT_LIMIT_PER_HOST, timeout: float = DEFAULT_TIMEOUT,
+                                     headers: dict = None, method: str = 'GET', expected_statuses: tuple = (200,),
+                                     verify_ssl: bool = False) -> list[dict]:
+    async with create_session(limit_per_host, timeout, headers, verify_ssl) as session:
+        return await gather_bounded(lambda url: probe_http(session, url, method, expected_statuses), urls,
+                                    concurrency)
+
+
+def check_http_endpoints(urls: list[str], report=None, check_name: str = 'connection',
+                         concurrency: int = DEFAULT_CONCURRENCY, limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+                         timeout: float = DEFAULT_TIMEOUT, headers: dict = None, method: str = 'GET',
+                         expected_statuses: tuple = (200,), verify_ssl: bool = False) -> list[dict]:
+    """
+    Probes HTTP endpoints concurrently and optionally appends results to report.
+
+    Args:
+        urls (list[str]): endpoints to probe.
+        report: custom_reporter.Report with 'url' value field, results are appended as check_name column:
+            'OK' or 'FAILED <error>'.
+        check_name (str): report column.
+        concurrency (int): maximum amount of simultaneous requests.
+        limit_per_host (int): maximum amount of simultaneous connections to the same host.
+        timeout (float): total timeout of a single request, seconds.
+        headers (dict): request headers.
+        method (str): HTTP method.
+        expected_statuses (tuple): status codes, which are considered as successful.
+        verify_ssl (bool): verify certificates of endpoints.
+
+    Returns:
+        list[dict]: probe results in order of urls, see probe_http.
+    """
+    results = run(check_http_endpoints_async(urls, concurrency, limit_per_host, timeout, headers, method,
+                                             expected_statuses, verify_ssl))
+    if report is not None:
+        for result in results:
+            report.append(check_name, 'OK' if result['ok'] else f"FAILED {result['error']}", url=result['url'])
+    return results
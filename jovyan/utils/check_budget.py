@@ -0,0 +1,204 @@
+"""
+Executes notebook of a check (papermill) within its budget of memory, CPU time and wall time.
+Resource usage of papermill and notebook kernel is sampled from /proc, so a runaway kernel is killed before
+it reaches memory limit of the pod and takes down the whole run. papermill saves the executed notebook
+with DeadKernelError, the check is failed and the next check of composite is executed.
+
+RLIMIT_RSS is not enforced by Linux and memory cgroup is not delegated to containers of the pod,
+so memory budget is enforced by sampling of RSS of the process tree.
+
+Usage:
+    python check_budget.py run <budget_file> <executed_notebook_path> -- papermill <args...>
+"""
+import json
+import os
+import select
+import signal
+import subprocess
+import sys
+import time
+
+MEMORY_ENV = 'ENVCHECKER_CHECK_MEMORY_MB'
+CPU_ENV = 'ENVCHECKER_CHECK_CPU_SECONDS'
+DEADLINE_ENV = 'ENVCHECKER_CHECK_TIMEOUT_SECONDS'
+# exceeded budgets
+MEMORY = 'memory'
+CPU = 'cpu'
+DEADLINE = 'deadline'
+SAMPLE_INTERVAL = 0.5
+# time for papermill to save executed notebook after the kernel is killed
+KILL_GRACE_PERIOD = 30
+SCRAPBOOK_MIME = 'application/scrapbook.scrap.json+json'
+REPORT_SCRAP = 'report'
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+PAGE_SIZE_KB = os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def get_budget() -> dict:
+    """
+    Returns budget of check from ENVCHECKER_CHECK_MEMORY_MB, ENVCHECKER_CHECK_CPU_SECONDS and
+    ENVCHECKER_CHECK_TIMEOUT_SECONDS variables (set by run.sh options), None value means no limit.
+    """
+    def _limit(name: str):
+        value = os.getenv(name)
+        return float(value) if value and float(value) > 0 else None
+    return {MEMORY: _limit(MEMORY_ENV), CPU: _limit(CPU_ENV), DEADLINE: _limit(DEADLINE_ENV)}
+
+
+def read_processes() -> dict:
+    """
+    Reads parent pid, RSS and CPU time of all processes from /proc.
+
+    Returns:
+        dict: pid -> (ppid, rss_kb, cpu_seconds). CPU time includes waited children of process.
+    """
+    processes = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                stat = f.read()
+        except OSError:  # process is finished
+            continue
+        # command name can contain spaces and parentheses, fields are counted from the last ')'
+        fields = stat[stat.rfind(')') + 2:].split()
+        ticks = sum(int(value) for value in fields[11:15])
+        processes[int(entry)] = (int(fields[1]), int(fields[21]) * PAGE_SIZE_KB, ticks / CLOCK_TICKS)
+    return processes
+
+
+def get_tree_usage(root_pid: int, processes: dict) -> tuple:
+    """
+    Sums resource usage of process and all its descendants.
+
+    Returns:
+        tuple: pids of the tree (root first), RSS in KiB, CPU seconds.
+    """
+    children = {}
+    for pid, (ppid, _, _) in processes.items():
+        children.setdefault(ppid, []).append(pid)
+    pids = []
+    queue = [root_pid] if root_pid in processes else []
+    while queue:
+        pid = queue.pop()
+        pids.append(pid)
+        queue.extend(children.get(pid, []))
+    return pids, sum(processes[pid][1] for pid in pids), sum(processes[pid][2] for pid in pids)
+
+
+def get_exceeded(budget: dict, rss_kb: float, cpu_seconds: float, wall_seconds: float) -> str:
+    if budget.get(MEMORY) and rss_kb > budget[MEMORY] * 1024:
+        return MEMORY
+    if budget.get(CPU) and cpu_seconds > budget[CPU]:
+        return CPU
+    if budget.get(DEADLINE) and wall_seconds > budget[DEADLINE]:
+        return DEADLINE
+    return None
+
+
+def _kill(pids: list[int]):
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def _wait_for_exit(pidfd, timeout: float):
+    # pidfd becomes readable when process exits, so short checks are not delayed by sampling interval
+    if pidfd is None:
+        time.sleep(timeout)
+    else:
+        select.select([pidfd], [], [], timeout)
+
+
+def mark_notebook_exceeded(executed_notebook_path: str, exceeded: str):
+    """
+    Marks executed notebook of over-budget check: its 'report' scrap gets isExceptionOccured flag (as checks
+    interrupted by timeout, see custom_reporter.Report.setExceptionStatus), notebook metadata gets exceeded budget.
+    """
+    try:
+        with open(executed_notebook_path, 'r') as f:
+            nb = json.load(f)
+    except (OSError, ValueError):
+        return
+    nb.setdefault('metadata', {}).setdefault('envchecker', {})['budget_exceeded'] = exceeded
+    for cell in nb.get('cells', []):
+        for output in cell.get('outputs') or []:
+            scrap = (output.get('data') or {}).get(SCRAPBOOK_MIME)
+            if isinstance(scrap, dict) and scrap.get('name') == REPORT_SCRAP and isinstance(scrap.get('data'), dict):
+                scrap['data']['isExceptionOccured'] = True
+    with open(executed_notebook_path, 'w') as f:
+        json.dump(nb, f, indent=1)
+
+
+def run_within_budget(budget_file: str, executed_notebook_path: str, command: list[str], budget: dict = None) -> int:
+    """
+    Runs command and kills descendants of the command (notebook kernel) when budget is exceeded.
+    The command itself is killed if it does not finish within KILL_GRACE_PERIOD after that.
+    Peak RSS, CPU seconds, wall seconds and exceeded budget are written to budget_file as JSON.
+
+    Args:
+        budget_file (str): path to JSON file with resource usage of check.
+        executed_notebook_path (str): path to executed notebook, which is marked if budget is exceeded.
+        command (list[str]): command to run.
+        budget (dict): limits of MEMORY (MiB), CPU (seconds) and DEADLINE (seconds), taken from environment if None.
+
+    Returns:
+        int: exit code of command.
+    """
+    budget = budget if budget is not None else get_budget()
+    started_at = time.monotonic()
+    try:
+        process = subprocess.Popen(command)
+    except OSError as e:
+        print(f'Cannot run {command[0]}: {e}', file=sys.stderr)
+        return 127
+    try:
+        pidfd = os.pidfd_open(process.pid)
+    except (AttributeError, OSError):
+        pidfd = None
+    peak_rss_kb, cpu_seconds, exceeded, killed_at = 0, 0.0, None, None
+    while True:
+        pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            break
+        wall_seconds = time.monotonic() - started_at
+        pids, rss_kb, tree_cpu_seconds = get_tree_usage(process.pid, read_processes())
+        peak_rss_kb = max(peak_rss_kb, rss_kb)
+        cpu_seconds = max(cpu_seconds, tree_cpu_seconds)
+        if exceeded is None:
+            exceeded = get_exceeded(budget, rss_kb, cpu_seconds, wall_seconds)
+            if exceeded:
+                print(f'Check exceeded its {exceeded} budget {budget[exceeded]:g} (RSS {rss_kb / 1024:.0f} MiB, '
+                      f'CPU {cpu_seconds:.1f}s, wall {wall_seconds:.1f}s), notebook kernel is killed', file=sys.stderr)
+                killed_at = time.monotonic()
+                _kill(pids[1:] or pids)
+        elif time.monotonic() - killed_at > KILL_GRACE_PERIOD:
+            _kill(pids)
+        _wait_for_exit(pidfd, SAMPLE_INTERVAL)
+    if pidfd is not None:
+        os.close(pidfd)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if exceeded:
+        mark_notebook_exceeded(executed_notebook_path, exceeded)
+    usage = {
+        # rusage covers waited descendants, which could finish between samples
+        'peak_rss_kb': max(peak_rss_kb, rusage.ru_maxrss),
+        'cpu_seconds': round(max(cpu_seconds, rusage.ru_utime + rusage.ru_stime), 3),
+        'wall_seconds': round(time.monotonic() - started_at, 3),
+        'exceeded': exceeded,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(budget_file)), exist_ok=True)
+    with open(budget_file, 'w') as f:
+        json.dump(usage, f)
+    return process.returncode
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 6 and sys.argv[1] == 'run' and sys.argv[4] == '--':
+        sys.exit(run_within_budget(sys.argv[2], sys.argv[3], sys.argv[5:]))
+    print('Usage: python check_budget.py run <budget_file> <executed_notebook_path> -- <command> [args...]')
+    sys.exit(1)
@@ -0,0 +1,85 @@
+"""
+Identity of composite checks and their order by durations of previous runs.
+Durations are kept in local history of results, see result_history.py.
+"""
+import hashlib
+import json
+
+FILE_ORDER = 'file'
+SPT_ORDER = 'spt'
+
+
+def get_check_key(check: dict) -> str:
+    """
+    Calculates identity of composite check: the same notebook with the same params and matrix.
+    Works both for composite entries and for check records of result.yaml.
+    """
+    identity = json.dumps([check.get('path'), check.get('params') or {}, check.get('matrix') or {}], sort_keys=True,
+                          default=str)
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()[:16]
+
+
+def get_record_duration(record: dict):
+    """
+    Calculates duration of check record of result.yaml in milliseconds: sum of phase timings if they were recorded,
+    otherwise the longest 'last_duration' of its metrics.
+
+    Returns:
+        float: duration or None if it is unknown.
+    """
+    phases = [p for p in record.get('phases') or [] if not p.get('part_of')]
+    if phases:
+        return float(sum(p.get('duration_ms') or 0 for p in phases))
+    durations = [m.get('last_duration') for m in record.get('metrics') or [] if isinstance(m, dict)]
+    durations = [d for d in durations if isinstance(d, (int, float))]
+    return float(max(durations)) if durations else None
+
+
+def predict_durations(checks: list[dict], durations: dict) -> list[float]:
+    """
+    Predicts duration of every check by history. Checks without history are considered as average ones.
+
+    Returns:
+        list[float]: durations in milliseconds, None for all checks if there is no history for any of them.
+    """
+    predicted = [durations.get(get_check_key(check)) for check in checks]
+    known = [d for d in predicted if d is not None]
+    if not known:
+        return [None] * len(checks)
+    default_duration = sum(known) / len(known)
+    return [default_duration if d is None else d for d in predicted]
+
+
+def order_checks(checks: list[dict], indices: list[int], order: str, durations: dict) -> list[int]:
+    """
+    Orders composite checks by their predicted durations.
+
+    Args:
+        checks (list[dict]): all checks of composite.
+        indices (list[int]): indices of checks to execute.
+        order (str): 'spt' - shortest first, so fail-fast run fails as early as possible, 'file' - composite order.
+            Checks are executed one by one, so order does not change duration of the run.
+        durations (dict): check key to duration, see result_history.load_durations.
+
+    Returns:
+        list[int]: ordered indices, ties and checks without history keep composite order.
+    """
+    if order == FILE_ORDER:
+        return list(indices)
+    if order != SPT_ORDER:
+        raise ValueError(f'Unknown order {order}, supported: {FILE_ORDER}, {SPT_ORDER}')
+    predicted = predict_durations(checks, durations)
+    if predicted and predicted[0] is None:
+        return list(indices)
+    return sorted(indices, key=lambda i: (predicted[i], i))
+
+
+def predict_run_duration(checks: list[dict], indices: list[int], durations: dict):
+    """
+    Returns:
+        float: predicted duration of sequential execution of checks in milliseconds or None without history.
+    """
+    predicted = predict_durations(checks, durations)
+    if not indices or predicted[0] is None:
+        return None
+    return sum(predicted[i] for i in indices)
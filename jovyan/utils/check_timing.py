@@ -0,0 +1,106 @@
+import functools
+import threading
+import time
+
+# columns of report table with timings of timed checks, see custom_reporter.Report.timed
+TIMINGS = 'timings'
+TIME_COLUMN = 'time_ms'
+CPU_TIME_COLUMN = 'cpu_ms'
+CALLS_COLUMN = 'outbound_calls'
+TIMING_COLUMNS = (TIME_COLUMN, CPU_TIME_COLUMN, CALLS_COLUMN)
+# amount of the slowest rows highlighted in HTML report
+SLOWEST_ROWS = 5
+
+_calls = threading.local()
+_install_lock = threading.Lock()
+_installed = False
+
+
+def _install_call_counter():
+    """
+    Counts HTTP requests of the current thread. urllib3 is used by requests and kubernetes client,
+    so both REST and Kubernetes API calls of checks are counted (retries and redirects are separate calls).
+    """
+    global _installed
+    if _installed:
+        return
+    with _install_lock:
+        if _installed:
+            return
+        try:
+            from urllib3.connectionpool import HTTPConnectionPool
+        except ImportError:  # checks without HTTP clients are timed without calls
+            _installed = True
+            return
+        urlopen = HTTPConnectionPool.urlopen
+
+        @functools.wraps(urlopen)
+        def counted_urlopen(*args, **kwargs):
+            _calls.count = getattr(_calls, 'count', 0) + 1
+            return urlopen(*args, **kwargs)
+
+        HTTPConnectionPool.urlopen = counted_urlopen
+        _installed = True
+
+
+class CheckTiming:
+    """
+    Measures wall time, CPU time of the current thread and amount of outbound HTTP calls of a check.
+    Can be used as context manager or decorator, on_finish(timing, exception) is called when check is finished.
+
+    Example:
+        with CheckTiming() as timing:
+            timing.value = check_pods()
+        print(timing.as_dict())
+    """
+
+    def __init__(self, on_finish=None):
+        self.on_finish = on_finish
+        self.value = None
+        self.wall_ms = None
+        self.cpu_ms = None
+        self.calls = None
+
+    def __enter__(self):
+        _install_call_counter()
+        self._calls_at_start = getattr(_calls, 'count', 0)
+        self._cpu_at_start = time.thread_time()
+        self._wall_at_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wall_ms = (time.perf_counter() - self._wall_at_start) * 1000
+        self.cpu_ms = (time.thread_time() - self._cpu_at_start) * 1000
+        self.calls = getattr(_calls, 'count', 0) - self._calls_at_start
+        if self.on_finish is not None:
+            self.on_finish(self, exc)
+        return False
+
+    def __call__(self, func):
+        # every call of decorated function is timed separately, value of check is the returned value
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with CheckTiming(self.on_finish) as timing:
+                timing.value = func(*args, **kwargs)
+            return timing.value
+        return wrapper
+
+    def as_dict(self) -> dict:
+        return {TIME_COLUMN: round(self.wall_ms, 3), CPU_TIME_COLUMN: round(self.cpu_ms, 3), CALLS_COLUMN: self.calls}
+
+
+def get_row_timing(timings: dict) -> dict:
+    """
+    Sums timings of all timed checks of report row.
+    """
+    return {column: round(sum(timing.get(column) or 0 for timing in timings.values()), 3)
+            for column in TIMING_COLUMNS}
+
+
+def sort_by_time(table):
+    """
+    Sorts report table by time of its rows, the slowest first. Tables without timings are returned as is.
+    """
+    if TIME_COLUMN not in table.columns:
+        return table
+    return table.sort_values(TIME_COLUMN, ascending=False, na_position='last', kind='stable', ignore_index=True)
@@ -0,0 +1,159 @@
+import json
+import os
+import shutil
+import sys
+import time
+
+import yaml
+
+RECORD_FILE_NAME = 'record.json'
+FILES_DIR_NAME = 'files'
+MAX_CHECKPOINT_AGE_DAYS = 7
+
+
+def get_check_dir(checkpoint_dir: str, index: int) -> str:
+    return os.path.join(checkpoint_dir, f'check_{index}')
+
+
+def _link_or_copy(source: str, destination: str):
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    if os.path.exists(destination):
+        os.remove(destination)
+    try:
+        # checkpoints are stored on the same volume as outputs, so hard link is enough to keep artifact
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def _load_result(result_file_path: str) -> dict:
+    with open(result_file_path, 'r') as f:
+        return yaml.safe_load(f) or {'checks': []}
+
+
+def save_record(check_dir: str, record: dict, out_path: str, **fields):
+    """
+    Saves check record and its artifacts ('outs') into check_dir.
+    Record file is written last, so check_dir without it is incomplete and is ignored.
+
+    Args:
+        check_dir (str): directory of saved check, it is replaced.
+        record (dict): check record of result.yaml.
+        out_path (str): output directory of run, artifacts are stored relatively to it.
+        fields: additional fields stored with record, see load_saved_record.
+    """
+    shutil.rmtree(check_dir, ignore_errors=True)
+    files_dir = os.path.join(check_dir, FILES_DIR_NAME)
+    os.makedirs(files_dir)
+    for path in record.get('outs') or []:
+        if os.path.isfile(path):
+            _link_or_copy(path, os.path.join(files_dir, os.path.relpath(path, out_path)))
+        elif os.path.isdir(path):
+            # e.g. externalised images of slimmed notebook
+            for root, _, files in os.walk(path):
+                for file in files:
+                    source = os.path.join(root, file)
+                    _link_or_copy(source, os.path.join(files_dir, os.path.relpath(source, out_path)))
+    tmp_path = os.path.join(check_dir, f'{RECORD_FILE_NAME}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(dict(fields, record=record, out_path=out_path, saved=time.time()), f)
+    os.replace(tmp_path, os.path.join(check_dir, RECORD_FILE_NAME))
+
+
+def load_saved_record(check_dir: str) -> dict:
+    """
+    Returns:
+        dict: record with its 'out_path', 'saved' time and additional fields or None if check_dir is incomplete.
+    """
+    record_path = os.path.join(check_dir, RECORD_FILE_NAME)
+    if not os.path.isfile(record_path):
+        return None
+    try:
+        with open(record_path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def restore_record(check_dir: str, result_file_path: str, out_path: str, **fields) -> dict:
+    """
+    Restores artifacts of saved check into out_path and appends its record (with additional fields) to result.yaml.
+    Paths of artifacts in record are moved to out_path, if the check was saved by run with another output directory.
+
+    Returns:
+        dict: restored record or None if check_dir is incomplete.
+    """
+    saved = load_saved_record(check_dir)
+    if saved is None:
+        return None
+    record = dict(saved['record'], **fields)
+    saved_out_path = saved.get('out_path') or out_path
+    record['outs'] = [os.path.join(out_path, os.path.relpath(path, saved_out_path))
+                      for path in record.get('outs') or []]
+    files_dir = os.path.join(check_dir, FILES_DIR_NAME)
+    for root, _, files in os.walk(files_dir):
+        for file in files:
+            source = os.path.join(root, file)
+            _link_or_copy(source, os.path.join(out_path, os.path.relpath(source, files_dir)))
+    result = _load_result(result_file_path)
+    result.setdefault('checks', []).append(record)
+    with open(result_file_path, 'w') as f:
+        yaml.dump(result, f, default_flow_style=False, sort_keys=False)
+    return record
+
+
+def save_checkpoint(checkpoint_dir: str, index: int, result_file_path: str, out_path: str):
+    """
+    Saves the last check record of result.yaml and its artifacts ('outs') as checkpoint of composite check index.
+
+    Args:
+        checkpoint_dir (str): checkpoint directory of composite run.
+        index (int): index of check in composite.
+        result_file_path (str): path to result.yaml.
+        out_path (str): output directory of run, artifacts are stored relatively to it.
+    """
+    checks = _load_result(result_file_path).get('checks') or []
+    if not checks:
+        print(f'Cannot save checkpoint of check {index}: {result_file_path} has no checks')
+        return
+    save_record(get_check_dir(checkpoint_dir, index), checks[-1], out_path)
+
+
+def restore_checkpoint(checkpoint_dir: str, index: int, result_file_path: str, out_path: str) -> str:
+    """
+    Restores artifacts of completed check into out_path and appends its record to result.yaml.
+    S3 and monitoring reports of the check are not repeated, they were sent before checkpoint was saved.
+
+    Returns:
+        str: result of check ('True' or 'False') or empty string if there is no complete checkpoint.
+    """
+    record = restore_record(get_check_dir(checkpoint_dir, index), result_file_path, out_path)
+    if record is None:
+        return ''
+    return str(record.get('result', ''))
+
+
+def prune_checkpoints(checkpoints_root: str, max_age_days: int = MAX_CHECKPOINT_AGE_DAYS):
+    # checkpoints of runs, which were never completed, are not needed after the job is gone
+    if not os.path.isdir(checkpoints_root):
+        return
+    threshold = time.time() - max_age_days * 24 * 3600
+    for name in os.listdir(checkpoints_root):
+        path = os.path.join(checkpoints_root, name)
+        if os.path.isdir(path) and os.path.getmtime(path) < threshold:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 6 and sys.argv[1] in ('save', 'restore'):
+        if sys.argv[1] == 'save':
+            save_checkpoint(sys.argv[2], int(sys.argv[3]), sys.argv[4], sys.argv[5])
+        else:
+            print(restore_checkpoint(sys.argv[2], int(sys.argv[3]), sys.argv[4], sys.argv[5]))
+        sys.exit(0)
+    if len(sys.argv) == 3 and sys.argv[1] == 'prune':
+        prune_checkpoints(sys.argv[2])
+        sys.exit(0)
+    print('Usage: python checkpoints.py save|restore <checkpoint_dir> <check_index> <result_file_path> <out_path>')
+    print('Or: python checkpoints.py prune <checkpoints_root>')
+    sys.exit(1)
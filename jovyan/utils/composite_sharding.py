@@ -0,0 +1,251 @@
+import fcntl
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import yaml
+
+import check_history
+import result_history
+
+HASH_STRATEGY = 'hash'
+COST_STRATEGY = 'cost'
+SHARD_DIR_TEMPLATE = 'shard_{index}'
+# composite index of check record in result.yaml, added by run.sh when checks are not run in composite order
+COMPOSITE_INDEX_FIELD = 'composite_index'
+SHARDS_STATE_DIR_NAME = '.shards'
+MERGED_STATUS = 'merged'
+# the first completed shard waits for the others, then merges results of completed ones, see finish_shard
+MERGE_TIMEOUT_ENV = 'ENVCHECKER_SHARD_MERGE_TIMEOUT'
+DEFAULT_MERGE_TIMEOUT_SECONDS = 3600
+POLL_INTERVAL_SECONDS = 5
+RUN_SH = '/home/jovyan/run.sh'
+
+
+def load_checks(composite_path: str) -> list[dict]:
+    with open(composite_path, 'r') as f:
+        return (yaml.safe_load(f) or {}).get('checks') or []
+
+
+def assign_by_hash(checks: list[dict], shards: int) -> list[int]:
+    """
+    Assigns every check to a shard by stable hash of its path and params, so a check stays on the same shard
+    while the composite is changed.
+
+    Returns:
+        list[int]: shard index for each check.
+    """
+    return [int(check_history.get_check_key(check)[:8], 16) % shards for check in checks]
+
+
+def assign_by_cost(checks: list[dict], shards: int, durations: dict) -> list[int]:
+    """
+    Assigns checks to shards by their durations from history: the longest check goes to the least loaded shard.
+    Checks without history are considered as average ones.
+
+    Returns:
+        list[int]: shard index for each check.
+    """
+    costs = [durations.get(check_history.get_check_key(check)) for check in checks]
+    known = [c for c in costs if c is not None]
+    default_cost = sum(known) / len(known) if known else 1.0
+    costs = [default_cost if c is None else c for c in costs]
+    loads = [0.0] * shards
+    assignment = [0] * len(checks)
+    # ties are broken by check index and shard index, so all pods calculate the same assignment
+    for i in sorted(range(len(checks)), key=lambda i: (-costs[i], i)):
+        shard = min(range(shards), key=lambda s: (loads[s], s))
+        assignment[i] = shard
+        loads[shard] += costs[i]
+    return assignment
+
+
+def select_checks(composite_path: str, shards: int, index: int, strategy: str = HASH_STRATEGY) -> list[int]:
+    """
+    Selects indices of composite checks, which are executed by shard index.
+
+    Args:
+        composite_path (str): path to composite YAML (or JSON) file.
+        shards (int): amount of shards (Indexed Job completions).
+        index (int): index of current shard (JOB_COMPLETION_INDEX).
+        strategy (str): 'hash' (stable assignment) or 'cost' (balanced by durations of previous runs).
+
+    Returns:
+        list[int]: indices of checks in composite order.
+    """
+    checks = load_checks(composite_path)
+    if strategy == COST_STRATEGY:
+        assignment = assign_by_cost(checks, shards, result_history.load_durations())
+    elif strategy == HASH_STRATEGY:
+        assignment = assign_by_hash(checks, shards)
+    else:
+        raise ValueError(f'Unknown sharding strategy {strategy}, supported: {HASH_STRATEGY}, {COST_STRATEGY}')
+    return [i for i, shard in enumerate(assignment) if shard == index]
+
+
+def _read_lines(path: str) -> list[str]:
+    if not os.path.isfile(path):
+        return []
+    with open(path, 'r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _read_indexed_records(out_path: str) -> list[tuple]:
+    result_file_path = os.path.join(out_path, 'result.yaml')
+    if not os.path.isfile(result_file_path):
+        return []
+    with open(result_file_path, 'r') as f:
+        checks = (yaml.safe_load(f) or {}).get('checks') or []
+    # records without index are kept after indexed ones, in order of execution
+    return [(record.pop(COMPOSITE_INDEX_FIELD, sys.maxsize), record) for record in checks]
+
+
+def _write_records(result_file_path: str, records: list[tuple]):
+    # sort is stable, so records without index keep their order
+    records.sort(key=lambda r: r[0])
+    with open(result_file_path, 'w') as f:
+        yaml.dump({'checks': [record for _, record in records]}, f, default_flow_style=False, sort_keys=False)
+
+
+def sort_result_file(out_path: str):
+    """
+    Restores composite order of check records in result.yaml of out_path, e.g. after checks were reordered by duration.
+    """
+    _write_records(os.path.join(out_path, 'result.yaml'), _read_indexed_records(out_path))
+
+
+def merge_shards(merged_out_path: str, shards: int, missing: list[int] = ()) -> int:
+    """
+    Merges result.yaml and result.txt of all shard folders into merged_out_path.
+    Check records are ordered as in composite and get 'shard' field.
+
+    Args:
+        merged_out_path (str): output directory of run.
+        shards (int): amount of shards.
+        missing (list[int]): shards, which are not completed, they are not merged and fail the run.
+
+    Returns:
+        int: overall result of run, 1 if any shard failed or did not produce result.
+    """
+    records = []
+    overall_result = 1 if missing else 0
+    for shard in range(shards):
+        if shard in missing:
+            continue
+        shard_path = os.path.join(merged_out_path, SHARD_DIR_TEMPLATE.format(index=shard))
+        results = _read_lines(os.path.join(shard_path, 'result.txt'))
+        if not results or results[-1] != '0':
+            overall_result = 1
+        for index, record in _read_indexed_records(shard_path):
+            record['shard'] = shard
+            records.append((index, record))
+    _write_records(os.path.join(merged_out_path, 'result.yaml'), records)
+    with open(os.path.join(merged_out_path, 'result.txt'), 'a') as f:
+        f.write(f'{overall_result}\n')
+    return overall_result
+
+
+def _is_done(state_dir: str, shard: int) -> bool:
+    return os.path.isfile(os.path.join(state_dir, f'done_{shard}'))
+
+
+def finish_shard(merged_out_path: str, shards: int, index: int, run_id: str,
+                 timeout: float = DEFAULT_MERGE_TIMEOUT_SECONDS) -> bool:
+    """
+    Marks shard as completed. The last completed shard of the run merges results of all shards.
+    The first completed shard waits for the others up to timeout: if some of them are not completed (e.g. their pods
+    were evicted), it merges results of completed shards and the run is failed. Shards completed after that are not
+    merged.
+
+    Args:
+        merged_out_path (str): output directory of run, shards work in its subfolders.
+        shards (int): amount of shards.
+        index (int): index of completed shard.
+        run_id (str): id of run, the same for all shards.
+        timeout (float): seconds, which the first completed shard waits for the others.
+
+    Returns:
+        bool: True if results were merged by this call.
+    """
+    state_dir = os.path.join(merged_out_path, SHARDS_STATE_DIR_NAME, run_id)
+    done_path = os.path.join(state_dir, f'done_{index}')
+    merged_marker = os.path.join(state_dir, MERGED_STATUS)
+    lock_path = os.path.join(merged_out_path, SHARDS_STATE_DIR_NAME, 'lock')
+    os.makedirs(state_dir, exist_ok=True)
+    with open(lock_path, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if os.path.isfile(merged_marker):
+            print(f'results of run {run_id} were merged without shard {index} by timeout', file=sys.stderr)
+            return False
+        first = not any(_is_done(state_dir, s) for s in range(shards))
+        open(done_path, 'w').close()
+        if all(_is_done(state_dir, s) for s in range(shards)):
+            merge_shards(merged_out_path, shards)
+            shutil.rmtree(state_dir, ignore_errors=True)
+            return True
+    if not first:
+        return False
+
+    # state of run is removed by the last completed shard
+    deadline = time.monotonic() + timeout
+    while os.path.isfile(done_path) and time.monotonic() < deadline:
+        time.sleep(min(POLL_INTERVAL_SECONDS, max(deadline - time.monotonic(), 0)))
+    with open(lock_path, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.isfile(done_path):
+            return False
+        missing = [s for s in range(shards) if not _is_done(state_dir, s)]
+        print(f'shards {missing} of run {run_id} are not completed in {timeout}s, results of completed shards '
+              f'are merged', file=sys.stderr)
+        merge_shards(merged_out_path, shards, missing)
+        # the marker is kept, so shards completed later do not merge again
+        open(merged_marker, 'w').close()
+        return True
+
+
+def run_local(shards: int, run_sh_args: list[str], strategy: str = HASH_STRATEGY) -> int:
+    """
+    Runs run.sh in shards processes, as pods of Indexed Job do, and waits for all of them.
+
+    Returns:
+        int: the highest exit code of processes.
+    """
+    run_id = f'local-{int(time.time() * 1000)}'
+    processes = []
+    for index in range(shards):
+        env = dict(os.environ, ENVCHECKER_SHARDS=str(shards), JOB_COMPLETION_INDEX=str(index),
+                   ENVCHECKER_SHARD_STRATEGY=strategy, ENVCHECKER_RUN_ID=run_id)
+        processes.append(subprocess.Popen(['bash', RUN_SH] + run_sh_args, env=env))
+    return max(process.wait() for process in processes)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) in (5, 6) and sys.argv[1] == 'select':
+        try:
+            selected = select_checks(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]),
+                                     sys.argv[5] if len(sys.argv) == 6 else HASH_STRATEGY)
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            print(f'Cannot select checks of shard: {e}', file=sys.stderr)
+            sys.exit(1)
+        print(' '.join(str(i) for i in selected))
+        sys.exit(0)
+    if len(sys.argv) == 6 and sys.argv[1] == 'finish':
+        if finish_shard(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), sys.argv[5],
+                        float(os.environ.get(MERGE_TIMEOUT_ENV) or DEFAULT_MERGE_TIMEOUT_SECONDS)):
+            print(MERGED_STATUS)
+        sys.exit(0)
+    if len(sys.argv) == 3 and sys.argv[1] == 'sort':
+        sort_result_file(sys.argv[2])
+        sys.exit(0)
+    if len(sys.argv) >= 4 and sys.argv[1] == 'run-local' and '--' in sys.argv:
+        separator = sys.argv.index('--')
+        options = sys.argv[2:separator]
+        sys.exit(run_local(int(options[0]), sys.argv[separator + 1:],
+                           options[1] if len(options) > 1 else HASH_STRATEGY))
+    print('Usage: python composite_sharding.py select <composite_path> <shards> <shard_index> [hash|cost]')
+    print('Or: python composite_sharding.py finish <merged_out_path> <shards> <shard_index> <run_id>')
+    print('Or: python composite_sharding.py sort <out_path>')
+    print('Or: python composite_sharding.py run-local <shards> [hash|cost] -- <run.sh arguments>')
+    sys.exit(1)
@@ -1,21 +1,23 @@
-class Value:
-    fields = None
+import threading
+
+import check_timing
+
 
+class Value:
     def __str__(self):
         return str(self.__dict__)
 
     def __init__(self, *args):
-        if self.__class__.fields is None:
-            self.__class__.fields = list(args)
         self.__dict__["checks"] = {}
-        for field in self.__class__.fields:
+        # fields are kept per instance, so reports with different fields can be used in the same kernel
+        for field in args:
             self.__dict__[field] = None
 
     def create_object(self, **kwargs):
-        new_obj = Value(self.__class__.fields)
-        for field in self.__class__.fields:
-            if field in kwargs:
-                new_obj.__dict__[field] = kwargs[field]
+        new_obj = Value()
+        for field in self.__dict__:
+            if field != "checks":
+                new_obj.__dict__[field] = kwargs.get(field)
         return new_obj
 
     def get_key(self):
@@ -37,17 +39,58 @@ def __init__(self, *args, report_name="report"):
         self.isExceptionOccured = False
 
     def append(self, name, value, **kwargs):
-        new_value = self.value_fields.create_object(**kwargs)
+        self._append(name, value, kwargs)
+
+    def _append(self, name, value, fields):
+        new_value = self.value_fields.create_object(**fields)
         key = new_value.get_key()
         if key not in self.value_list:
             self.value_list[key] = new_value.__dict__
         self.value_list[key]['checks'][name] = value
+        return self.value_list[key]
+
+    def timed(self, name, **kwargs):
+        """
+        Returns context manager (or decorator), which appends value of check together with its wall time, CPU time
+        and amount of outbound calls, see check_timing.CheckTiming. Value is taken from 'value' attribute of context
+        manager or returned by decorated function, 'ERROR <exception>' is appended if check raises exception.
+
+        Example:
+            with report.timed('pods_ready', namespace=namespace) as check:
+                check.value = 'OK' if all_pods_ready(namespace) else 'FAILED'
+        """
+        return check_timing.CheckTiming(lambda timing, exc: self._append_timing(name, timing, exc, kwargs))
+
+    def _append_timing(self, name, timing, exc, fields):
+        value = timing.value
+        if value is None and exc is not None:
+            value = f'ERROR {exc}'
+        row = self._append(name, value, fields)
+        row.setdefault(check_timing.TIMINGS, {})[name] = timing.as_dict()
 
     def dict(self):
         return {'name': self.report_name,
                 'values': list(self.value_list.values()),
                 'isExceptionOccured': self.isExceptionOccured}
 
+    def glue(self, out_path=None, result_file_path=None):
+        """
+        Glues report as 'report' scrap. If out_path is set, values of large report are stored in uncompressed
+        Feather side-car file next to executed notebook instead of notebook itself, so report generators read
+        it memory-mapped, see report_storage.store_report.
+
+        Args:
+            out_path (str): directory of executed notebook, run.sh 'out_path' parameter of notebook.
+            result_file_path (str): name of executed notebook, run.sh 'result_file_path' parameter of notebook.
+        """
+        import scrapbook as sb
+        report = self.dict()
+        if out_path:
+            import report_storage
+            report = report_storage.store_report(
+                report, out_path, report_storage.get_sidecar_file_name(self.report_name, result_file_path))
+        sb.glue('report', report)
+
     def getExceptionStatus(self):
         return self.isExceptionOccured
 
@@ -56,3 +99,39 @@ def setExceptionStatus(self):
 
     def __iter__(self):
         return iter(self.value_list.values())
+
+
+class ConcurrentReport(Report):
+    """
+    Report, which can be filled from several threads (e.g. by async_checks.run_in_threads).
+    Produces the same scrap as Report.
+    """
+
+    def __init__(self, *args, report_name="report"):
+        super().__init__(*args, report_name=report_name)
+        self._lock = threading.RLock()
+
+    def append(self, name, value, **kwargs):
+        with self._lock:
+            super().append(name, value, **kwargs)
+
+    def _append_timing(self, name, timing, exc, fields):
+        with self._lock:
+            super()._append_timing(name, timing, exc, fields)
+
+    def dict(self):
+        with self._lock:
+            report = super().dict()
+            report['values'] = [dict(value, checks=dict(value['checks'])) for value in report['values']]
+            for value in report['values']:
+                if check_timing.TIMINGS in value:
+                    value[check_timing.TIMINGS] = dict(value[check_timing.TIMINGS])
+            return report
+
+    def setExceptionStatus(self):
+        with self._lock:
+            super().setExceptionStatus()
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self.value_list.values()))
@@ -2,6 +2,8 @@
 import os
 import os.path
 import datetime
+import io
+import mmap
 import zipfile
 from io import BytesIO
 import colorize_text
@@ -44,6 +46,19 @@ def get_default_env_variable_value_by_name(variable_name):
 log_level = get_env_variable_value_by_name("ENVIRONMENT_CHECKER_LOG_LEVEL")
 production_mode = get_env_variable_value_by_name("PRODUCTION_MODE")
 
+DEFAULT_STATE_DIR = '/home/jovyan/out/.env-checker'
+
+
+def get_state_dir(*subdirs: str) -> str:
+    """
+    Returns directory (creates it if needed) for data, which must survive between runs
+    (baselines, history, checkpoints). It is hidden inside './out' folder, so it is not removed by run.sh cleanup.
+    Location can be overridden with ENVCHECKER_STATE_DIR variable.
+    """
+    state_dir = os.path.join(os.getenv('ENVCHECKER_STATE_DIR') or DEFAULT_STATE_DIR, *subdirs)
+    os.makedirs(state_dir, exist_ok=True)
+    return state_dir
+
 
 def encode_to_base64(text: str) -> str:
     encoded_bytes = base64.b64encode(text.encode('utf-8'))
@@ -51,38 +66,118 @@ def encode_to_base64(text: str) -> str:
     return encoded_string
 
 
-def get_content_from_file(path: str, file_name: str) -> str:
+# amount of bytes encoded at once, multiple of 3, so chunks of base64 can be concatenated without padding inside
+BASE64_CHUNK_SIZE = 3 * 2 ** 18
+
+
+def get_content_from_file(path: str, file_name: str, lazy: bool = False):
     file_path = os.path.join(path, file_name)
     # Check file is exists
-    return get_content_from_file_by_path(file_path)
+    return get_content_from_file_by_path(file_path, lazy)
 
 
-def get_content_from_file_by_path(path: str) -> str:
+def get_content_from_file_by_path(path: str, lazy: bool = False):
+    """
+    Returns content of file as base64 string (PDF as is, other files as UTF-8 text), None if file does not exist.
+    With lazy=True returns Base64Content, which encodes the file chunk by chunk only when it is iterated or written,
+    so large reports can be embedded without holding their base64 copy in memory.
+    """
     # Check file is exists
     if os.path.isfile(path):
-        file_extension = os.path.splitext(path)[1]
-        # Read file
-        if file_extension == '.pdf':
-            return get_pdf_base64(path)
-        else:
-            return get_text_content_as_base64(path)
+        content = Base64Content(path, binary=os.path.splitext(path)[1] == '.pdf')
+        return content if lazy else str(content)
     # If file does not exists
     return None
 
 
+def iter_base64_chunks(file_path: str, binary: bool = True, chunk_size: int = BASE64_CHUNK_SIZE,
+                       use_mmap: bool = False):
+    """
+    Encodes file to base64 chunk by chunk, peak memory is bounded by chunk_size regardless of file size.
+
+    Args:
+        file_path (str): path to file.
+        binary (bool): encode bytes of file as is, otherwise file is read as UTF-8 text with universal newlines.
+        chunk_size (int): amount of bytes encoded at once, rounded down to multiple of 3.
+        use_mmap (bool): map binary file into memory instead of reading it, pages are loaded by OS on demand.
+
+    Yields:
+        bytes: ASCII chunks of base64, which give base64 of the whole file when concatenated.
+    """
+    chunk_size = max(3, chunk_size - chunk_size % 3)
+    if binary:
+        with open(file_path, 'rb') as f:
+            if use_mmap and os.fstat(f.fileno()).st_size > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    view = memoryview(mapped)
+                    try:
+                        for offset in range(0, len(view), chunk_size):
+                            yield base64.b64encode(view[offset:offset + chunk_size])
+                    finally:
+                        view.release()
+                return
+            while chunk := f.read(chunk_size):
+                yield base64.b64encode(chunk)
+        return
+    pending = b''
+    with open(file_path, 'r', encoding='utf-8') as f:
+        # one character takes up to 4 bytes in UTF-8
+        while text := f.read(max(1, chunk_size // 4)):
+            pending += text.encode('utf-8')
+            ready = len(pending) - len(pending) % 3
+            if ready:
+                yield base64.b64encode(pending[:ready])
+                pending = pending[ready:]
+    if pending:
+        yield base64.b64encode(pending)
+
+
+def write_content_as_base64(file_path: str, sink, binary: bool = True, chunk_size: int = BASE64_CHUNK_SIZE,
+                            use_mmap: bool = False) -> int:
+    """
+    Writes base64 of file to file-like sink (binary or text) chunk by chunk.
+
+    Returns:
+        int: amount of written base64 characters.
+    """
+    text_sink = isinstance(sink, io.TextIOBase)
+    written = 0
+    for chunk in iter_base64_chunks(file_path, binary, chunk_size, use_mmap):
+        sink.write(chunk.decode('ascii') if text_sink else chunk)
+        written += len(chunk)
+    return written
+
+
+class Base64Content:
+    """
+    Lazy base64 content of file, see get_content_from_file_by_path. Iteration yields str chunks,
+    str() returns the whole content.
+    """
+
+    def __init__(self, file_path: str, binary: bool = True, chunk_size: int = BASE64_CHUNK_SIZE,
+                 use_mmap: bool = False):
+        self.file_path = file_path
+        self.binary = binary
+        self.chunk_size = chunk_size
+        self.use_mmap = use_mmap
+
+    def __iter__(self):
+        for chunk in iter_base64_chunks(self.file_path, self.binary, self.chunk_size, self.use_mmap):
+            yield chunk.decode('ascii')
+
+    def write_to(self, sink) -> int:
+        return write_content_as_base64(self.file_path, sink, self.binary, self.chunk_size, self.use_mmap)
+
+    def __str__(self):
+        return ''.join(self)
+
+
 def get_pdf_base64(file_path: str) -> str:
-    with open(file_path, 'rb') as file:
-        pdf_bytes = file.read()
-        base64_pdf = base64.b64encode(pdf_bytes).decode('utf-8')
-    return base64_pdf
+    return str(Base64Content(file_path, binary=True))
 
 
 def get_text_content_as_base64(file_path: str) -> str:
-    with open(file_path, 'r', encoding='utf-8') as f:
-        text_content = f.read()
-    base64_content = base64.b64encode(text_content.encode('utf-8')).decode(
-        'utf-8')
-    return base64_content
+    return str(Base64Content(file_path, binary=False))
 
 
 def getCurrentTime() -> str:
@@ -129,6 +224,14 @@ def zipFilesWithTimestamp(filenames: list[str]) -> BytesIO:
     zip_stream = BytesIO()
     with zipfile.ZipFile(zip_stream, 'w') as zip:
         for fname in filenames:
+            if os.path.isdir(fname):
+                # folder keeps its name, e.g. '<notebook>_files' referred by slimmed notebook
+                for root, _, files in os.walk(fname):
+                    for file in sorted(files):
+                        path = os.path.join(root, file)
+                        zip.write(filename=path, arcname=os.path.join(os.path.basename(fname),
+                                                                      os.path.relpath(path, fname)))
+                continue
             # take report name and cut off timestamp
             fname_in_archive = re.sub(r'(.*)(_\d+)(\.\w+$)', r'\1\3',
                                       os.path.basename(fname))
@@ -165,9 +268,23 @@ def get_report_names_by_base_name(report_base_name: str) -> list[str]:
     return filtered_files_list
 
 
-def check_connection_status(url, headers=None, path=''):
+_http_session = None
+
+
+def get_http_session() -> requests.Session:
+    # connections are kept alive and reused by all checks of the kernel
+    global _http_session
+    if _http_session is None:
+        _http_session = requests.Session()
+        # with 'run.sh --tracing=true' requests of checks are a part of trace of check
+        if os.getenv('TRACEPARENT'):
+            _http_session.headers['traceparent'] = os.getenv('TRACEPARENT')
+    return _http_session
+
+
+def check_connection_status(url, headers=None, path='', timeout=None):
     try:
-        response = requests.get(url + path, headers=headers, verify=False)
+        response = get_http_session().get(url + path, headers=headers, verify=False, timeout=timeout)
         if response.status_code == 200:
             print(colorize_text.get_green_text_color(
                 f"Connection to {url + path} is successful"))
@@ -197,6 +314,10 @@ def get_related_reports(out_script_path, outs_as_json_str, out_path):
                 out_path + "/" + report for report in custom_reports
             ]
             out_list.extend(custom_reports)
+    # values of large report are stored in side-car file next to executed notebook, see report_storage.py
+    report_storage = (nb.scraps.data_dict.get("report") or {}).get("storage")
+    if report_storage:
+        out_list.append(os.path.join(os.path.dirname(out_script_path), report_storage["path"]))
     return json.dumps(out_list)
 
 
@@ -0,0 +1,62 @@
+"""
+Jupyter server extension, which serves queries to local history of check results, see result_history.py.
+Loaded by installation/python/jupyter_server_config.py.
+
+    GET /envchecker/history/trend          daily runs, failures and durations
+    GET /envchecker/history/flaky          series, which change status between consecutive runs
+    GET /envchecker/history/percentiles    percentiles of durations of every series
+
+Query parameters: days, report_name, namespace, app, path.
+"""
+import json
+
+from jupyter_server.base.handlers import APIHandler
+from jupyter_server.utils import url_path_join
+from tornado import web
+from tornado.ioloop import IOLoop
+
+import result_history
+
+HISTORY_PATH = 'envchecker/history'
+
+
+def _run_in_executor(function, *args):
+    # database can be locked by a run, which records its results, so it is queried outside of IOLoop of the server
+    return IOLoop.current().run_in_executor(None, function, *args)
+
+
+def _query(query: str, query_args: dict) -> list[dict]:
+    # connection is used by the thread, which opened it
+    connection = result_history.connect()
+    try:
+        return result_history.QUERIES[query][0](connection, **query_args)
+    finally:
+        connection.close()
+
+
+class HistoryHandler(APIHandler):
+    @web.authenticated
+    async def get(self, query):
+        if query not in result_history.QUERIES:
+            raise web.HTTPError(404, f'Unknown query {query}')
+        query_args = {name: self.get_argument(name) for name in result_history.FILTERS
+                      if self.get_argument(name, None) is not None}
+        days = self.get_argument('days', None)
+        if days is not None:
+            if not days.isdigit() or int(days) == 0:
+                raise web.HTTPError(400, 'days must be a positive integer')
+            query_args['days'] = int(days)
+        rows = await _run_in_executor(_query, query, query_args)
+        self.finish(json.dumps({'query': query, 'rows': rows}))
+
+
+def _jupyter_server_extension_points():
+    return [{'module': 'history_extension'}]
+
+
+def _load_jupyter_server_extension(serverapp):
+    base_url = serverapp.web_app.settings['base_url']
+    serverapp.web_app.add_handlers('.*$', [
+        (url_path_join(base_url, HISTORY_PATH, r'(\w+)'), HistoryHandler),
+    ])
+    serverapp.log.info(f'Env-checker history of check results is served on /{HISTORY_PATH}')
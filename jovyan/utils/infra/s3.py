@@ -1,6 +1,9 @@
 import urllib3
 import logging
 import boto3
+import json
+import random
+import time
 import nb_data_manipulation_utils
 import env_checker_utils
 import constants
@@ -9,10 +12,10 @@
 import pytz
 import uuid
 
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
 from botocore.client import Config
 from result import Result, ResultStatus
-from datetime import datetime
+from datetime import datetime, timedelta
 from errorCode import ErrorCode
 
 log_level = env_checker_utils.get_env_variable_value_by_name('ENVIRONMENT_CHECKER_LOG_LEVEL')
@@ -20,6 +23,10 @@
 
 REPORT_FULL_URL_TEMPLATE = '{s3_server_url}/{bucket_name}/{bucket_to_report_path}'
 REPORT_PATH_TEMPLATE = '{cloud_name}/{initiator}/{date}/{scope}{env}{report_name}_{timestamp}.zip'
+# daily manifests of uploaded reports, so history of report is read without listing of the whole date tree
+INDEX_PATH_TEMPLATE = '{cloud_name}/.index/{date}.ndjson'
+INDEX_UPDATE_ATTEMPTS = 5
+INDEX_CONFLICT_CODES = ('PreconditionFailed', 'ConditionalRequestConflict', '412', '409')
 
 BUCKET_NAME = env_checker_utils.get_env_variable_value_by_name('ENVCHECKER_STORAGE_BUCKET')
 CLOUD_NAME = env_checker_utils.get_cloud_name()
@@ -47,6 +54,8 @@
 S3_ACCESS_KEY = None
 S3_SECRET_KEY = None
 s3_client = None
+# manifest key -> (ETag, entries)
+_index_cache = {}
 
 
 def auth_call(host: str, user: str, token: str, region: str = "us-east-1") -> Result:
@@ -90,7 +99,7 @@ def auth_call(host: str, user: str, token: str, region: str = "us-east-1") -> Re
         return Result(ResultStatus.FAIL, str(e), traceback.format_exc(), ErrorCode.ENVCH_1569.getErrorMessage())
 
 
-def init_env_checker_bucket():
+def init_s3_client():
     global S3_URL, S3_ACCESS_KEY, S3_SECRET_KEY, s3_client
     if S3_URL is None:
         S3_URL = env_checker_utils.get_env_variable_value_by_name('STORAGE_SERVER_URL')
@@ -111,6 +120,9 @@ def init_env_checker_bucket():
             region_name='us-east-1',
             verify=False)
 
+
+def init_env_checker_bucket():
+    init_s3_client()
     # check if bucket for env-checker exists:
     try:
         s3_client.head_bucket(Bucket=BUCKET_NAME)
@@ -159,6 +171,7 @@ def uploadReportsByExecutedNotebookPath(executed_notebook_path: str) -> str:
         return
 
     s3_upload_location = format_report_path_with_nb_exec_data(nb_exec_data)
+    size = zip.getbuffer().nbytes
     try:
         s3_client.upload_fileobj(zip, BUCKET_NAME, s3_upload_location)
         url = REPORT_FULL_URL_TEMPLATE.format(s3_server_url=S3_URL, bucket_name=BUCKET_NAME,
@@ -167,6 +180,7 @@ def uploadReportsByExecutedNotebookPath(executed_notebook_path: str) -> str:
     except ClientError as e:
         logging.error(e)
         return
+    append_to_report_index(nb_exec_data, s3_upload_location, size)
     nb_data_manipulation_utils.update_s3_link_label_for_notebook_from_result_file(executed_notebook_path)
     return url
 
@@ -191,6 +205,145 @@ def format_report_path_with_nb_exec_data(nb_exec_data: dict) -> str:
     )
 
 
+def format_index_path(date: str) -> str:
+    return INDEX_PATH_TEMPLATE.format(cloud_name=CLOUD_NAME, date=date)
+
+
+def _get_index_object(index_key: str, etag: str = None) -> tuple:
+    """
+    Returns ETag and content of manifest, (None, b'') if it does not exist, (etag, None) if it is not modified.
+    """
+    try:
+        response = s3_client.get_object(Bucket=BUCKET_NAME, Key=index_key, **({'IfNoneMatch': etag} if etag else {}))
+    except ClientError as e:
+        error_code = e.response['Error']['Code']
+        if error_code in ('NoSuchKey', '404'):
+            return None, b''
+        if error_code in ('NotModified', '304'):
+            return etag, None
+        raise
+    return response['ETag'], response['Body'].read()
+
+
+def _parse_index(content: bytes) -> list[dict]:
+    entries = []
+    for line in content.decode('utf-8').splitlines():
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    return entries
+
+
+def append_to_report_index(nb_exec_data: dict, report_path: str, size: int) -> bool:
+    """
+    Appends uploaded report to daily manifest of its run date. Manifest is rewritten with conditional write
+    (If-Match by ETag, If-None-Match for a new one) and retried, if it is changed by another run concurrently.
+
+    Returns
+    -------
+    bool
+        True if report is added to manifest
+    """
+    last_run = nb_exec_data[constants.LAST_RUN]
+    entry = {
+        'report_name': nb_exec_data[constants.REPORT_NAME_LABEL],
+        'initiator': nb_exec_data[constants.INITIATOR_LABEL],
+        'status': nb_exec_data.get(constants.STATUS),
+        'last_run': last_run,
+        'last_duration': nb_exec_data.get(constants.LAST_DURATION),
+        'env': nb_exec_data[constants.ENV_LABEL],
+        'scope': nb_exec_data[constants.SCOPE_LABEL],
+        'size': size,
+        'key': report_path,
+    }
+    line = (json.dumps(entry) + '\n').encode('utf-8')
+    index_key = format_index_path(convert_timestamp_to_date_str(int(last_run / 1000)))
+    for attempt in range(INDEX_UPDATE_ATTEMPTS):
+        try:
+            etag, content = _get_index_object(index_key)
+            condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+            try:
+                s3_client.put_object(Bucket=BUCKET_NAME, Key=index_key, Body=content + line,
+                                     ContentType='application/x-ndjson', **condition)
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'NotImplemented':
+                    raise
+                # storage does not support conditional writes, concurrent updates may be lost
+                s3_client.put_object(Bucket=BUCKET_NAME, Key=index_key, Body=content + line,
+                                     ContentType='application/x-ndjson')
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] not in INDEX_CONFLICT_CODES:
+                logging.error(f'Cannot update report index {index_key}: {e}')
+                return False
+        except BotoCoreError as e:
+            # index is best-effort, connection errors must not fail upload of report
+            logging.error(f'Cannot update report index {index_key}: {e}')
+            return False
+        time.sleep(random.uniform(0, 0.1 * 2 ** attempt))
+    logging.error(f'Cannot update report index {index_key}: it is changed concurrently')
+    return False
+
+
+def load_report_index(date: str) -> list[dict]:
+    """
+    Loads entries of daily manifest. Manifests are cached, manifests of today and yesterday are revalidated by ETag,
+    older ones are not changed anymore and are not requested again.
+
+    Parameters
+    ----------
+    date : str
+        date of manifest, e.g. '2025-01-31'
+    """
+    index_key = format_index_path(date)
+    cached = _index_cache.get(index_key)
+    yesterday = (datetime.now(tz=pytz.utc) - timedelta(days=1)).strftime('%Y-%m-%d')
+    if cached is not None and date < yesterday:
+        return cached[1]
+    etag, content = _get_index_object(index_key, cached[0] if cached else None)
+    if content is None:
+        return cached[1]
+    entries = _parse_index(content)
+    _index_cache[index_key] = (etag, entries)
+    return entries
+
+
+def get_report_history(report_name: str = None, initiator: str = None, limit: int = None,
+                       days: int = None) -> list[dict]:
+    """Returns the last runs of report from daily manifests, newest first, without listing of bucket
+
+    Parameters
+    ----------
+    report_name : str
+        name of report, all reports if not set
+    initiator : str
+        initiator of runs, all initiators if not set
+    limit : int
+        maximal amount of runs, manifests of earlier days are not read once it is reached
+    days : int
+        amount of days to look back, ENVIRONMENT_CHECKER_STORAGE_BUCKET_EXPIRATION_DAYS by default
+
+    Returns
+    -------
+    list[dict]
+        manifest entries with 'report_name', 'initiator', 'status', 'last_run', 'last_duration', 'env', 'scope',
+        'size' and 'key' (path of report zip in bucket)
+    """
+    init_s3_client()
+    today = datetime.now(tz=pytz.utc)
+    history = []
+    for offset in range(days or EXPIRATION_DAYS):
+        date = (today - timedelta(days=offset)).strftime('%Y-%m-%d')
+        entries = [entry for entry in load_report_index(date)
+                   if (report_name is None or entry.get('report_name') == report_name)
+                   and (initiator is None or entry.get('initiator') == initiator)]
+        history.extend(sorted(entries, key=lambda entry: entry.get('last_run') or 0, reverse=True))
+        if limit and len(history) >= limit:
+            break
+    return history[:limit] if limit else history
+
+
 def check_and_update_expiration_rule(bucket_lifecycle_config: dict):
     rule_already_present = False
     bucket_rules = bucket_lifecycle_config['Rules']
@@ -4,58 +4,47 @@
 import json
 import os
 import pandas as pd
+import report_storage
+import report_export
+import check_timing
 
 
-def generate_report_table(report):
-    data = report["values"]
-    if data:
-        df = pd.DataFrame(data)
-        for index, row in df.iterrows():
-            checks = row.get("checks", {})
-            for key, value in checks.items():
-                new_column_name = f"{key}"
-                df.at[index, new_column_name] = value
-        df = df.drop(columns=["checks"])
-        return df
-    else:
-        print("No data to generate")
-        data = {'Value': ['No data']}
-        return pd.DataFrame(data)
+def generate_report_table(report, notebook):
+    # values of large reports are stored in side-car file next to notebook
+    return report_storage.load_report_table(report, os.path.dirname(notebook))
 
 
 def process_notebook_file(notebook_files, reports):
     for notebook in notebook_files:
         nb = sb.read_notebook(notebook)
         if "report" in nb.scraps.data_dict:
-            report_name = nb.scraps.data_dict["report"]['name']
+            report = nb.scraps.data_dict["report"]
+            report_name = report['name']
+            table = generate_report_table(report, notebook)
             if report_name not in hashes:
                 hashes[report_name] = {}
 
-            hash_code = hash(tuple(
-                sorted(map(str.lower, generate_report_table(
-                    nb.scraps.data_dict["report"]).columns))))
+            hash_code = hash(tuple(sorted(map(str.lower, table.columns))))
 
             if hash_code not in hashes[report_name]:
                 hashes[report_name][hash_code] = set()
             hashes[report_name][hash_code].add(notebook)
 
             if report_name not in reports:
-                reports[report_name] = {hash_code: generate_report_table(
-                    nb.scraps.data_dict["report"])}
+                reports[report_name] = {hash_code: table}
             else:
                 if hash_code in reports[report_name]:
                     reports[report_name][hash_code] = pd.concat(
-                        [reports[report_name][hash_code],
-                         generate_report_table(nb.scraps.data_dict["report"])],
+                        [reports[report_name][hash_code], table],
                         ignore_index=True)
                 else:
-                    reports[report_name][hash_code] = generate_report_table(
-                        nb.scraps.data_dict["report"])
+                    reports[report_name][hash_code] = table
 
     for report_name, hashes_data in reports.items():
         report_entries = []
         for hash_code, df in hashes_data.items():
-            rows = [row.to_dict() for _, row in df.iterrows()]
+            # the slowest timed checks are the first, see custom_reporter.Report.timed
+            rows = [row.to_dict() for _, row in check_timing.sort_by_time(df).iterrows()]
             report_entries.append({
                 "notebook": list(hashes[report_name][hash_code]),
                 "data": rows
@@ -69,15 +58,24 @@ def process_notebook_file(notebook_files, reports):
 
 
 directory_path = sys.argv[1]
-for root, _, files in os.walk(directory_path):
+# json - one pretty-printed file per report, ndjson and parquet - streaming export, see report_export.py
+output_format = sys.argv[2] if len(sys.argv) > 2 and sys.argv[2] else report_export.JSON_FORMAT
+if output_format not in report_export.FORMATS:
+    print(f"Unknown report format {output_format}, supported formats: {', '.join(report_export.FORMATS)}")
+    sys.exit(1)
+for root, dirs, files in os.walk(directory_path):
+    # hidden folders (e.g. state of env-checker with memo entries and checkpoints) are not a part of run
+    dirs[:] = [d for d in dirs if not d.startswith('.')]
     reports = {}
     hashes = {}
     notebooks = []
-    if os.path.basename(root).startswith('.'):
-        continue
     for file in files:
         if file.endswith('.ipynb'):
             notebooks.append(os.path.join(root, file))
-    process_notebook_file(notebooks, reports)
+    if output_format == report_export.JSON_FORMAT:
+        process_notebook_file(notebooks, reports)
+    else:
+        for output_file in report_export.export_reports(sorted(notebooks), root, output_format):
+            print(f"{output_format} report saved to {output_file}")
 
 print("All reports generated")
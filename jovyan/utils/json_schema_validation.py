@@ -3,7 +3,10 @@
 import jsonschema
 import sys
 
-from jsonschema import validate
+try:
+    import fastjsonschema
+except ImportError:  # fastjsonschema is optional, jsonschema validator is used instead
+    fastjsonschema = None
 
 APP_METRICS_SCHEMA = {
     "type": "array",
@@ -41,13 +44,82 @@
 }
 
 
-def validate_app_metrics_schema_as_dict(metrics: dict) -> bool:
+def _compile_app_metrics_validator():
+    validator_class = jsonschema.validators.validator_for(APP_METRICS_SCHEMA)
+    # the schema is static, so it is checked only once per process
+    validator_class.check_schema(APP_METRICS_SCHEMA)
+    return validator_class(APP_METRICS_SCHEMA)
+
+
+def _compile_app_metrics_fast_validator():
+    if fastjsonschema is None:
+        return None
     try:
-        validate(instance=metrics, schema=APP_METRICS_SCHEMA)
-    except jsonschema.exceptions.ValidationError as e:
-        logging.warning(f'Metrics do not match json schema: {e}')
+        return fastjsonschema.compile(APP_METRICS_SCHEMA)
+    except fastjsonschema.JsonSchemaDefinitionException as e:
+        logging.warning(f'Cannot generate fast validator for metrics json schema, jsonschema is used instead: {e}')
+        return None
+
+
+APP_METRICS_VALIDATOR = _compile_app_metrics_validator()
+APP_METRICS_FAST_VALIDATOR = _compile_app_metrics_fast_validator()
+
+
+def get_app_metrics_schema_errors(metrics) -> list[dict]:
+    """
+    Validates metrics against APP_METRICS_SCHEMA with the precompiled validator.
+
+    Parameters
+    ----------
+    metrics : list
+        metrics, scraped from executed notebook
+
+    Returns
+    -------
+    list[dict]
+        structured validation errors ('path', 'message', 'validator'). Empty list means metrics are valid
+    """
+
+    if APP_METRICS_FAST_VALIDATOR is not None:
+        try:
+            APP_METRICS_FAST_VALIDATOR(metrics)
+            return []
+        except fastjsonschema.JsonSchemaException:
+            # generated code stops on the first error, collect all of them with jsonschema
+            pass
+    return [
+        {
+            'path': '/'.join(str(p) for p in error.absolute_path),
+            'message': error.message,
+            'validator': error.validator
+        }
+        for error in sorted(APP_METRICS_VALIDATOR.iter_errors(metrics), key=lambda e: list(e.absolute_path))
+    ]
+
+
+def validate_app_metrics_bulk(metrics_by_notebook: dict) -> dict:
+    """
+    Validates metrics of many notebooks in one call.
+
+    Parameters
+    ----------
+    metrics_by_notebook : dict
+        executed notebook path -> metrics, scraped from this notebook
+
+    Returns
+    -------
+    dict
+        executed notebook path -> list of structured validation errors (empty list for valid metrics)
+    """
+
+    return {notebook: get_app_metrics_schema_errors(metrics) for notebook, metrics in metrics_by_notebook.items()}
+
+
+def validate_app_metrics_schema_as_dict(metrics: dict) -> bool:
+    errors = get_app_metrics_schema_errors(metrics)
+    if errors:
+        logging.warning(f'Metrics do not match json schema: {errors}')
         return False
-    print(0)
     return True
 
 
@@ -61,4 +133,8 @@ def validate_app_metrics_schema(metrics_json: str) -> bool:
     except json.JSONDecodeError as e:
         logging.error(f'Cannot deserialize metrics json string: {e}')
         sys.exit(1)
-    return validate_app_metrics_schema_as_dict(metrics)
+    is_valid = validate_app_metrics_schema_as_dict(metrics)
+    if is_valid:
+        # kept for shell callers, which check printed status code
+        print(0)
+    return is_valid
@@ -0,0 +1,251 @@
+import fcntl
+import json
+import os
+import sys
+import time
+
+CACHE_DIR_ENV = 'ENVCHECKER_K8S_CACHE_DIR'
+# existence of single namespaces, shared with shells/namespace_validator.sh: '<name>.exists' or '<name>.absent'
+NAMESPACE_STATUS_DIR_NAME = 'namespace'
+PAGE_SIZE = 500
+
+# kind: (API class, cluster-wide list method, namespaced list method)
+RESOURCES = {
+    'namespaces': ('CoreV1Api', 'list_namespace', None),
+    'pods': ('CoreV1Api', 'list_pod_for_all_namespaces', 'list_namespaced_pod'),
+    'deployments': ('AppsV1Api', 'list_deployment_for_all_namespaces', 'list_namespaced_deployment'),
+    'configmaps': ('CoreV1Api', 'list_config_map_for_all_namespaces', 'list_namespaced_config_map'),
+}
+
+_apis = {}
+_snapshots = {}
+
+
+def get_cache_dir():
+    """
+    Returns directory of run-scoped snapshot cache. run.sh sets its path for each run with '--k8s_cache=true'
+    and removes it afterwards. Notebooks, executed outside of run.sh or without the option, work without cache.
+
+    Returns:
+        str: path to cache directory or None if cache is disabled.
+    """
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    if not cache_dir:
+        return None
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def _get_api(api_class_name: str):
+    if api_class_name not in _apis:
+        from kubernetes import client, config
+        try:
+            config.load_incluster_config()
+        except config.ConfigException:
+            config.load_kube_config()
+        _apis[api_class_name] = getattr(client, api_class_name)()
+    return _apis[api_class_name]
+
+
+def _list_from_api(kind: str, namespace: str = None, label_selector: str = None) -> list[dict]:
+    """
+    Lists all objects of kind page by page. Responses are not deserialized into client models,
+    objects are returned as plain dicts in API server format (camelCase keys).
+    """
+    api_class_name, cluster_method, namespaced_method = RESOURCES[kind]
+    api = _get_api(api_class_name)
+    kwargs = {'limit': PAGE_SIZE, '_preload_content': False}
+    if label_selector:
+        kwargs['label_selector'] = label_selector
+    if namespace is not None and namespaced_method is not None:
+        method = getattr(api, namespaced_method)
+        kwargs['namespace'] = namespace
+    else:
+        method = getattr(api, cluster_method)
+    items = []
+    while True:
+        response = json.loads(method(**kwargs).data)
+        items.extend(response.get('items') or [])
+        continue_token = response.get('metadata', {}).get('continue')
+        if not continue_token:
+            return items
+        kwargs['_continue'] = continue_token
+
+
+def _get_scope(kind: str, namespace: str = None) -> str:
+    # objects of namespaced call are listed for this namespace only, so kernels do not load the whole cluster
+    if namespace is None or RESOURCES[kind][2] is None:
+        return kind
+    return f'{kind}.{namespace}'
+
+
+def _snapshot_path(cache_dir: str, scope: str) -> str:
+    return os.path.join(cache_dir, f'{scope}.json')
+
+
+def _error_path(cache_dir: str, scope: str) -> str:
+    return os.path.join(cache_dir, f'{scope}.error')
+
+
+def _write_atomically(path: str, content: str):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def populate(cache_dir: str, kind: str, namespace: str = None) -> bool:
+    """
+    Lists all objects of kind in namespace (in all namespaces if it is None) with bulk list calls and stores them
+    in cache directory. Only the first caller lists objects, concurrent callers (other kernels) wait for it on file
+    lock. If listing fails (e.g. no permissions to list cluster-wide), the error is stored, so the following calls
+    of this run do not repeat it.
+
+    Args:
+        cache_dir (str): cache directory.
+        kind (str): one of RESOURCES keys.
+        namespace (str): namespace of objects, all namespaces if None.
+
+    Returns:
+        bool: True if snapshot is available.
+    """
+    scope = _get_scope(kind, namespace)
+    snapshot_path = _snapshot_path(cache_dir, scope)
+    error_path = _error_path(cache_dir, scope)
+    with open(os.path.join(cache_dir, f'.{scope}.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if os.path.isfile(snapshot_path):
+            return True
+        if os.path.isfile(error_path):
+            return False
+        started_at = time.monotonic()
+        try:
+            items = _list_from_api(kind, namespace)
+        except Exception as e:
+            _write_atomically(error_path, str(e))
+            print(f'Kubernetes snapshot of {scope} is not available, direct API calls are used: {e}',
+                  file=sys.stderr)
+            return False
+        _write_atomically(snapshot_path, json.dumps({
+            'kind': kind,
+            'namespace': namespace,
+            'listed_at': time.time(),
+            'list_duration_ms': round((time.monotonic() - started_at) * 1000, 3),
+            'items': items
+        }))
+        return True
+
+
+def _load_snapshot(cache_dir: str, kind: str, namespace: str = None):
+    # snapshot is immutable during the run, so it is read once per kernel
+    key = (cache_dir, _get_scope(kind, namespace))
+    if key not in _snapshots:
+        if not populate(cache_dir, kind, namespace):
+            return None
+        with open(_snapshot_path(cache_dir, key[1]), 'r') as f:
+            _snapshots[key] = json.load(f)['items']
+    return _snapshots[key]
+
+
+def _matches_labels(item: dict, label_selector: str) -> bool:
+    # equality-based and existence requirements only: 'app=name,tier!=backend,label,!label'
+    labels = item.get('metadata', {}).get('labels') or {}
+    for requirement in label_selector.split(','):
+        requirement = requirement.strip()
+        if not requirement:
+            continue
+        if '!=' in requirement:
+            key, value = requirement.split('!=', 1)
+            if labels.get(key.strip()) == value.strip():
+                return False
+        elif '=' in requirement:
+            key, value = requirement.replace('==', '=').split('=', 1)
+            if labels.get(key.strip()) != value.strip():
+                return False
+        elif requirement.startswith('!'):
+            if requirement[1:].strip() in labels:
+                return False
+        elif requirement not in labels:
+            return False
+    return True
+
+
+def list_resources(kind: str, namespace: str = None, label_selector: str = None) -> list[dict]:
+    """
+    Returns objects of kind from run snapshot. Snapshot of every namespace (or of all namespaces, if namespace is
+    not passed) is listed once per run, on the first call, and is not refreshed: checks, which wait for changes
+    (e.g. poll pods until they are ready), must use kubernetes client directly.
+    Without cache (or if snapshot cannot be listed) the objects are listed from API server directly.
+
+    Args:
+        kind (str): one of 'namespaces', 'pods', 'deployments', 'configmaps'.
+        namespace (str): namespace to filter objects, all namespaces if None.
+        label_selector (str): equality-based label selector, e.g. 'app=env-checker,tier!=db'.
+
+    Returns:
+        list[dict]: objects in API server format, e.g. item['metadata']['name'], item['status']['phase'].
+    """
+    if kind not in RESOURCES:
+        raise ValueError(f'Unsupported kind {kind}, supported: {", ".join(RESOURCES)}')
+    cache_dir = get_cache_dir()
+    items = None
+    # set-based selectors, e.g. 'env in (dev,qa)', are left to API server
+    if cache_dir is not None and '(' not in (label_selector or ''):
+        items = _load_snapshot(cache_dir, kind, namespace)
+    if items is None:
+        return _list_from_api(kind, namespace, label_selector)
+    if label_selector:
+        items = [item for item in items if _matches_labels(item, label_selector)]
+    return items
+
+
+def get_namespaces() -> list[str]:
+    return [item['metadata']['name'] for item in list_resources('namespaces')]
+
+
+def namespace_exists(namespace: str) -> bool:
+    """
+    Checks existence of namespace with a single read call. Result is kept in run cache,
+    so all checks of the run (and namespace_validator.sh) read the namespace once.
+    """
+    cache_dir = get_cache_dir()
+    status_dir = os.path.join(cache_dir, NAMESPACE_STATUS_DIR_NAME) if cache_dir is not None else None
+    if status_dir is not None:
+        for status, exists in (('exists', True), ('absent', False)):
+            if os.path.isfile(os.path.join(status_dir, f'{namespace}.{status}')):
+                return exists
+    from kubernetes.client.rest import ApiException
+    try:
+        _get_api('CoreV1Api').read_namespace(namespace, _preload_content=False)
+        exists = True
+    except ApiException as e:
+        if e.status != 404:
+            raise
+        exists = False
+    if status_dir is not None:
+        os.makedirs(status_dir, exist_ok=True)
+        _write_atomically(os.path.join(status_dir, f"{namespace}.{'exists' if exists else 'absent'}"), '')
+    return exists
+
+
+def get_pods(namespace: str = None, label_selector: str = None) -> list[dict]:
+    return list_resources('pods', namespace, label_selector)
+
+
+def get_deployments(namespace: str = None, label_selector: str = None) -> list[dict]:
+    return list_resources('deployments', namespace, label_selector)
+
+
+def get_config_maps(namespace: str = None, label_selector: str = None) -> list[dict]:
+    return list_resources('configmaps', namespace, label_selector)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) in (3, 4) and sys.argv[1] == 'populate' and sys.argv[2] in RESOURCES:
+        directory = get_cache_dir()
+        if directory is None:
+            print(f'{CACHE_DIR_ENV} is not set', file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0 if populate(directory, sys.argv[2], sys.argv[3] if len(sys.argv) == 4 else None) else 1)
+    print(f'Usage: python k8s_snapshot_cache.py populate <{"|".join(RESOURCES)}> [namespace]')
+    sys.exit(1)
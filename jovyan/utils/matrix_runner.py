@@ -0,0 +1,252 @@
+import ast
+import copy
+import itertools
+import json
+import os
+import sys
+import uuid
+
+PARAMETERS_TAG = 'parameters'
+RESULT_TAG = 'result'
+MATRIX_TAG = 'matrix'
+MATRIX_SCRAP = 'matrix'
+# scraps, which are merged from all combinations, the last value wins for other scraps
+REPORT_SCRAP = 'report'
+METRICS_SCRAP = 'metrics'
+CUSTOM_REPORTS_SCRAP = 'custom_reports'
+
+# generated cells start with the marker, they are executed for failed combinations too
+GENERATED_MARKER = '# matrix runner'
+# nbclient does not stop the notebook on exception in cell with this tag
+RAISES_EXCEPTION_TAG = 'raises-exception'
+
+PROLOGUE = """# matrix runner
+import time as _matrix_time
+import scrapbook as _matrix_sb
+
+_matrix_glue = _matrix_sb.glue
+_matrix_runs = []
+
+
+def _matrix_collect_glue(name, data, encoder=None, display=None):
+    # scraps of combinations are collected and glued once, merged, in the last cell
+    _matrix_runs[-1]['scraps'][name] = data
+    if display:
+        _matrix_glue(name, data, encoder=encoder, display=display)
+
+
+def _matrix_is_failed():
+    return bool(_matrix_runs) and _matrix_runs[-1]['exception'] is not None
+
+
+def _matrix_skip_failed(lines):
+    # the rest of cells of failed combination are not executed
+    if _matrix_is_failed() and not (lines and lines[0].startswith({marker!r})):
+        return []
+    return lines
+
+
+def _matrix_record_exception(result):
+    # exception is recorded per combination, the following combinations and the last cell are still executed
+    error = result.error_before_exec or result.error_in_exec
+    if error is not None and _matrix_runs and not _matrix_is_failed():
+        _matrix_runs[-1]['exception'] = f'{{type(error).__name__}}: {{error}}'
+
+
+_matrix_sb.glue = _matrix_collect_glue
+get_ipython().input_transformers_cleanup.append(_matrix_skip_failed)
+get_ipython().events.register('post_run_cell', _matrix_record_exception)"""
+
+COMBINATION_START = """# matrix runner
+{assignments}
+_matrix_runs.append({{'params': {params!r}, 'scraps': {{}}, 'result': True, 'exception': None,
+                     'start': int(_matrix_time.time() * 1000)}})"""
+
+COMBINATION_RESULT = """_matrix_runs[-1]['result'] = {expression}
+_matrix_runs[-1]['result']"""
+
+COMBINATION_END = """# matrix runner
+if _matrix_is_failed():
+    _matrix_runs[-1]['result'] = False
+_matrix_runs[-1]['duration'] = int(_matrix_time.time() * 1000) - _matrix_runs[-1]['start']"""
+
+EPILOGUE = """# matrix runner
+_matrix_sb.glue = _matrix_glue
+get_ipython().input_transformers_cleanup.remove(_matrix_skip_failed)
+get_ipython().events.unregister('post_run_cell', _matrix_record_exception)
+
+
+def _matrix_default_metric(run):
+    namespace = run['params'].get('namespace', globals().get('namespace'))
+    return {{'report_namespace': str(namespace) if namespace is not None else 'null',
+            'status': 0 if run['result'] else 1, 'last_run': run['start'], 'last_duration': run['duration']}}
+
+
+_matrix_reports = [run['scraps'][{report!r}] for run in _matrix_runs if {report!r} in run['scraps']]
+_matrix_metrics = []
+_matrix_custom_reports = []
+_matrix_scraps = {{}}
+for _matrix_run in _matrix_runs:
+    _matrix_scraps.update(_matrix_run['scraps'])
+    _matrix_metrics.extend(_matrix_run['scraps'].get({metrics!r}) or [_matrix_default_metric(_matrix_run)])
+    _matrix_custom_reports.extend(r for r in _matrix_run['scraps'].get({custom_reports!r}, [])
+                                  if r not in _matrix_custom_reports)
+if any('storage' in report for report in _matrix_reports):
+    # reports of combinations are stored in side-car files by Report.glue(out_path, ...)
+    import report_storage as _matrix_report_storage
+    _matrix_scraps[{report!r}] = _matrix_report_storage.merge_reports(_matrix_reports, out_path)
+elif _matrix_reports:
+    _matrix_scraps[{report!r}] = {{
+        'name': _matrix_reports[0]['name'],
+        'values': [value for report in _matrix_reports for value in report['values']],
+        'isExceptionOccured': any(report.get('isExceptionOccured') for report in _matrix_reports)
+    }}
+_matrix_scraps[{metrics!r}] = _matrix_metrics
+if _matrix_custom_reports:
+    _matrix_scraps[{custom_reports!r}] = _matrix_custom_reports
+for _matrix_name, _matrix_data in _matrix_scraps.items():
+    _matrix_sb.glue(_matrix_name, _matrix_data)
+_matrix_sb.glue({matrix!r}, [{{'params': run['params'], 'result': bool(run['result']), 'duration': run['duration'],
+                           'exception': run['exception']}} for run in _matrix_runs])"""
+
+RESULT = """all(bool(run['result']) for run in _matrix_runs)"""
+
+
+def get_combinations(matrix: dict) -> list[dict]:
+    """
+    Expands matrix into all combinations of parameter values, e.g.
+    {'namespace': ['a', 'b'], 'mode': 'full'} ->
+    [{'namespace': 'a', 'mode': 'full'}, {'namespace': 'b', 'mode': 'full'}].
+
+    Args:
+        matrix (dict): parameter name to list of values (single value is a list of one value).
+
+    Returns:
+        list[dict]: combinations in order of values.
+    """
+    if not isinstance(matrix, dict) or not matrix:
+        raise ValueError(f'matrix must be a non-empty mapping of parameter names to values, got: {matrix!r}')
+    names = list(matrix)
+    values = [v if isinstance(v, list) else [v] for v in matrix.values()]
+    for name, v in zip(names, values):
+        if not v:
+            raise ValueError(f'matrix parameter {name} has no values')
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def _code_cell(source: str, tags: list[str] = None) -> dict:
+    return {'cell_type': 'code', 'execution_count': None, 'id': uuid.uuid4().hex[:8],
+            'metadata': {'tags': tags or [MATRIX_TAG]}, 'outputs': [], 'source': source}
+
+
+def _markdown_cell(source: str) -> dict:
+    return {'cell_type': 'markdown', 'id': uuid.uuid4().hex[:8], 'metadata': {'tags': [MATRIX_TAG]}, 'source': source}
+
+
+def _copy_cell(cell: dict) -> dict:
+    cell = copy.deepcopy(cell)
+    cell['id'] = uuid.uuid4().hex[:8]
+    if cell['cell_type'] == 'code':
+        cell['outputs'] = []
+        cell['execution_count'] = None
+    return cell
+
+
+def _get_tags(cell: dict) -> list[str]:
+    return cell.get('metadata', {}).get('tags', [])
+
+
+def _get_source(cell: dict) -> str:
+    source = cell.get('source', '')
+    return ''.join(source) if isinstance(source, list) else source
+
+
+def _record_result(cell: dict) -> str:
+    """
+    Returns source of 'result' cell, which assigns value of its last expression to result of combination.
+    """
+    source = _get_source(cell)
+    try:
+        statements = ast.parse(source).body
+    except SyntaxError as e:
+        raise ValueError(f'result cell must be a python code, got: {source!r}') from e
+    if not statements or not isinstance(statements[-1], ast.Expr):
+        raise ValueError(f'result cell must end with an expression, got: {source!r}')
+    lines = source.splitlines()
+    head = '\n'.join(lines[:statements[-1].lineno - 1])
+    expression = ast.get_source_segment(source, statements[-1])
+    result = COMBINATION_RESULT.format(expression=expression)
+    return f'{head}\n{result}' if head.strip() else result
+
+
+def build_matrix_notebook(nb: dict, matrix: dict) -> dict:
+    """
+    Creates notebook, which executes body of nb once per matrix combination within the same kernel.
+
+    Cells up to the 'parameters' cell are executed once. Then, for every combination, its parameters are assigned
+    and the rest of cells are copied; the 'result' cell is copied untagged and assigns its value to the result of
+    combination. Exception in a copied cell fails its combination only: the rest of its cells are skipped and
+    the following combinations are executed, so scraps of all combinations are glued.
+    sb.glue calls of combinations are collected and glued once at the end:
+    'report' values, 'metrics' (or default per-combination metric) and 'custom_reports' are merged,
+    'matrix' scrap keeps parameters, result, duration and exception of every combination.
+    The last cell is the 'result' cell: True, if all combinations succeeded.
+
+    Args:
+        nb (dict): source notebook in nbformat 4 JSON format.
+        matrix (dict): parameter name to list of values.
+
+    Returns:
+        dict: expanded notebook.
+    """
+    combinations = get_combinations(matrix)
+    cells = nb.get('cells', [])
+    parameters_index = next((i for i, c in enumerate(cells) if PARAMETERS_TAG in _get_tags(c)), -1)
+    head, body = cells[:parameters_index + 1], cells[parameters_index + 1:]
+
+    expanded = [copy.deepcopy(c) for c in head]
+    expanded.append(_code_cell(PROLOGUE.format(marker=GENERATED_MARKER)))
+    for params in combinations:
+        title = ', '.join(f'{name}={value}' for name, value in params.items())
+        expanded.append(_markdown_cell(f'## Matrix combination: {title}'))
+        assignments = '\n'.join(f'{name} = {value!r}' for name, value in params.items())
+        expanded.append(_code_cell(COMBINATION_START.format(assignments=assignments, params=params)))
+        for cell in body:
+            copied = _copy_cell(cell)
+            if cell['cell_type'] == 'code':
+                copied.setdefault('metadata', {})['tags'] = [t for t in _get_tags(cell) if t != RESULT_TAG]
+                copied['metadata']['tags'].append(RAISES_EXCEPTION_TAG)
+                if RESULT_TAG in _get_tags(cell):
+                    copied['source'] = _record_result(cell)
+            expanded.append(copied)
+        expanded.append(_code_cell(COMBINATION_END))
+    expanded.append(_code_cell(EPILOGUE.format(report=REPORT_SCRAP, metrics=METRICS_SCRAP,
+                                               custom_reports=CUSTOM_REPORTS_SCRAP, matrix=MATRIX_SCRAP)))
+    expanded.append(_code_cell(RESULT, [RESULT_TAG]))
+
+    result = copy.deepcopy({k: v for k, v in nb.items() if k != 'cells'})
+    result['cells'] = expanded
+    # cell ids are mandatory since nbformat 4.5
+    result['nbformat'], result['nbformat_minor'] = 4, max(nb.get('nbformat_minor', 5), 5)
+    return result
+
+
+def build_matrix_notebook_file(source_path: str, output_path: str, matrix: dict):
+    with open(source_path, 'r', encoding='utf-8') as f:
+        nb = json.load(f)
+    expanded = build_matrix_notebook(nb, matrix)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(expanded, f, indent=1, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 5 and sys.argv[1] == 'build':
+        try:
+            build_matrix_notebook_file(sys.argv[2], sys.argv[3], json.loads(sys.argv[4]))
+        except (OSError, ValueError) as e:
+            print(f'Cannot build matrix notebook: {e}')
+            sys.exit(1)
+        sys.exit(0)
+    print('Usage: python matrix_runner.py build <source_notebook_path> <output_notebook_path> <matrix_json>')
+    sys.exit(1)
@@ -0,0 +1,36 @@
+"""
+Jupyter server extension, which serves the latest results of all checks executed in the pod in Prometheus format.
+run.sh appends results to spool file with '-r metrics' (see metrics_registry.py), so no push to monitoring
+is needed and the endpoint can be scraped by ServiceMonitor.
+Loaded by installation/python/jupyter_server_config.py.
+"""
+from jupyter_server.base.handlers import JupyterHandler
+from jupyter_server.utils import url_path_join
+from tornado import web
+
+import metrics_registry
+
+# jupyter_server serves its own metrics on /metrics
+METRICS_PATH = 'envchecker/metrics'
+REGISTRY_SETTING = 'envchecker_metrics_registry'
+
+
+class MetricsHandler(JupyterHandler):
+    def get(self):
+        # the same setting as for /metrics of jupyter_server, ServiceMonitor passes UI access token otherwise
+        if self.settings.get('authenticate_prometheus', True) and not self.logged_in:
+            raise web.HTTPError(403)
+        self.set_header('Content-Type', metrics_registry.CONTENT_TYPE)
+        self.write(self.settings[REGISTRY_SETTING].render())
+
+
+def _jupyter_server_extension_points():
+    return [{'module': 'metrics_extension'}]
+
+
+def _load_jupyter_server_extension(serverapp):
+    serverapp.web_app.settings[REGISTRY_SETTING] = metrics_registry.MetricsRegistry()
+    serverapp.web_app.add_handlers('.*$', [
+        (url_path_join(serverapp.web_app.settings['base_url'], METRICS_PATH), MetricsHandler)
+    ])
+    serverapp.log.info(f'Env-checker metrics are served on /{METRICS_PATH}')
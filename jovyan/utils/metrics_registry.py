@@ -0,0 +1,215 @@
+import fcntl
+import json
+import os
+import sys
+import threading
+import time
+
+import constants
+import env_checker_utils
+
+ENVCHECKER_SOLUTION_CORRECTNESS_STATUS = 'envchecker_solution_correctness_status'
+ENVCHECKER_SOLUTION_CORRECTNESS_LAST_RUN = 'envchecker_solution_correctness_last_run'
+ENVCHECKER_SOLUTION_CORRECTNESS_LAST_DURATION = 'envchecker_solution_correctness_last_duration'
+ENVCHECKER_SOLUTION_CORRECTNESS_PHASE_DURATION = 'envchecker_solution_correctness_phase_duration'
+PHASE_LABEL = 'phase'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+SPOOL_FILE_NAME = 'spool.jsonl'
+# spool is rewritten with the latest values only, when it grows over this size
+SPOOL_MAX_BYTES = 1024 * 1024
+
+
+def get_spool_path() -> str:
+    """
+    Returns path to spool file, which is appended by run.sh processes and read by Jupyter server extension.
+    """
+    return os.path.join(env_checker_utils.get_state_dir('metrics'), SPOOL_FILE_NAME)
+
+
+def get_check_series(notebook_metrics: list, phases: list[dict] = None) -> list[tuple]:
+    """
+    Builds series of executed check, the same for remote-write (monitoringUtils.MonitoringHelper) and /metrics endpoint.
+
+    Args:
+        notebook_metrics (list[NotebookMetrics]): metrics of executed notebook from result.yaml.
+        phases (list[dict]): phase records of check, see phase_timing.py.
+
+    Returns:
+        list[tuple]: (metric name, labels, value) tuples.
+    """
+    series = []
+    for notebook_metric in notebook_metrics:
+        labels = {
+            constants.INITIATOR_LABEL: notebook_metric.get_initiator(),
+            constants.REPORT_NAME_LABEL: notebook_metric.get_report_name(),
+            constants.S3_LINK_LABEL: notebook_metric.get_s3_link(),
+            constants.REPORT_NAMESPACE_LABEL: notebook_metric.get_report_namespace(),
+            constants.REPORT_APP_LABEL: notebook_metric.get_report_app(),
+            constants.ENV_LABEL: notebook_metric.get_env(),
+            constants.SCOPE_LABEL: notebook_metric.get_scope()
+        }
+        series.append((ENVCHECKER_SOLUTION_CORRECTNESS_STATUS, labels, notebook_metric.get_status()))
+        series.append((ENVCHECKER_SOLUTION_CORRECTNESS_LAST_RUN, labels, notebook_metric.get_last_run()))
+        series.append((ENVCHECKER_SOLUTION_CORRECTNESS_LAST_DURATION, labels, notebook_metric.get_last_duration()))
+
+    if phases and notebook_metrics:
+        # phases are measured per check, so labels of check (not of application) are used
+        notebook_metric = notebook_metrics[0]
+        check_labels = {
+            constants.INITIATOR_LABEL: notebook_metric.get_initiator(),
+            constants.REPORT_NAME_LABEL: notebook_metric.get_report_name(),
+            constants.ENV_LABEL: notebook_metric.get_env(),
+            constants.SCOPE_LABEL: notebook_metric.get_scope()
+        }
+        for phase in phases:
+            series.append((ENVCHECKER_SOLUTION_CORRECTNESS_PHASE_DURATION,
+                           {**check_labels, PHASE_LABEL: phase['phase']},
+                           int(phase['duration_ms'])))
+    return series
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    # timestamps in milliseconds must not be rounded by float formatting
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render_sample(name: str, labels: dict, value) -> str:
+    """
+    Renders sample in Prometheus text exposition format. Labels with None values are omitted.
+    """
+    label_pairs = ','.join(f'{key}="{_escape_label_value(labels[key])}"'
+                           for key in sorted(labels) if labels[key] is not None)
+    return f'{name}{{{label_pairs}}} {_format_value(value)}\n' if label_pairs else f'{name} {_format_value(value)}\n'
+
+
+def _open_locked(path: str):
+    # spool can be compacted (replaced) by server while run.sh waits for the lock, so the new file is reopened
+    while True:
+        f = open(path, 'a+')
+        fcntl.flock(f, fcntl.LOCK_EX)
+        if os.path.exists(path) and os.fstat(f.fileno()).st_ino == os.stat(path).st_ino:
+            return f
+        f.close()
+
+
+def spool_series(series: list[tuple], spool_path: str = None):
+    """
+    Appends series of executed check to spool file as one JSON line.
+    """
+    spool_path = spool_path or get_spool_path()
+    record = {'time': time.time(),
+              'series': [[name, labels, value] for name, labels, value in series if value is not None]}
+    with _open_locked(spool_path) as f:
+        f.write(json.dumps(record) + '\n')
+
+
+class MetricsRegistry:
+    """
+    Keeps the latest value of every series of the pod and its rendered text. Spool file is read from the last offset,
+    only changed samples are rendered again, so scrape cost does not depend on how often checks are run.
+    """
+
+    def __init__(self, spool_path: str = None, spool_max_bytes: int = SPOOL_MAX_BYTES):
+        self.spool_path = spool_path or get_spool_path()
+        self.spool_max_bytes = spool_max_bytes
+        self._samples = {}
+        self._text = ''
+        self._dirty = False
+        self._offset = 0
+        self._inode = None
+        self._lock = threading.Lock()
+
+    def update(self, series: list):
+        for name, labels, value in series:
+            if value is None:
+                continue
+            key = tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+            sample = render_sample(name, labels, value)
+            samples = self._samples.setdefault(name, {})
+            if key not in samples or samples[key][1] != sample:
+                samples[key] = (value, sample)
+                self._dirty = True
+
+    def _snapshot(self) -> list:
+        return [[name, dict(key), value]
+                for name, samples in self._samples.items() for key, (value, _) in samples.items()]
+
+    def _read_spool(self):
+        if not os.path.isfile(self.spool_path):
+            return
+        with open(self.spool_path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_ino != self._inode or stat.st_size < self._offset:
+                # spool is compacted or recreated, the new one starts with snapshot of all series
+                self._inode = stat.st_ino
+                self._offset = 0
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # line is being written now, it is read on the next scrape
+                    break
+                self._offset += len(line)
+                try:
+                    self.update(json.loads(line)['series'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+    def _compact_spool(self):
+        if not os.path.isfile(self.spool_path) or os.path.getsize(self.spool_path) <= self.spool_max_bytes:
+            return
+        with _open_locked(self.spool_path):
+            self._read_spool()
+            tmp_path = f'{self.spool_path}.tmp'
+            with open(tmp_path, 'w') as tmp:
+                tmp.write(json.dumps({'time': time.time(), 'series': self._snapshot()}) + '\n')
+            os.replace(tmp_path, self.spool_path)
+            stat = os.stat(self.spool_path)
+            self._inode = stat.st_ino
+            self._offset = stat.st_size
+
+    def render(self) -> str:
+        """
+        Returns all series in Prometheus text exposition format, reading new records of spool file first.
+        """
+        with self._lock:
+            self._read_spool()
+            self._compact_spool()
+            if self._dirty:
+                self._text = ''.join(f'# TYPE {name} gauge\n' + ''.join(sample for _, sample in samples.values())
+                                     for name, samples in sorted(self._samples.items()))
+                self._dirty = False
+            return self._text
+
+
+def spool_notebook_execution_results(executed_notebook_path: str):
+    """
+    WARNING: must be used only by run.sh
+    """
+    import nb_data_manipulation_utils
+    import phase_timing
+    notebook_metrics = nb_data_manipulation_utils.extract_notebook_execution_data_from_result_file(
+        executed_notebook_path
+    )
+    if not notebook_metrics:
+        return
+    # phase timings are recorded by run.sh only if '--phases=true' flag is passed
+    phases = phase_timing.load_phases(os.environ.get(phase_timing.PHASES_FILE_ENV))
+    spool_series(get_check_series(notebook_metrics, phases))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == 'spool':
+        spool_notebook_execution_results(sys.argv[2])
+        sys.exit(0)
+    if len(sys.argv) == 2 and sys.argv[1] == 'render':
+        print(MetricsRegistry().render(), end='')
+        sys.exit(0)
+    print('Usage: python metrics_registry.py spool <executed_notebook_path>')
+    print('       python metrics_registry.py render')
+    sys.exit(1)
@@ -2,10 +2,18 @@
 sys.path  # noqa: E402
 sys.path.append("/home/jovyan/utils")  # noqa: E402
 import math
+import os
 import urllib3
 import env_checker_utils
 import nb_data_manipulation_utils
-import constants
+import phase_timing
+from metrics_registry import (
+    ENVCHECKER_SOLUTION_CORRECTNESS_STATUS,
+    ENVCHECKER_SOLUTION_CORRECTNESS_LAST_RUN,
+    ENVCHECKER_SOLUTION_CORRECTNESS_LAST_DURATION,
+    ENVCHECKER_SOLUTION_CORRECTNESS_PHASE_DURATION,
+    get_check_series,
+)
 
 from NotebookMetrics import NotebookMetrics
 from urllib.parse import urljoin
@@ -17,10 +25,6 @@
 from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
 from opentelemetry.sdk.resources import Resource
 
-ENVCHECKER_SOLUTION_CORRECTNESS_STATUS = 'envchecker_solution_correctness_status'
-ENVCHECKER_SOLUTION_CORRECTNESS_LAST_RUN = 'envchecker_solution_correctness_last_run'
-ENVCHECKER_SOLUTION_CORRECTNESS_LAST_DURATION = 'envchecker_solution_correctness_last_duration'
-
 
 class Metric:
     def __init__(self, name: str, value: int, labels: dict):
@@ -74,16 +78,18 @@ class MonitoringHelper:
     status_metrics = []
     last_run_metrics = []
     last_duration_metrics = []
+    phase_duration_metrics = []
 
     urllib3.disable_warnings()
 
     @classmethod
     def registerGauges(cls):
         """
-        Registers (if not registered already) 3 ObservableGauge instruments for representing
+        Registers (if not registered already) 4 ObservableGauge instruments for representing
           ENVCHECKER_SOLUTION_CORRECTNESS_STATUS,
           ENVCHECKER_SOLUTION_CORRECTNESS_LAST_RUN,
-          ENVCHECKER_SOLUTION_CORRECTNESS_LAST_DURATION
+          ENVCHECKER_SOLUTION_CORRECTNESS_LAST_DURATION,
+          ENVCHECKER_SOLUTION_CORRECTNESS_PHASE_DURATION
         metrics.
         Each ObservableGauge will be used then to create metrics in monitoring.
         """
@@ -132,6 +138,22 @@ def last_duration_observable_gauge_func(options):
                 [last_duration_observable_gauge_func]
             )
 
+        if not cls.meter._is_instrument_registered(
+            name=ENVCHECKER_SOLUTION_CORRECTNESS_PHASE_DURATION,
+            type_=type(ObservableGauge),
+            unit='',
+            description=''
+        )[0]:
+            def phase_duration_observable_gauge_func(options):
+                observations = []
+                for m in cls.phase_duration_metrics:
+                    observations.append(metricsLib.Observation(m.get_value(), m.get_labels()))
+                return observations
+            cls.meter.create_observable_gauge(
+                ENVCHECKER_SOLUTION_CORRECTNESS_PHASE_DURATION,
+                [phase_duration_observable_gauge_func]
+            )
+
     @classmethod
     def flush(cls):
         """
@@ -150,37 +172,26 @@ def pushNotebookExecutionResultsToMonitoringByExecutedNotebookPath(cls, executed
         notebook_execution_data_list = nb_data_manipulation_utils.extract_notebook_execution_data_from_result_file(
             executed_notebook_path
         )
-        cls.pushToMonitoring(notebook_execution_data_list)
+        # phase timings are recorded by run.sh only if '--phases=true' flag is passed
+        phases = phase_timing.load_phases(os.environ.get(phase_timing.PHASES_FILE_ENV))
+        cls.pushToMonitoring(notebook_execution_data_list, phases)
 
     @classmethod
-    def pushToMonitoring(cls, notebook_metrics: list[NotebookMetrics]):
+    def pushToMonitoring(cls, notebook_metrics: list[NotebookMetrics], phases: list[dict] = None):
         cls.status_metrics = []
         cls.last_run_metrics = []
         cls.last_duration_metrics = []
-
-        for notebook_metric in notebook_metrics:
-            last_duration = notebook_metric.get_last_duration()
-            last_run = notebook_metric.get_last_run()
-            status = notebook_metric.get_status()
-            labels = {
-                constants.INITIATOR_LABEL: notebook_metric.get_initiator(),
-                constants.REPORT_NAME_LABEL: notebook_metric.get_report_name(),
-                constants.S3_LINK_LABEL: notebook_metric.get_s3_link(),
-                constants.REPORT_NAMESPACE_LABEL: notebook_metric.get_report_namespace(),
-                constants.REPORT_APP_LABEL: notebook_metric.get_report_app(),
-                constants.ENV_LABEL: notebook_metric.get_env(),
-                constants.SCOPE_LABEL: notebook_metric.get_scope()
-            }
-
-            cls.status_metrics.append(Metric(ENVCHECKER_SOLUTION_CORRECTNESS_STATUS, status, labels))
-            cls.last_run_metrics.append(Metric(ENVCHECKER_SOLUTION_CORRECTNESS_LAST_RUN, last_run, labels))
-            cls.last_duration_metrics.append(
-                Metric(
-                    ENVCHECKER_SOLUTION_CORRECTNESS_LAST_DURATION,
-                    last_duration,
-                    labels
-                )
-            )
+        cls.phase_duration_metrics = []
+
+        # series are the same as served by /envchecker/metrics endpoint, see metrics_registry.py
+        metrics_by_name = {
+            ENVCHECKER_SOLUTION_CORRECTNESS_STATUS: cls.status_metrics,
+            ENVCHECKER_SOLUTION_CORRECTNESS_LAST_RUN: cls.last_run_metrics,
+            ENVCHECKER_SOLUTION_CORRECTNESS_LAST_DURATION: cls.last_duration_metrics,
+            ENVCHECKER_SOLUTION_CORRECTNESS_PHASE_DURATION: cls.phase_duration_metrics,
+        }
+        for name, labels, value in get_check_series(notebook_metrics, phases):
+            metrics_by_name[name].append(Metric(name, value, labels))
 
         cls.registerGauges()
         cls.flush()
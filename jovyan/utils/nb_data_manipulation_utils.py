@@ -246,6 +246,9 @@ def extract_nb_execution_data_from_result_file_for_s3_pushing(executed_notebook_
                             extract_label_value_from_result_metric(
                                 executed_notebook_path, m, constants.SCOPE_LABEL
                             ),
+                        # status and duration are not a part of report path, they are kept in report index
+                        constants.STATUS: m.get(constants.STATUS),
+                        constants.LAST_DURATION: m.get(constants.LAST_DURATION),
                     }
                 else:
                     print(
@@ -294,3 +297,35 @@ def extract_metrics_from_nb_scraps(executed_notebook_path) -> bool:
         print(json.dumps(nb.scraps.data_dict[METRICS]))
     except KeyError:
         print('{}')
+
+
+def extract_valid_metrics_from_nb_scraps(executed_notebook_path):
+    '''
+    WARNING: must be used only for run.sh
+
+    Prints 'metrics' scrap of executed notebook as json, if it is present and matches APP_METRICS_SCHEMA.
+    Otherwise prints '{}'. Extraction and validation are done within one process.
+    '''
+
+    nb = sb.read_notebook(executed_notebook_path)
+    metrics = nb.scraps.data_dict.get(METRICS)
+    if metrics is None or not json_schema_validation.validate_app_metrics_schema_as_dict(metrics):
+        print('{}')
+        return
+    print(json.dumps(metrics))
+
+
+def validate_metrics_from_nb_scraps_bulk(executed_notebook_paths: list[str]) -> dict:
+    '''
+    Validates 'metrics' scraps of many executed notebooks in one call.
+    Notebooks without 'metrics' scrap are skipped.
+
+    Returns executed notebook path -> list of structured validation errors (empty list for valid metrics).
+    '''
+
+    metrics_by_notebook = {}
+    for executed_notebook_path in executed_notebook_paths:
+        nb_scraps = sb.read_notebook(executed_notebook_path).scraps.data_dict
+        if METRICS in nb_scraps:
+            metrics_by_notebook[executed_notebook_path] = nb_scraps[METRICS]
+    return json_schema_validation.validate_app_metrics_bulk(metrics_by_notebook)
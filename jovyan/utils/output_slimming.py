@@ -0,0 +1,163 @@
+import base64
+import hashlib
+import os
+import sys
+
+import nbformat
+
+# outputs of 'result' cell and scrapbook scraps are read by run.sh and report generators, so they are kept as is
+RESULT_TAG = 'result'
+SCRAPBOOK_MIME_PREFIX = 'application/scrapbook'
+SCRAPBOOK_METADATA = 'scrapbook'
+IMAGE_MIME_TYPES = ('image/png', 'image/jpeg', 'image/gif')
+WIDGET_VIEW_MIME = 'application/vnd.jupyter.widget-view+json'
+WIDGET_STATE_METADATA = 'widgets'
+
+DEFAULT_MAX_STREAM_CHARS = 20000
+DEFAULT_MAX_IMAGE_BYTES = 32 * 1024
+# images of executed notebook are kept in PDF report (if it is created), so by default they are dropped from notebook
+DROP_IMAGES = 'drop'
+EXTERNALISE_IMAGES = 'externalise'
+KEEP_IMAGES = 'keep'
+IMAGE_MODES = (DROP_IMAGES, EXTERNALISE_IMAGES, KEEP_IMAGES)
+
+
+def _text(value) -> str:
+    return ''.join(value) if isinstance(value, list) else value
+
+
+def collapse_repeated_lines(text: str) -> str:
+    """
+    Collapses consecutive identical lines of stream output, e.g. progress or retry messages, into one line.
+    """
+    lines = text.splitlines(keepends=True)
+    collapsed = []
+    i = 0
+    while i < len(lines):
+        j = i
+        while j + 1 < len(lines) and lines[j + 1] == lines[i]:
+            j += 1
+        collapsed.append(lines[i])
+        if j > i:
+            collapsed.append(f'... previous line is repeated {j - i} more times\n')
+        i = j + 1
+    return ''.join(collapsed)
+
+
+def truncate_text(text: str, max_chars: int) -> str:
+    # the beginning and the end of output are usually the most informative parts
+    if len(text) <= max_chars:
+        return text
+    head = max_chars // 2
+    tail = max_chars - head
+    return f'{text[:head]}\n... {len(text) - max_chars} characters are truncated ...\n{text[-tail:]}'
+
+
+def _is_preserved(output: dict) -> bool:
+    if SCRAPBOOK_METADATA in (output.get('metadata') or {}):
+        return True
+    return any(mime.startswith(SCRAPBOOK_MIME_PREFIX) for mime in output.get('data') or {})
+
+
+def _slim_stream_outputs(outputs: list, max_stream_chars: int) -> list:
+    # consecutive chunks of the same stream are merged, so they are deduplicated and truncated as one text
+    merged = []
+    for output in outputs:
+        if (output.get('output_type') == 'stream' and merged and merged[-1].get('output_type') == 'stream'
+                and merged[-1].get('name') == output.get('name')):
+            merged[-1]['text'] = _text(merged[-1]['text']) + _text(output['text'])
+        else:
+            merged.append(output)
+    for output in merged:
+        if output.get('output_type') == 'stream':
+            output['text'] = truncate_text(collapse_repeated_lines(_text(output['text'])), max_stream_chars)
+    return merged
+
+
+def _slim_images(output: dict, max_image_bytes: int, images: str, files_dir: str, pdf_report: bool):
+    data = output.get('data') or {}
+    if WIDGET_VIEW_MIME in data:
+        # widget state is not saved in executed notebook, so the view cannot be rendered anyway
+        del data[WIDGET_VIEW_MIME]
+    if images == KEEP_IMAGES:
+        return
+    for mime in IMAGE_MIME_TYPES:
+        if mime not in data:
+            continue
+        content = _text(data[mime])
+        size = len(content) * 3 // 4
+        if size <= max_image_bytes:
+            continue
+        note = f'[{mime} image of {size} bytes is dropped from notebook{", see PDF report" if pdf_report else ""}]'
+        if images == EXTERNALISE_IMAGES:
+            raw = base64.b64decode(content)
+            file_name = f"{hashlib.sha256(raw).hexdigest()[:16]}.{mime.split('/')[1]}"
+            os.makedirs(files_dir, exist_ok=True)
+            file_path = os.path.join(files_dir, file_name)
+            # the same image of several cells is stored once
+            if not os.path.isfile(file_path):
+                with open(file_path, 'wb') as f:
+                    f.write(raw)
+            note = f'[{mime} image is externalised to {os.path.basename(files_dir)}/{file_name}]'
+        del data[mime]
+        plain_text = _text(data.get('text/plain', ''))
+        data['text/plain'] = f'{plain_text}\n{note}' if plain_text else note
+
+
+def get_files_dir(notebook_path: str) -> str:
+    """
+    Returns folder of externalised images of notebook, run.sh adds it to 'outs' of check, if it exists.
+    """
+    return f'{os.path.splitext(notebook_path)[0]}_files'
+
+
+def slim_notebook(notebook_path: str, max_stream_chars: int = DEFAULT_MAX_STREAM_CHARS,
+                  max_image_bytes: int = DEFAULT_MAX_IMAGE_BYTES, images: str = DROP_IMAGES) -> tuple:
+    """
+    Strips heavy outputs of executed notebook in place: repeated and long stream outputs, large base64 images
+    and widget state. Outputs of 'result' cell, scrapbook scraps, cell metadata and papermill metadata are kept.
+    Notes of dropped images refer to PDF report only if it was created next to notebook.
+
+    Args:
+        notebook_path (str): path to executed notebook.
+        max_stream_chars (int): maximal length of stream output of cell, the middle part is truncated.
+        max_image_bytes (int): images up to this size are kept in notebook.
+        images (str): 'drop', 'externalise' (to '<notebook name>_files' folder) or 'keep' large images.
+
+    Returns:
+        tuple: size of notebook file before and after slimming in bytes.
+    """
+    if images not in IMAGE_MODES:
+        raise ValueError(f'Unknown images mode {images}, supported: {", ".join(IMAGE_MODES)}')
+    size_before = os.path.getsize(notebook_path)
+    nb = nbformat.read(notebook_path, as_version=4)
+    files_dir = get_files_dir(notebook_path)
+    # 'run.sh --pdf=false' does not create PDF report
+    pdf_report = os.path.isfile(f'{os.path.splitext(notebook_path)[0]}.pdf')
+    nb.metadata.pop(WIDGET_STATE_METADATA, None)
+    for cell in nb.cells:
+        if cell.get('cell_type') != 'code' or RESULT_TAG in cell.get('metadata', {}).get('tags', []):
+            continue
+        outputs = []
+        for output in _slim_stream_outputs(cell.get('outputs') or [], max_stream_chars):
+            if not _is_preserved(output):
+                _slim_images(output, max_image_bytes, images, files_dir, pdf_report)
+            outputs.append(output)
+        cell['outputs'] = outputs
+    tmp_path = f'{notebook_path}.slim.tmp'
+    nbformat.write(nb, tmp_path)
+    os.replace(tmp_path, notebook_path)
+    return size_before, os.path.getsize(notebook_path)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) in (2, 3):
+        try:
+            before, after = slim_notebook(sys.argv[1], images=sys.argv[2] if len(sys.argv) == 3 else DROP_IMAGES)
+        except (OSError, ValueError) as e:
+            print(f'Cannot slim notebook {sys.argv[1]}: {e}', file=sys.stderr)
+            sys.exit(1)
+        print(f'slimmed {os.path.basename(sys.argv[1])}: {before} -> {after} bytes, {before - after} bytes saved')
+        sys.exit(0)
+    print('Usage: python output_slimming.py <executed_notebook_path> [drop|externalise|keep]')
+    sys.exit(1)
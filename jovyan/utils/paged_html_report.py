@@ -0,0 +1,344 @@
+"""
+Paged HTML summary for large reports, see report_generator.py. Rows of 'report' scraps are embedded into
+'<report_name>.html' as gzip-compressed payload of the same JSON lines as ndjson export (report_export.py),
+and the browser renders them page by page with filtering, sorting and virtual scrolling. So the document
+contains only visible rows and rendering does not depend on amount of rows in report.
+Colouring of OK/FAILED/ERROR/NONE cells and the slowest timed rows is the same as in static summary.
+
+Scripts of HTML files are executed by JupyterLab only after 'Trust HTML' is pressed in HTML viewer.
+"""
+import base64
+import gzip
+import html
+import io
+import os
+
+import check_timing
+import report_export
+
+TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<style>
+body { font-family: sans-serif }
+table { border-collapse: collapse }
+th, td { border:1px solid black; text-align: center; height: 22px; padding: 0 6px; white-space: nowrap;
+         max-width: 320px; overflow: hidden; text-overflow: ellipsis }
+th { cursor: pointer; position: sticky; top: 0; background-color: WhiteSmoke }
+.viewport { max-height: __VIEWPORT_HEIGHT__px; overflow-y: auto; display: inline-block; margin-bottom: 24px }
+.controls > * { margin-right: 12px }
+.ok { background-color: DarkSeaGreen }
+.failed { background-color: DarkSalmon }
+.none { background-color: LightGrey }
+.slowest { color: DarkRed; font-weight: bold }
+.exception { display: inline; color: red; font-size: 20px }
+.spacer td { border: none; padding: 0 }
+</style>
+</head>
+<body>
+<h2>__TITLE__</h2>
+<noscript>The report is rendered by script. In JupyterLab press 'Trust HTML' or open the file in a browser.</noscript>
+<div id="report">Loading __ROWS__ rows...</div>
+<script type="application/gzip" id="payload">__PAYLOAD__</script>
+<script>
+(function () {
+    var ROW_HEIGHT = __ROW_HEIGHT__, VIEWPORT_HEIGHT = __VIEWPORT_HEIGHT__, OVERSCAN = 20;
+    var PAGE_SIZES = [100, 1000, 10000], SLOWEST_ROWS = __SLOWEST_ROWS__, TIME_COLUMN = '__TIME_COLUMN__';
+    var STATUSES = {ok: 'ok', good: 'ok', passed: 'ok', error: 'failed', failed: 'failed'};
+
+    // the same rules as add_style_block of report_generator.py
+    function statusClass(value) {
+        if (value === null || value === undefined) {
+            return '';
+        }
+        var first = String(value).trim().split(/\\s+/)[0];
+        if (first === 'NONE') {
+            return 'none';
+        }
+        return STATUSES[first.toLowerCase()] || '';
+    }
+
+    function element(tag, text, className) {
+        var node = document.createElement(tag);
+        if (text !== undefined && text !== null) {
+            node.textContent = text;
+        }
+        if (className) {
+            node.className = className;
+        }
+        return node;
+    }
+
+    function compare(a, b) {
+        if (a === b) {
+            return 0;
+        }
+        if (a === null) {
+            return 1;
+        }
+        if (b === null) {
+            return -1;
+        }
+        if (typeof a === 'number' && typeof b === 'number') {
+            return a - b;
+        }
+        return String(a).localeCompare(String(b));
+    }
+
+    function TableView(container, table) {
+        var view = this;
+        this.table = table;
+        this.rows = table.rows;
+        this.pageSize = PAGE_SIZES[1];
+        this.page = 0;
+        this.slowest = new Set();
+        var timeIndex = table.columns.indexOf(TIME_COLUMN);
+        if (timeIndex >= 0) {
+            // the slowest timed checks are the first, see custom_reporter.Report.timed
+            this.sortBy(timeIndex, -1);
+            this.rows.slice(0, SLOWEST_ROWS).forEach(function (row) {
+                if (row[timeIndex] !== null) {
+                    view.slowest.add(row);
+                }
+            });
+        }
+        this.timeIndex = timeIndex;
+
+        table.notebooks.forEach(function (notebook) {
+            container.appendChild(element('b', notebook.notebook));
+            if (notebook.isExceptionOccured) {
+                container.appendChild(element('p', ' Timeout Exception', 'exception'));
+            }
+            container.appendChild(element('br'));
+        });
+        var controls = element('div', null, 'controls');
+        this.filter = element('input');
+        this.filter.placeholder = 'Filter rows';
+        this.filter.oninput = function () { view.applyFilter(); };
+        var failedOnly = element('label', ' failed only');
+        this.failedOnly = element('input');
+        this.failedOnly.type = 'checkbox';
+        this.failedOnly.onchange = function () { view.applyFilter(); };
+        failedOnly.insertBefore(this.failedOnly, failedOnly.firstChild);
+        var pageSize = element('select');
+        PAGE_SIZES.forEach(function (size) {
+            var option = element('option', size + ' rows per page');
+            option.value = size;
+            option.selected = size === view.pageSize;
+            pageSize.appendChild(option);
+        });
+        pageSize.onchange = function () {
+            view.pageSize = parseInt(pageSize.value, 10);
+            view.page = 0;
+            view.render();
+        };
+        var previous = element('button', '<');
+        previous.onclick = function () { view.showPage(view.page - 1); };
+        var next = element('button', '>');
+        next.onclick = function () { view.showPage(view.page + 1); };
+        this.info = element('span');
+        [this.filter, failedOnly, pageSize, previous, this.info, next].forEach(function (control) {
+            controls.appendChild(control);
+        });
+        container.appendChild(controls);
+
+        this.viewport = element('div', null, 'viewport');
+        var htmlTable = element('table');
+        var header = element('tr');
+        table.columns.forEach(function (column, index) {
+            var th = element('th', column);
+            th.onclick = function () {
+                view.sortBy(index, view.sortIndex === index ? -view.sortOrder : 1);
+                view.applyFilter();
+            };
+            header.appendChild(th);
+        });
+        htmlTable.appendChild(element('thead')).appendChild(header);
+        this.body = htmlTable.appendChild(element('tbody'));
+        this.viewport.appendChild(htmlTable);
+        this.viewport.onscroll = function () { view.renderRows(); };
+        container.appendChild(this.viewport);
+        this.applyFilter();
+    }
+
+    TableView.prototype.sortBy = function (index, order) {
+        this.sortIndex = index;
+        this.sortOrder = order;
+        // Array.prototype.sort is stable, missing values are the last in both orders
+        this.rows.sort(function (a, b) {
+            if (a[index] === null || b[index] === null) {
+                return compare(a[index], b[index]);
+            }
+            return order * compare(a[index], b[index]);
+        });
+    };
+
+    TableView.prototype.applyFilter = function () {
+        var text = this.filter.value.toLowerCase(), failedOnly = this.failedOnly.checked;
+        this.filtered = this.rows.filter(function (row) {
+            return (!text || row.some(function (value) {
+                return value !== null && String(value).toLowerCase().indexOf(text) >= 0;
+            })) && (!failedOnly || row.some(function (value) { return statusClass(value) === 'failed'; }));
+        });
+        this.page = 0;
+        this.render();
+    };
+
+    TableView.prototype.showPage = function (page) {
+        var pages = Math.max(1, Math.ceil(this.filtered.length / this.pageSize));
+        this.page = Math.min(Math.max(page, 0), pages - 1);
+        this.render();
+    };
+
+    TableView.prototype.render = function () {
+        var start = this.page * this.pageSize;
+        this.pageRows = this.filtered.slice(start, start + this.pageSize);
+        this.info.textContent = (this.pageRows.length ? start + 1 : 0) + '-' + (start + this.pageRows.length) +
+            ' of ' + this.filtered.length + ' rows' + (this.filtered.length !== this.rows.length ?
+            ' (' + this.rows.length + ' total)' : '');
+        this.viewport.scrollTop = 0;
+        this.renderRows();
+    };
+
+    TableView.prototype.spacer = function (rows) {
+        var tr = element('tr', null, 'spacer');
+        tr.style.height = (rows * ROW_HEIGHT) + 'px';
+        var td = element('td');
+        td.colSpan = this.table.columns.length;
+        tr.appendChild(td);
+        return tr;
+    };
+
+    // only rows in the visible part of viewport are in the document
+    TableView.prototype.renderRows = function () {
+        var view = this;
+        var first = Math.max(0, Math.floor(this.viewport.scrollTop / ROW_HEIGHT) - OVERSCAN);
+        var last = Math.min(this.pageRows.length, first + Math.ceil(VIEWPORT_HEIGHT / ROW_HEIGHT) + 2 * OVERSCAN);
+        var fragment = document.createDocumentFragment();
+        fragment.appendChild(this.spacer(first));
+        this.pageRows.slice(first, last).forEach(function (row) {
+            var tr = element('tr');
+            tr.style.height = ROW_HEIGHT + 'px';
+            row.forEach(function (value, index) {
+                var text = value === null ? '' : String(value);
+                var td = element('td', text, statusClass(value));
+                td.title = text;
+                if (index === view.timeIndex && view.slowest.has(row)) {
+                    td.classList.add('slowest');
+                }
+                tr.appendChild(td);
+            });
+            fragment.appendChild(tr);
+        });
+        fragment.appendChild(this.spacer(this.pageRows.length - last));
+        this.body.replaceChildren(fragment);
+    };
+
+    function parse(text) {
+        var tables = {}, order = [];
+        text.split('\\n').forEach(function (line) {
+            if (!line) {
+                return;
+            }
+            var record = JSON.parse(line);
+            if (record.columns) {
+                tables[record.schema] = {columns: record.columns, notebooks: [], rows: []};
+                order.push(record.schema);
+            } else if (record.notebook) {
+                tables[record.schema].notebooks.push(record);
+            } else {
+                tables[record.schema].rows.push(record.values);
+            }
+        });
+        return order.map(function (schema) { return tables[schema]; });
+    }
+
+    var report = document.getElementById('report');
+    if (typeof DecompressionStream === 'undefined') {
+        report.textContent = 'The browser does not support DecompressionStream, please use a newer browser.';
+        return;
+    }
+    var binary = atob(document.getElementById('payload').textContent.trim());
+    var bytes = new Uint8Array(binary.length);
+    for (var i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+    new Response(stream).text().then(function (text) {
+        report.textContent = '';
+        parse(text).forEach(function (table) {
+            new TableView(report.appendChild(element('div')), table);
+        });
+    }).catch(function (error) {
+        report.textContent = 'Cannot load report: ' + error;
+    });
+})();
+</script>
+</body>
+</html>
+"""
+ROW_HEIGHT = 24
+VIEWPORT_HEIGHT = 600
+
+
+class _Payload:
+    """
+    gzip-compressed JSON lines of report, rows of notebooks are compressed as they are read.
+    """
+
+    def __init__(self, report_name: str):
+        self.buffer = io.BytesIO()
+        self.text = io.TextIOWrapper(gzip.GzipFile(fileobj=self.buffer, mode='wb', mtime=0), encoding='utf-8')
+        self.writer = report_export.NdjsonReportWriter(None, report_name, file=self.text)
+        self.rows = 0
+
+    def write(self, table, notebook: str, exception: bool):
+        self.writer.write(table, notebook, exception)
+        self.rows += len(table)
+
+    def close(self) -> str:
+        self.text.close()
+        return base64.b64encode(self.buffer.getvalue()).decode('ascii')
+
+
+def render_html(report_name: str, payload: str, rows: int) -> str:
+    replacements = {
+        '__TITLE__': html.escape(report_name),
+        '__ROWS__': str(rows),
+        '__ROW_HEIGHT__': str(ROW_HEIGHT),
+        '__VIEWPORT_HEIGHT__': str(VIEWPORT_HEIGHT),
+        '__SLOWEST_ROWS__': str(check_timing.SLOWEST_ROWS),
+        '__TIME_COLUMN__': check_timing.TIME_COLUMN,
+    }
+    document = TEMPLATE
+    for placeholder, value in replacements.items():
+        document = document.replace(placeholder, value)
+    # payload is base64, it is inserted the last, so it is never scanned for placeholders
+    return document.replace('__PAYLOAD__', payload)
+
+
+def write_paged_reports(notebook_files: list[str], output_dir: str) -> list[str]:
+    """
+    Writes paged HTML summary '<report_name>.html' per report name of executed notebooks.
+
+    Args:
+        notebook_files (list[str]): paths to executed notebooks.
+        output_dir (str): directory for HTML files.
+
+    Returns:
+        list[str]: paths to written files.
+    """
+    payloads = {}
+    for report, table, notebook in report_export.iter_report_tables(notebook_files):
+        if report['name'] not in payloads:
+            payloads[report['name']] = _Payload(report['name'])
+        payloads[report['name']].write(table, notebook, report.get('isExceptionOccured', False))
+    paths = []
+    for report_name, payload in payloads.items():
+        path = os.path.join(output_dir, f'{report_name}.html')
+        with open(path, 'w') as f:
+            f.write(render_html(report_name, payload.close(), payload.rows))
+        paths.append(path)
+    return paths
@@ -0,0 +1,177 @@
+import atexit
+import os
+import sys
+import time
+
+import papermill.engines
+import papermill.execute
+from papermill.cli import papermill as papermill_cli
+from papermill.engines import NBClientEngine, NotebookExecutionManager, papermill_engines
+
+import phase_timing
+
+ENGINE_NAME = 'envchecker_autosave'
+POLICY_ENV = 'ENVCHECKER_AUTOSAVE'
+# every - papermill default, output notebook is written before and after every cell
+EVERY_POLICY = 'every'
+# end - output notebook is written once, when execution is completed or failed
+END_POLICY = 'end'
+# interval:<seconds> - output notebook is written on cell completion, if it was not written for <seconds>
+INTERVAL_POLICY = 'interval'
+# cells:<n> - output notebook is written after every <n> completed cells
+CELLS_POLICY = 'cells'
+# with all policies except 'end', output of long running cell is written every --autosave-cell-every seconds,
+# as papermill does
+SAVE_PHASE = 'notebook_save'
+
+
+class SaveStats:
+    writes = 0
+    write_seconds = 0.0
+    skipped = 0
+
+    @classmethod
+    def get_saved_ms(cls) -> float:
+        # skipped writes are estimated by the average duration of performed ones
+        if not cls.writes:
+            return 0.0
+        return cls.skipped * cls.write_seconds / cls.writes * 1000
+
+
+def parse_policy(value: str) -> tuple:
+    """
+    Parses autosave policy: 'every', 'end', 'interval:<seconds>' or 'cells:<n>'.
+
+    Returns:
+        tuple: policy name and its value (seconds or amount of cells, 0 for policies without value).
+    """
+    name, _, amount = (value or EVERY_POLICY).partition(':')
+    if name in (EVERY_POLICY, END_POLICY) and not amount:
+        return name, 0
+    if name in (INTERVAL_POLICY, CELLS_POLICY) and amount.isdigit() and int(amount) > 0:
+        return name, int(amount)
+    raise ValueError(f'Invalid autosave policy: {value}, supported: {EVERY_POLICY}, {END_POLICY}, '
+                     f'{INTERVAL_POLICY}:<seconds>, {CELLS_POLICY}:<n>')
+
+
+def _timed_write_ipynb(write_ipynb):
+    def wrapper(*args, **kwargs):
+        started_at = time.monotonic()
+        try:
+            return write_ipynb(*args, **kwargs)
+        finally:
+            SaveStats.writes += 1
+            SaveStats.write_seconds += time.monotonic() - started_at
+    return wrapper
+
+
+class ThrottledExecutionManager(NotebookExecutionManager):
+    """
+    Execution manager, which writes output notebook according to autosave policy instead of every cell state change.
+    The final notebook is always written by papermill itself after execution.
+    """
+
+    def __init__(self, nb, policy: str = EVERY_POLICY, policy_value: int = 0, **kwargs):
+        super().__init__(nb, **kwargs)
+        self.policy = policy
+        self.policy_value = policy_value
+        self.cells_since_save = 0
+        self.completed = False
+        self.cell_autosave = False
+
+    def _should_save(self) -> bool:
+        if self.policy == EVERY_POLICY or self.cell_autosave:
+            return True
+        if self.completed or self.policy == END_POLICY:
+            return False
+        if self.policy == INTERVAL_POLICY:
+            return (self.now() - self.last_save_time).total_seconds() >= self.policy_value
+        return self.cells_since_save >= self.policy_value
+
+    def save(self, **kwargs):
+        if kwargs.get('nb'):
+            self.nb = kwargs['nb']
+        if not self._should_save():
+            SaveStats.skipped += 1
+            return
+        super().save()
+        self.cells_since_save = 0
+
+    def autosave_cell(self):
+        # long running cells are not saved for 'end' policy as well
+        if self.policy == END_POLICY:
+            return
+        # papermill saves running cell by its own interval, it is not throttled by policy
+        self.cell_autosave = True
+        try:
+            super().autosave_cell()
+        finally:
+            self.cell_autosave = False
+
+    def cell_complete(self, cell, cell_index=None, **kwargs):
+        self.cells_since_save += 1
+        super().cell_complete(cell, cell_index=cell_index, **kwargs)
+
+    def notebook_complete(self, **kwargs):
+        self.completed = True
+        super().notebook_complete(**kwargs)
+
+
+class ThrottledEngine(NBClientEngine):
+
+    @classmethod
+    def execute_notebook(cls, nb, kernel_name, output_path=None, progress_bar=True, log_output=False,
+                         autosave_cell_every=30, **kwargs):
+        policy, policy_value = parse_policy(os.getenv(POLICY_ENV))
+        nb_man = ThrottledExecutionManager(nb, policy, policy_value, output_path=output_path,
+                                           progress_bar=progress_bar, log_output=log_output,
+                                           autosave_cell_every=autosave_cell_every)
+        nb_man.notebook_start()
+        try:
+            cls.execute_managed_notebook(nb_man, kernel_name, log_output=log_output, **kwargs)
+        finally:
+            nb_man.cleanup_pbar()
+            nb_man.notebook_complete()
+        return nb_man.nb
+
+
+def report_saves(policy: str):
+    """
+    Prints writes of output notebook and estimated I/O time saved by policy. If phases of check are recorded
+    ('run.sh --phases=true'), the writes are recorded as a part of 'papermill' phase.
+    """
+    write_ms = SaveStats.write_seconds * 1000
+    print(f'autosave policy {policy}: {SaveStats.writes} notebook writes ({write_ms:.1f} ms), '
+          f'{SaveStats.skipped} skipped, ~{SaveStats.get_saved_ms():.1f} ms of I/O saved', file=sys.stderr)
+    phases_file = os.getenv(phase_timing.PHASES_FILE_ENV)
+    if phases_file:
+        phase_timing.append_phase(phases_file, {
+            'phase': SAVE_PHASE,
+            'duration_ms': round(write_ms, 3),
+            'part_of': 'papermill',
+            'writes': SaveStats.writes,
+            'skipped_writes': SaveStats.skipped,
+            'saved_ms': round(SaveStats.get_saved_ms(), 3)
+        })
+
+
+def main(policy: str, papermill_args: list[str]):
+    parse_policy(policy)
+    os.environ[POLICY_ENV] = policy
+    papermill_engines.register(ENGINE_NAME, ThrottledEngine)
+    papermill.engines.write_ipynb = _timed_write_ipynb(papermill.engines.write_ipynb)
+    papermill.execute.write_ipynb = _timed_write_ipynb(papermill.execute.write_ipynb)
+    atexit.register(report_saves, policy)
+    papermill_cli.main(args=['--engine', ENGINE_NAME] + papermill_args, prog_name='papermill')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print('Usage: python papermill_autosave.py <every|end|interval:<seconds>|cells:<n>> <papermill arguments>')
+        sys.exit(1)
+    try:
+        parse_policy(sys.argv[1])
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    main(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,223 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from datetime import datetime
+
+import yaml
+
+PHASES = 'phases'
+PHASES_FILE_ENV = 'ENVCHECKER_PHASES_FILE'
+KERNEL_START_PHASE = 'kernel_start'
+
+
+def read_last_pid() -> int:
+    """
+    Reads the most recently assigned PID of the current PID namespace.
+    Difference of two values gives amount of processes, spawned in between (inside a pod it is the runner only).
+
+    Returns:
+        int: last assigned PID or -1 if it cannot be read.
+    """
+    try:
+        with open('/proc/loadavg', 'r') as f:
+            return int(f.read().split()[4])
+    except (OSError, ValueError, IndexError):
+        return -1
+
+
+def run_phase(phases_file: str, phase: str, command: list[str]) -> int:
+    """
+    Runs command as a phase of check execution and appends its timings to phases_file.
+    stdin, stdout and stderr are inherited, so command can be used within shell pipes and substitutions.
+
+    Args:
+        phases_file (str): path to JSON lines file with phase records of current check.
+        phase (str): phase name.
+        command (list[str]): command to run.
+
+    Returns:
+        int: exit code of command.
+    """
+    start = int(time.time() * 1000)
+    last_pid = read_last_pid()
+    started_at = time.monotonic()
+    try:
+        process = subprocess.Popen(command)
+    except OSError as e:
+        print(f'Cannot run phase {phase}: {e}', file=sys.stderr)
+        return 127
+    # wait4 returns resource usage of command together with all its waited descendants (e.g. notebook kernel)
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    duration_ms = (time.monotonic() - started_at) * 1000
+    processes = read_last_pid() - last_pid if last_pid >= 0 else None
+    append_phase(phases_file, {
+        'phase': phase,
+        'start': start,
+        'duration_ms': round(duration_ms, 3),
+        'peak_rss_kb': rusage.ru_maxrss,
+        'processes': processes,
+        'exit_code': process.returncode
+    })
+    return process.returncode
+
+
+def append_phase(phases_file: str, record: dict):
+    os.makedirs(os.path.dirname(phases_file), exist_ok=True)
+    with open(phases_file, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def load_phases(phases_file: str) -> list[dict]:
+    """
+    Loads phase records of check from JSON lines file. Broken lines are skipped.
+
+    Args:
+        phases_file (str): path to JSON lines file with phase records.
+
+    Returns:
+        list[dict]: phase records in order of their completion.
+    """
+    if not phases_file or not os.path.isfile(phases_file):
+        return []
+    phases = []
+    with open(phases_file, 'r') as f:
+        for line in f:
+            try:
+                phases.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return phases
+
+
+def get_kernel_start_phase(executed_notebook_path: str):
+    """
+    Calculates kernel start duration of papermill execution: time between notebook start and first cell start.
+    This phase is a part of 'papermill' phase.
+
+    Args:
+        executed_notebook_path (str): path to executed notebook.
+
+    Returns:
+        dict: phase record or None if papermill metadata is incomplete.
+    """
+    try:
+        with open(executed_notebook_path, 'r') as f:
+            nb = json.load(f)
+        nb_start = nb['metadata']['papermill']['start_time']
+        for cell in nb['cells']:
+            cell_start = cell.get('metadata', {}).get('papermill', {}).get('start_time')
+            if cell_start:
+                duration_ms = (_parse_papermill_time(cell_start) - _parse_papermill_time(nb_start)) * 1000
+                return {'phase': KERNEL_START_PHASE, 'duration_ms': round(duration_ms, 3), 'part_of': 'papermill'}
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _parse_papermill_time(value: str) -> float:
+    # papermill writes naive ISO timestamps, only the difference is needed
+    return datetime.fromisoformat(value.rstrip('Z')).timestamp()
+
+
+def get_check_phases_file(phases_dir: str, executed_notebook_path: str) -> str:
+    """
+    Returns path to phase records of executed check, they are moved there by run.sh when the check is completed.
+    """
+    return os.path.join(phases_dir, f'{os.path.splitext(os.path.basename(executed_notebook_path))[0]}.jsonl')
+
+
+def attach_phases_to_result_file(result_file_path: str, phases_dir: str) -> int:
+    """
+    Writes phase records of all checks into their records of result.yaml once at the end of run, so result.yaml
+    is not rewritten after every check. Phase files of checks are removed afterwards.
+
+    Args:
+        result_file_path (str): path to result.yaml.
+        phases_dir (str): directory with phase records of checks, see get_check_phases_file.
+
+    Returns:
+        int: amount of check records with attached phases.
+    """
+    with open(result_file_path, 'r') as f:
+        result = yaml.safe_load(f) or {}
+    attached = 0
+    for check in result.get('checks') or []:
+        notebooks = [out for out in check.get('outs') or [] if str(out).endswith('.ipynb')]
+        if not notebooks:
+            continue
+        phases_file = get_check_phases_file(phases_dir, notebooks[0])
+        # checks restored from cache or checkpoint keep phases of their execution
+        if not os.path.isfile(phases_file):
+            continue
+        phases = load_phases(phases_file)
+        kernel_start = get_kernel_start_phase(notebooks[0])
+        if kernel_start is not None:
+            phases.append(kernel_start)
+        check[PHASES] = phases
+        os.remove(phases_file)
+        attached += 1
+    if attached:
+        with open(result_file_path, 'w') as f:
+            yaml.dump(result, f, default_flow_style=False, sort_keys=False)
+    return attached
+
+
+def summarize_phases(checks: list[dict]) -> list[dict]:
+    """
+    Aggregates phase records of all checks by phase name.
+
+    Returns:
+        list[dict]: one row per phase ('phase', 'count', 'total_ms', 'mean_ms', 'max_ms', 'max_rss_kb', 'processes'),
+        sorted by total duration descending.
+    """
+    rows = {}
+    for check in checks:
+        for p in check.get(PHASES) or []:
+            row = rows.setdefault(p['phase'], {
+                'phase': p['phase'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'max_rss_kb': 0, 'processes': 0
+            })
+            row['count'] += 1
+            row['total_ms'] += p.get('duration_ms') or 0
+            row['max_ms'] = max(row['max_ms'], p.get('duration_ms') or 0)
+            row['max_rss_kb'] = max(row['max_rss_kb'], p.get('peak_rss_kb') or 0)
+            row['processes'] += p.get('processes') or 0
+    for row in rows.values():
+        row['mean_ms'] = row['total_ms'] / row['count']
+    return sorted(rows.values(), key=lambda r: r['total_ms'], reverse=True)
+
+
+def print_summary(result_file_path: str):
+    with open(result_file_path, 'r') as f:
+        result = yaml.safe_load(f) or {}
+    rows = summarize_phases(result.get('checks', []))
+    if not rows:
+        print('No phase timings were recorded')
+        return
+    # kernel start is already included into papermill phase
+    run_total = sum(r['total_ms'] for r in rows if r['phase'] != KERNEL_START_PHASE) or 1
+    print('Phase timings:')
+    print(f"{'phase':<20}{'count':>7}{'total, s':>12}{'mean, s':>10}{'max, s':>10}{'share':>8}"
+          f"{'max rss, MiB':>14}{'processes':>11}")
+    for r in rows:
+        share = '' if r['phase'] == KERNEL_START_PHASE else f"{r['total_ms'] / run_total:.0%}"
+        print(f"{r['phase']:<20}{r['count']:>7}{r['total_ms'] / 1000:>12.2f}{r['mean_ms'] / 1000:>10.2f}"
+              f"{r['max_ms'] / 1000:>10.2f}{share:>8}{r['max_rss_kb'] / 1024:>14.1f}{r['processes']:>11}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 6 and sys.argv[1] == 'run' and sys.argv[4] == '--':
+        sys.exit(run_phase(sys.argv[2], sys.argv[3], sys.argv[5:]))
+    if len(sys.argv) == 4 and sys.argv[1] == 'attach':
+        attach_phases_to_result_file(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+    if len(sys.argv) == 3 and sys.argv[1] == 'summary':
+        print_summary(sys.argv[2])
+        sys.exit(0)
+    print('Usage: python phase_timing.py run <phases_file> <phase> -- <command> [args...]')
+    print('Or: python phase_timing.py attach <result_file_path> <phases_dir>')
+    print('Or: python phase_timing.py summary <result_file_path>')
+    sys.exit(1)
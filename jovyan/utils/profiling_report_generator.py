@@ -0,0 +1,197 @@
+#!/opt/conda/bin/python
+import html
+import json
+import os
+import re
+import sys
+import pandas as pd
+import env_checker_utils
+
+TOP_CELLS_AMOUNT = 20
+SNIPPET_LENGTH = 200
+UNTAGGED = 'untagged'
+PROFILE_FILE_NAME = 'cell_profile'
+BASELINE_FILE_NAME = 'cell_profile_baseline.json'
+style = """
+<style>
+table, th, td { border:1px solid black; text-align: left; border-collapse: collapse; padding: 2px 6px }
+pre { margin: 0; white-space: pre-wrap; max-width: 900px }
+.slower { background-color: DarkSalmon; }
+.faster { background-color: DarkSeaGreen; }
+</style> """
+
+
+def get_notebook_base_name(notebook_path):
+    # cut off timestamp, added by run.sh, so timings can be compared between runs
+    notebook_name = os.path.splitext(os.path.basename(notebook_path))[0]
+    return re.sub(r'_\d+$', '', notebook_name)
+
+
+def get_cell_key(notebook_base_name, occurrence, cell, index):
+    # the same notebook can be executed several times within one run (e.g. composite with different params)
+    notebook_key = notebook_base_name if occurrence == 0 else f'{notebook_base_name}#{occurrence}'
+    return f"{notebook_key}:{cell.get('id') or index}"
+
+
+def get_source_snippet(cell):
+    source = cell.get('source', '')
+    if isinstance(source, list):
+        source = ''.join(source)
+    source = source.strip()
+    if len(source) > SNIPPET_LENGTH:
+        source = source[:SNIPPET_LENGTH] + '...'
+    return source
+
+
+def extract_cell_timings(notebook_path, occurrence=0):
+    """
+    Reads per-cell 'metadata.papermill.duration', written by papermill into executed notebook.
+    Cells, which were not executed (markdown, skipped after exception), are ignored.
+    """
+
+    with open(notebook_path, 'r', encoding='utf-8') as f:
+        nb = json.load(f)
+    notebook_base_name = get_notebook_base_name(notebook_path)
+    cells = []
+    for index, cell in enumerate(nb.get('cells', [])):
+        if cell.get('cell_type') != 'code':
+            continue
+        papermill_meta = cell.get('metadata', {}).get('papermill', {})
+        duration = papermill_meta.get('duration')
+        if duration is None:
+            continue
+        cells.append({
+            'key': get_cell_key(notebook_base_name, occurrence, cell, index),
+            'notebook': os.path.basename(notebook_path),
+            'notebook_base_name': notebook_base_name,
+            'cell_index': index,
+            'tags': cell.get('metadata', {}).get('tags', []),
+            'duration': duration,
+            'exception': bool(papermill_meta.get('exception')),
+            'source': get_source_snippet(cell)
+        })
+    return cells
+
+
+def load_baseline(baseline_path):
+    if not os.path.isfile(baseline_path):
+        return {}
+    try:
+        with open(baseline_path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_baseline(baseline_path, baseline, cells):
+    # baseline is merged, so notebooks, which were not executed in this run, keep their previous timings
+    for cell in cells:
+        baseline[cell['key']] = cell['duration']
+    with open(baseline_path, 'w') as f:
+        json.dump(baseline, f)
+
+
+def build_profile(cells, baseline, top_amount=TOP_CELLS_AMOUNT):
+    for cell in cells:
+        previous = baseline.get(cell['key'])
+        cell['previous_duration'] = previous
+        cell['delta'] = None if previous is None else cell['duration'] - previous
+
+    by_notebook = {}
+    for cell in cells:
+        row = by_notebook.setdefault(cell['notebook'], {
+            'notebook': cell['notebook'], 'cells': 0, 'duration': 0.0, 'previous_duration': 0.0,
+            'slowest_cell_index': None, 'slowest_cell_duration': 0.0
+        })
+        row['cells'] += 1
+        row['duration'] += cell['duration']
+        row['previous_duration'] += cell['previous_duration'] or 0.0
+        if cell['duration'] >= row['slowest_cell_duration']:
+            row['slowest_cell_index'] = cell['cell_index']
+            row['slowest_cell_duration'] = cell['duration']
+
+    by_tag = {}
+    for cell in cells:
+        for tag in cell['tags'] or [UNTAGGED]:
+            row = by_tag.setdefault(tag, {'tag': tag, 'cells': 0, 'duration': 0.0})
+            row['cells'] += 1
+            row['duration'] += cell['duration']
+
+    slowest = sorted(cells, key=lambda c: c['duration'], reverse=True)
+    return {
+        'total_duration': sum(c['duration'] for c in cells),
+        'slowest_cells': slowest[:top_amount],
+        'by_notebook': sorted(by_notebook.values(), key=lambda r: r['duration'], reverse=True),
+        'by_tag': sorted(by_tag.values(), key=lambda r: r['duration'], reverse=True),
+        'regressions': sorted([c for c in cells if c['delta'] is not None and c['delta'] > 0],
+                              key=lambda c: c['delta'], reverse=True)[:top_amount]
+    }
+
+
+def format_delta(value):
+    if value is None or pd.isna(value):
+        return '-'
+    css_class = 'slower' if value > 0 else 'faster'
+    return f'<span class="{css_class}">{value:+.3f}</span>'
+
+
+def cells_to_html(cells):
+    if not cells:
+        return '<p>No data</p>'
+    df = pd.DataFrame([{
+        'notebook': html.escape(c['notebook']),
+        'cell': c['cell_index'],
+        'tags': html.escape(', '.join(c['tags'])),
+        'duration, s': f"{c['duration']:.3f}",
+        'previous, s': '-' if c['previous_duration'] is None else f"{c['previous_duration']:.3f}",
+        'delta, s': format_delta(c['delta']),
+        'source': f"<pre>{html.escape(c['source'])}</pre>"
+    } for c in cells])
+    return df.to_html(index=False, escape=False)
+
+
+def write_html_report(output_file, profile):
+    parts = [
+        f"<h2>Cell execution profile</h2><p>Total cells duration: {profile['total_duration']:.3f} s</p>",
+        f"<h3>Slowest cells</h3>{cells_to_html(profile['slowest_cells'])}",
+        f"<h3>Slower than in previous run</h3>{cells_to_html(profile['regressions'])}",
+        f"<h3>By notebook</h3>{pd.DataFrame(profile['by_notebook']).to_html(index=False, float_format='%.3f')}",
+        f"<h3>By tag</h3>{pd.DataFrame(profile['by_tag']).to_html(index=False, float_format='%.3f')}"
+    ]
+    with open(output_file, 'w') as file:
+        file.write(style + '<br>'.join(parts))
+
+
+def process_notebook_files(notebook_files, output_dir, baseline, occurrences):
+    cells = []
+    # names contain execution timestamp, so sorting keeps order of executions
+    for notebook in sorted(notebook_files):
+        notebook_base_name = get_notebook_base_name(notebook)
+        occurrence = occurrences.get(notebook_base_name, 0)
+        occurrences[notebook_base_name] = occurrence + 1
+        try:
+            cells.extend(extract_cell_timings(notebook, occurrence))
+        except (OSError, json.JSONDecodeError) as e:
+            print(f'Cannot read cell timings from {notebook}: {e}')
+    if not cells:
+        return []
+    profile = build_profile(cells, baseline)
+    with open(os.path.join(output_dir, f'{PROFILE_FILE_NAME}.json'), 'w') as file:
+        json.dump(profile, file)
+    write_html_report(os.path.join(output_dir, f'{PROFILE_FILE_NAME}.html'), profile)
+    return cells
+
+
+if __name__ == '__main__':
+    directory_path = sys.argv[1]
+    baseline_path = os.path.join(env_checker_utils.get_state_dir(), BASELINE_FILE_NAME)
+    baseline = load_baseline(baseline_path)
+    profiled_cells = []
+    notebook_occurrences = {}
+    for root, dirs, files in os.walk(directory_path):
+        # hidden folders (e.g. state of env-checker) are not a part of run
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        notebooks = [os.path.join(root, file) for file in files if file.endswith('.ipynb')]
+        profiled_cells.extend(process_notebook_files(notebooks, root, baseline, notebook_occurrences))
+    save_baseline(baseline_path, baseline, profiled_cells)
+    print("Cell profile reports generated")
@@ -0,0 +1,170 @@
+"""
+Streaming export of 'report' scraps of executed notebooks for downstream tools, see json_report_generator.py.
+Notebooks are read one by one (large reports slice by slice, see report_storage.iter_report_batches)
+and their rows are written at once, so memory does not grow with size of run:
+
+- ndjson: '<report_name>.ndjson', compact JSON lines. Every column set (the same columns, case-insensitive)
+  gets a schema line '{"schema": <id>, "columns": [...]}' once, every notebook gets a line
+  '{"schema": <id>, "notebook": <path>}' before its rows ('"isExceptionOccured": true' is added for interrupted
+  checks) and every row is '{"schema": <id>, "values": [...]}'.
+- parquet: '<report_name>.<schema id>.parquet' per column set with column '_notebook', row group per notebook
+  (per slice of large report).
+  Timing columns are numbers, other columns are strings.
+
+Rows of every notebook are sorted by time, the slowest first (see check_timing.sort_by_time).
+"""
+import hashlib
+import json
+import os
+
+import pandas as pd
+import scrapbook as sb
+
+import check_timing
+import report_storage
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional, only parquet export needs it
+    pa = None
+
+JSON_FORMAT = 'json'
+NDJSON_FORMAT = 'ndjson'
+PARQUET_FORMAT = 'parquet'
+FORMATS = (JSON_FORMAT, NDJSON_FORMAT, PARQUET_FORMAT)
+NOTEBOOK_COLUMN = '_notebook'
+PARQUET_COMPRESSION = 'zstd'
+
+
+def get_schema_id(columns) -> str:
+    # the same grouping of columns as in HTML and JSON reports, but stable between processes
+    key = json.dumps(sorted(str(column).lower() for column in columns))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]
+
+
+def _align_columns(table: pd.DataFrame, columns: list) -> pd.DataFrame:
+    # tables of the same schema can have columns in other order or case
+    by_name = {str(column).lower(): column for column in table.columns}
+    return table[[by_name[str(column).lower()] for column in columns]]
+
+
+class NdjsonReportWriter:
+    def __init__(self, output_dir: str, report_name: str, file=None):
+        # lines are written to file-like object instead of '<report_name>.ndjson' if it is passed
+        self.path = os.path.join(output_dir, f'{report_name}.{NDJSON_FORMAT}') if file is None else None
+        self.file = open(self.path, 'w') if file is None else file
+        self.schemas = {}
+        self.notebook_line = None
+
+    def write(self, table: pd.DataFrame, notebook: str, exception: bool = False):
+        schema_id = get_schema_id(table.columns)
+        if schema_id not in self.schemas:
+            self.schemas[schema_id] = list(table.columns)
+            self._write_line({'schema': schema_id, 'columns': self.schemas[schema_id]})
+        table = _align_columns(table, self.schemas[schema_id])
+        notebook_line = {'schema': schema_id, 'notebook': notebook}
+        if exception:
+            notebook_line['isExceptionOccured'] = True
+        # slices of the same report continue rows of the notebook
+        if notebook_line != self.notebook_line:
+            self._write_line(notebook_line)
+            self.notebook_line = notebook_line
+        # missing values are NaN in pandas, they are written as null
+        table = table.astype(object).where(table.notna(), None)
+        for values in table.itertuples(index=False, name=None):
+            self._write_line({'schema': schema_id, 'values': values})
+
+    def _write_line(self, record: dict):
+        self.file.write(json.dumps(record, separators=(',', ':'), default=str))
+        self.file.write('\n')
+
+    def close(self) -> list[str]:
+        if self.path is None:
+            return []
+        self.file.close()
+        return [self.path]
+
+
+class ParquetReportWriter:
+    def __init__(self, output_dir: str, report_name: str):
+        if pa is None:
+            raise RuntimeError('pyarrow is required for parquet export of reports')
+        self.output_dir = output_dir
+        self.report_name = report_name
+        self.writers = {}
+
+    def _get_writer(self, schema_id: str, table: pd.DataFrame):
+        if schema_id not in self.writers:
+            fields = [pa.field(NOTEBOOK_COLUMN, pa.string())]
+            for column in table.columns:
+                numeric = column in check_timing.TIMING_COLUMNS
+                fields.append(pa.field(str(column), pa.float64() if numeric else pa.string()))
+            path = os.path.join(self.output_dir, f'{self.report_name}.{schema_id}.{PARQUET_FORMAT}')
+            writer = pq.ParquetWriter(path, pa.schema(fields), compression=PARQUET_COMPRESSION)
+            self.writers[schema_id] = (writer, list(table.columns), path)
+        return self.writers[schema_id]
+
+    def write(self, table: pd.DataFrame, notebook: str, exception: bool = False):
+        schema_id = get_schema_id(table.columns)
+        writer, columns, _ = self._get_writer(schema_id, table)
+        table = _align_columns(table, columns)
+        arrays = [pa.array([notebook] * len(table), pa.string())]
+        for column, field in zip(table.columns, list(writer.schema)[1:]):
+            values = table[column]
+            if pa.types.is_string(field.type):
+                values = values.map(str, na_action='ignore')
+            arrays.append(pa.array(values, field.type, from_pandas=True))
+        # every notebook (slice of large report) is a row group
+        writer.write_table(pa.Table.from_arrays(arrays, schema=writer.schema))
+
+    def close(self) -> list[str]:
+        paths = []
+        for writer, _, path in self.writers.values():
+            writer.close()
+            paths.append(path)
+        return paths
+
+
+WRITERS = {NDJSON_FORMAT: NdjsonReportWriter, PARQUET_FORMAT: ParquetReportWriter}
+
+
+def iter_report_tables(notebook_files: list[str]):
+    """
+    Reads 'report' scraps of executed notebooks one at a time, large reports are read slice by slice.
+
+    Yields:
+        tuple: report scrap, its table (or the next slice of it) sorted by time (the slowest rows first)
+            and notebook path.
+    """
+    for notebook in notebook_files:
+        scraps = sb.read_notebook(notebook).scraps.data_dict
+        if 'report' not in scraps:
+            continue
+        report = scraps['report']
+        # values of large reports are stored in side-car file next to notebook
+        for table in report_storage.iter_report_batches(report, os.path.dirname(notebook)):
+            yield report, table, notebook
+
+
+def export_reports(notebook_files: list[str], output_dir: str, output_format: str) -> list[str]:
+    """
+    Writes 'report' scraps of executed notebooks to files of output_format, one notebook at a time.
+
+    Args:
+        notebook_files (list[str]): paths to executed notebooks.
+        output_dir (str): directory for exported files.
+        output_format (str): NDJSON_FORMAT or PARQUET_FORMAT.
+
+    Returns:
+        list[str]: paths to written files.
+    """
+    writers = {}
+    try:
+        for report, table, notebook in iter_report_tables(notebook_files):
+            if report['name'] not in writers:
+                writers[report['name']] = WRITERS[output_format](output_dir, report['name'])
+            writers[report['name']].write(table, notebook, report.get('isExceptionOccured', False))
+    finally:
+        paths = [path for writer in writers.values() for path in writer.close()]
+    return paths
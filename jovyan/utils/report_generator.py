@@ -2,6 +2,9 @@
 import os
 import pandas as pd
 import scrapbook as sb
+import report_storage
+import check_timing
+import paged_html_report
 from bs4 import BeautifulSoup
 import sys
 style = """
@@ -10,25 +13,13 @@
 .tooltip .tooltiptext { visibility: hidden; position: absolute; text-align: center; background-color: Black; color: White; z-index: 1; bottom: 100%; }
 .tooltip:hover .tooltiptext { visibility: visible; }
 table, th, td { border:1px solid black; text-align: center }
+.slowest { color: DarkRed; font-weight: bold }
 </style> """
 
 
-def generate_report_table(report):
-    global flag
-    data = report["values"]
-    if data != []:
-        df = pd.DataFrame(data)
-        for index, row in df.iterrows():
-            checks = row.get("checks", {})
-            for key, value in checks.items():
-                new_column_name = f"{key}"
-                df.at[index, new_column_name] = value
-        df = df.drop(columns=["checks"])
-        return df
-    else:
-        print("No data to generate")
-        data = {'Value': ['No data']}
-        return pd.DataFrame(data)
+def generate_report_table(report, notebook):
+    # values of large reports are stored in side-car file next to notebook
+    return report_storage.load_report_table(report, os.path.dirname(notebook))
 
 
 def add_style_block(html):
@@ -58,37 +49,42 @@ def add_br_after_error_none_ok(text):
     return ' '.join(words)
 
 
+def highlight_slowest_rows(df, table):
+    # rows are sorted by time of timed checks, see custom_reporter.Report.timed
+    if check_timing.TIME_COLUMN not in table.columns:
+        return df
+    for i in range(min(check_timing.SLOWEST_ROWS, len(table))):
+        if pd.notna(table.at[i, check_timing.TIME_COLUMN]):
+            df.at[i, check_timing.TIME_COLUMN] = f'<span class="slowest">{df.at[i, check_timing.TIME_COLUMN]}</span>'
+    return df
+
+
 def process_notebook_file(notebook_files, reports):
     report_file = {}
     for notebook in notebook_files:
         nb = sb.read_notebook(notebook)
         if "report" in nb.scraps.data_dict:
-            report_name = nb.scraps.data_dict["report"]['name']
+            report = nb.scraps.data_dict["report"]
+            report_name = report['name']
+            table = generate_report_table(report, notebook)
             if report_name not in hashes:
                 hashes[report_name] = {}
-            hash_code = hash(tuple(
-                sorted(map(str.lower, generate_report_table(
-                    nb.scraps.data_dict["report"]).columns))))
+            hash_code = hash(tuple(sorted(map(str.lower, table.columns))))
             if hash_code not in hashes[report_name]:
                 hashes[report_name][hash_code] = set()
-            if nb.scraps.data_dict["report"]["isExceptionOccured"]:
+            if report["isExceptionOccured"]:
                 hashes[report_name][hash_code].add(notebook + " <p style=\"display:inline;color:red;font-size:20px;\">Timeout Exception</p> ")
             else:
                 hashes[report_name][hash_code].add(notebook)
             if report_name not in reports:
-                reports[report_name] = {hash_code: generate_report_table(
-                    nb.scraps.data_dict["report"])}
+                reports[report_name] = {hash_code: table}
             else:
                 if hash_code in reports[report_name]:
                     reports[report_name][hash_code] = pd.concat(
-                        [reports[report_name][hash_code],
-                         generate_report_table(
-                             nb.scraps.data_dict[
-                                 "report"])],
+                        [reports[report_name][hash_code], table],
                         ignore_index=True)
                 else:
-                    reports[report_name][hash_code] = generate_report_table(
-                        nb.scraps.data_dict["report"])
+                    reports[report_name][hash_code] = table
             output_dir = os.path.dirname(notebook)
             output_file = os.path.join(output_dir, f'{report_name}.html')
             report_file[report_name] = output_file
@@ -97,8 +93,8 @@ def process_notebook_file(notebook_files, reports):
         with open(dir, 'a') as file:
             datas = []
             for hash_cd in reports[report]:
-                df = reports[report][hash_cd].map(
-                    add_br_after_error_none_ok)
+                table = check_timing.sort_by_time(reports[report][hash_cd])
+                df = highlight_slowest_rows(table.map(add_br_after_error_none_ok), table)
                 datas.append("<br>".join([f"<b>{element}</b>" for element in
                                           hashes[report][
                                               hash_cd]]) + df.to_html(
@@ -106,16 +102,27 @@ def process_notebook_file(notebook_files, reports):
             file.write(add_style_block('<br><br>'.join(datas)))
 
 
+STATIC_MODE = 'static'
+PAGED_MODE = 'paged'
 directory_path = sys.argv[1]
-for root, _, files in os.walk(directory_path):
+# static - whole tables in HTML, paged - rows are rendered by browser page by page, see paged_html_report.py
+html_mode = sys.argv[2] if len(sys.argv) > 2 and sys.argv[2] else STATIC_MODE
+if html_mode not in (STATIC_MODE, PAGED_MODE):
+    print(f"Unknown HTML report mode {html_mode}, supported modes: {STATIC_MODE}, {PAGED_MODE}")
+    sys.exit(1)
+for root, dirs, files in os.walk(directory_path):
+    # hidden folders (e.g. state of env-checker with memo entries and checkpoints) are not a part of run
+    dirs[:] = [d for d in dirs if not d.startswith('.')]
     reports = {}
     hashes = {}
     notebooks = []
-    if os.path.basename(root).startswith('.'):
-        continue
     for file in files:
         if file.endswith('.ipynb'):
             notebooks.append(os.path.join(root, file))
-    process_notebook_file(notebooks, reports)
+    if html_mode == STATIC_MODE:
+        process_notebook_file(notebooks, reports)
+    else:
+        for output_file in paged_html_report.write_paged_reports(sorted(notebooks), root):
+            print(f"Paged HTML report saved to {output_file}")
 
 print("All reports generated")
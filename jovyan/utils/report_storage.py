@@ -0,0 +1,164 @@
+import os
+import uuid
+
+import pandas as pd
+
+import check_timing
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional, large reports are kept in JSON scrap without it
+    pa = None
+
+STORAGE = 'storage'
+FEATHER_FORMAT = 'feather'
+SIDECAR_EXTENSION = '.arrow'
+# side-car is not compressed, so it is memory-mapped and sliced without copies, see iter_report_batches
+COMPRESSION = 'uncompressed'
+BATCH_ROWS = 10000
+SIDECAR_MIN_ROWS_ENV = 'ENVCHECKER_REPORT_SIDECAR_ROWS'
+DEFAULT_SIDECAR_MIN_ROWS = 10000
+
+
+def get_sidecar_min_rows() -> int:
+    return int(os.getenv(SIDECAR_MIN_ROWS_ENV) or DEFAULT_SIDECAR_MIN_ROWS)
+
+
+def _row_to_record(row: dict) -> dict:
+    record = {key: value for key, value in row.items() if key not in ('checks', check_timing.TIMINGS)}
+    record.update(row.get('checks') or {})
+    if row.get(check_timing.TIMINGS):
+        record.update(check_timing.get_row_timing(row[check_timing.TIMINGS]))
+    return record
+
+
+def report_to_table(report: dict) -> pd.DataFrame:
+    """
+    Converts 'report' scrap values into table: report fields, one column per check
+    and timing columns for rows with timed checks (see custom_reporter.Report.timed).
+    """
+    table = pd.DataFrame([_row_to_record(row) for row in report['values']])
+    timing_columns = [column for column in check_timing.TIMING_COLUMNS if column in table.columns]
+    if timing_columns:
+        # checks of later rows must not be placed after timings
+        table = table[[column for column in table.columns if column not in timing_columns] + timing_columns]
+    return table
+
+
+def get_sidecar_file_name(report_name: str, prefix: str = None) -> str:
+    # several reports (e.g. combinations of matrix check) can be stored for one executed notebook
+    return f'{prefix or report_name}.{report_name}.{uuid.uuid4().hex[:8]}{SIDECAR_EXTENSION}'
+
+
+def _write_table(report: dict, table: pd.DataFrame, directory: str, file_name: str):
+    try:
+        # rows are stored sorted by time, as reports show them, so side-car can be read slice by slice
+        arrow_table = pa.Table.from_pandas(check_timing.sort_by_time(table), preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # columns with values of mixed types can not be stored in columnar format
+        return None
+    feather.write_feather(arrow_table, os.path.join(directory, file_name), compression=COMPRESSION)
+    return {'name': report['name'], 'values': [], 'isExceptionOccured': report.get('isExceptionOccured', False),
+            STORAGE: {'format': FEATHER_FORMAT, 'path': file_name, 'rows': len(table), 'columns': list(table.columns)}}
+
+
+def store_report(report: dict, directory: str, file_name: str = None, min_rows: int = None) -> dict:
+    """
+    Stores values of large report into uncompressed Feather (Arrow IPC) file in directory, next to executed notebook.
+    Rows are sorted by time, the slowest first (see check_timing.sort_by_time).
+
+    Args:
+        report (dict): report as returned by custom_reporter.Report.dict().
+        directory (str): directory of executed notebook (run.sh 'out_path' parameter).
+        file_name (str): name of side-car file, generated if not set.
+        min_rows (int): reports with less rows are kept as is, ENVCHECKER_REPORT_SIDECAR_ROWS or 10000 by default.
+
+    Returns:
+        dict: report scrap without values, which references side-car file in 'storage' field,
+            or the same report, if it is small, pyarrow is not installed or values can not be stored.
+    """
+    min_rows = get_sidecar_min_rows() if min_rows is None else min_rows
+    if pa is None or not report['values'] or len(report['values']) < min_rows:
+        return report
+    return _write_table(report, report_to_table(report), directory,
+                        file_name or get_sidecar_file_name(report['name'])) or report
+
+
+def get_sidecar_path(report: dict, directory: str) -> str:
+    storage = report.get(STORAGE)
+    return os.path.join(directory, storage['path']) if storage else None
+
+
+def load_report_table(report: dict, directory: str = '.') -> pd.DataFrame:
+    """
+    Loads the whole report table from 'report' scrap, side-car file is converted to pandas at once.
+    Use iter_report_batches to read large reports slice by slice.
+
+    Args:
+        report (dict): 'report' scrap.
+        directory (str): directory of executed notebook, paths of side-car files are relative to it.
+
+    Returns:
+        pd.DataFrame: report table, table with 'No data' value for empty report.
+    """
+    if report.get(STORAGE):
+        if pa is None:
+            raise RuntimeError(f'pyarrow is required to read report {report["name"]} from {report[STORAGE]["path"]}')
+        return feather.read_table(get_sidecar_path(report, directory)).to_pandas()
+    if report['values']:
+        return report_to_table(report)
+    print("No data to generate")
+    return pd.DataFrame({'Value': ['No data']})
+
+
+def iter_report_batches(report: dict, directory: str = '.', batch_rows: int = BATCH_ROWS):
+    """
+    Reads report table from 'report' scrap slice by slice, sorted by time (the slowest rows first).
+    Side-car file is memory-mapped: slices of Arrow table refer to pages of the file without copies,
+    only the current slice is converted to pandas.
+
+    Args:
+        report (dict): 'report' scrap.
+        directory (str): directory of executed notebook, paths of side-car files are relative to it.
+        batch_rows (int): maximum amount of rows in a slice.
+
+    Yields:
+        pd.DataFrame: slices of report table, a single table for reports kept in scrap.
+    """
+    if not report.get(STORAGE):
+        yield check_timing.sort_by_time(load_report_table(report, directory))
+        return
+    if pa is None:
+        raise RuntimeError(f'pyarrow is required to read report {report["name"]} from {report[STORAGE]["path"]}')
+    table = feather.read_table(get_sidecar_path(report, directory), memory_map=True)
+    for offset in range(0, max(table.num_rows, 1), batch_rows):
+        yield table.slice(offset, batch_rows).to_pandas()
+
+
+def merge_reports(reports: list[dict], directory: str) -> dict:
+    """
+    Merges reports of the same name into one, e.g. reports of all combinations of matrix check.
+    If any of reports is stored in side-car file, the merged report is stored in a new side-car file
+    and side-car files of merged reports are removed.
+
+    Returns:
+        dict: merged report scrap.
+    """
+    merged = {'name': reports[0]['name'],
+              'values': [value for report in reports for value in report['values']],
+              'isExceptionOccured': any(report.get('isExceptionOccured') for report in reports)}
+    stored = [report for report in reports if report.get(STORAGE)]
+    if not stored:
+        return merged
+    tables = [load_report_table(report, directory) for report in reports if report.get(STORAGE) or report['values']]
+    merged['values'] = []
+    prefix = stored[0][STORAGE]['path'].split('.')[0]
+    scrap = _write_table(merged, pd.concat(tables, ignore_index=True), directory,
+                         get_sidecar_file_name(merged['name'], prefix))
+    if scrap is None:
+        merged['values'] = pd.concat(tables, ignore_index=True).to_dict('records')
+        scrap = merged
+    for report in stored:
+        os.remove(get_sidecar_path(report, directory))
+    return scrap
@@ -0,0 +1,417 @@
+"""
+Local history of check results across runs, which are removed from './out' by the next run.
+Metrics of every check of result.yaml (status, last_run, last_duration, report_name, namespace, app) are appended
+to SQLite database in the state folder, so trends, flaky checks and duration percentiles can be queried in the pod
+without range queries to monitoring:
+
+- results: one row per metric of executed check, the same metric is never stored twice (results restored from
+  cache keep 'last_run' of real execution). Rows are kept for ENVCHECKER_HISTORY_RAW_DAYS days.
+- daily: older rows are downsampled to one row per series and day (runs, failures, duration sum/min/max/p50/p95),
+  which are kept for ENVCHECKER_HISTORY_DAYS days.
+- durations: one row per executed check and run (sum of its phases or the longest metric duration), which order
+  checks of the next runs (run.sh --order) and balance their shards. Rows are kept for ENVCHECKER_HISTORY_RAW_DAYS days.
+
+Flakiness and percentiles are calculated by rows of 'results', trends use both tables.
+"""
+import math
+import os
+import sqlite3
+import sys
+import time
+import uuid
+
+import yaml
+
+import check_history
+import env_checker_utils
+
+HISTORY_DB_NAME = 'results.sqlite'
+DEFAULT_RAW_DAYS = 30
+DEFAULT_DAILY_DAYS = 365
+DAY_MS = 24 * 60 * 60 * 1000
+# labels of series, the same check (notebook, params, matrix) reports status per namespace and application
+SERIES_COLUMNS = ('check_key', 'path', 'report_name', 'namespace', 'app')
+FILTERS = ('report_name', 'namespace', 'app', 'path')
+DEFAULT_PERCENTILES = (50, 90, 95, 99)
+# weight of the latest duration in the smoothed one, so one slow run does not reorder checks at once
+EWMA_ALPHA = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL,
+    check_key TEXT NOT NULL,
+    path TEXT,
+    report_name TEXT NOT NULL,
+    namespace TEXT NOT NULL,
+    app TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    last_run INTEGER NOT NULL,
+    last_duration INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS results_series_run ON results (check_key, report_name, namespace, app, last_run);
+CREATE INDEX IF NOT EXISTS results_report ON results (report_name, namespace, last_run);
+CREATE INDEX IF NOT EXISTS results_last_run ON results (last_run);
+CREATE TABLE IF NOT EXISTS daily (
+    day INTEGER NOT NULL,
+    check_key TEXT NOT NULL,
+    path TEXT,
+    report_name TEXT NOT NULL,
+    namespace TEXT NOT NULL,
+    app TEXT NOT NULL,
+    runs INTEGER NOT NULL,
+    failures INTEGER NOT NULL,
+    duration_sum INTEGER,
+    duration_min INTEGER,
+    duration_max INTEGER,
+    duration_p50 INTEGER,
+    duration_p95 INTEGER,
+    PRIMARY KEY (check_key, report_name, namespace, app, day)
+);
+CREATE INDEX IF NOT EXISTS daily_report ON daily (report_name, namespace, day);
+CREATE INDEX IF NOT EXISTS daily_day ON daily (day);
+CREATE TABLE IF NOT EXISTS durations (
+    run_id TEXT NOT NULL,
+    check_key TEXT NOT NULL,
+    path TEXT,
+    recorded INTEGER NOT NULL,
+    duration INTEGER NOT NULL,
+    PRIMARY KEY (check_key, run_id)
+);
+CREATE INDEX IF NOT EXISTS durations_recorded ON durations (recorded);
+"""
+
+
+def get_history_db_path() -> str:
+    return os.path.join(env_checker_utils.get_state_dir('history'), HISTORY_DB_NAME)
+
+
+def get_retention_days() -> tuple:
+    """
+    Returns:
+        tuple: days to keep rows of every run and days to keep daily rows.
+    """
+    raw_days = int(os.getenv('ENVCHECKER_HISTORY_RAW_DAYS') or DEFAULT_RAW_DAYS)
+    daily_days = int(os.getenv('ENVCHECKER_HISTORY_DAYS') or DEFAULT_DAILY_DAYS)
+    return raw_days, max(daily_days, raw_days)
+
+
+def connect(db_path: str = None) -> sqlite3.Connection:
+    # several runs of the pod can finish at the same time, see run_manager.py
+    connection = sqlite3.connect(db_path or get_history_db_path(), timeout=30)
+    connection.row_factory = sqlite3.Row
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def _to_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _label(value) -> str:
+    return 'null' if value is None else str(value)
+
+
+def get_result_rows(checks: list[dict], run_id: str) -> list[tuple]:
+    """
+    Converts check records of result.yaml to rows of 'results' table. Metrics without 'last_run' are skipped.
+    """
+    rows = []
+    for record in checks:
+        key = check_history.get_check_key(record)
+        for metric in record.get('metrics') or []:
+            if not isinstance(metric, dict) or _to_int(metric.get('last_run')) is None:
+                continue
+            status = _to_int(metric.get('status'))
+            if status is None:
+                status = 0 if str(record.get('result')) == 'True' else 1
+            rows.append((run_id, key, record.get('path'), _label(metric.get('report_name')),
+                         _label(metric.get('report_namespace')), _label(metric.get('report_app')), status,
+                         _to_int(metric['last_run']), _to_int(metric.get('last_duration'))))
+    return rows
+
+
+def get_duration_rows(checks: list[dict], run_id: str, now_ms: int) -> list[tuple]:
+    """
+    Converts check records of result.yaml to rows of 'durations' table. Checks with unknown duration are skipped.
+    """
+    rows = []
+    for record in checks:
+        duration = check_history.get_record_duration(record)
+        if duration is not None:
+            rows.append((run_id, check_history.get_check_key(record), record.get('path'), now_ms, int(duration)))
+    return rows
+
+
+def record_result_file(result_file_path: str, run_id: str = None, db_path: str = None, now_ms: int = None) -> int:
+    """
+    Appends metrics and durations of all checks of result.yaml to history and applies retention.
+
+    Args:
+        result_file_path (str): path to result.yaml of run.
+        run_id (str): id of run, ENVCHECKER_RUN_ID or a new one by default.
+        db_path (str): path to database, see get_history_db_path.
+        now_ms (int): current time in milliseconds.
+
+    Returns:
+        int: amount of appended rows of results.
+    """
+    with open(result_file_path, 'r') as f:
+        checks = (yaml.safe_load(f) or {}).get('checks') or []
+    run_id = run_id or os.getenv('ENVCHECKER_RUN_ID') or f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:6]}'
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    raw_days, daily_days = get_retention_days()
+    raw_cutoff_ms = get_raw_cutoff(now_ms, raw_days)
+    # rows older than retention would be downsampled at once, their day can be downsampled already
+    rows = [row for row in get_result_rows(checks, run_id) if row[7] >= raw_cutoff_ms]
+    with connect(db_path) as connection:
+        appended = connection.executemany('INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                          rows).rowcount
+        connection.executemany('INSERT OR IGNORE INTO durations VALUES (?, ?, ?, ?, ?)',
+                               get_duration_rows(checks, run_id, now_ms))
+        apply_retention(connection, now_ms, raw_days, daily_days)
+    connection.close()
+    return max(appended, 0)
+
+
+def get_raw_cutoff(now_ms: int, raw_days: int) -> int:
+    # whole days are downsampled, so every day gets its daily row once
+    return (now_ms // DAY_MS - raw_days) * DAY_MS
+
+
+def percentile(sorted_values: list, p: float):
+    """
+    Nearest-rank percentile of sorted values, None for empty list.
+    """
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def apply_retention(connection: sqlite3.Connection, now_ms: int, raw_days: int, daily_days: int):
+    """
+    Downsamples rows of 'results' older than raw_days to 'daily' rows and removes daily rows older than daily_days.
+    Durations older than raw_days are removed.
+    """
+    raw_cutoff_ms = get_raw_cutoff(now_ms, raw_days)
+    series = {}
+    for row in connection.execute(f"SELECT {', '.join(SERIES_COLUMNS)}, last_run / {DAY_MS} AS day, status, "
+                                  f"last_duration FROM results WHERE last_run < ?", (raw_cutoff_ms,)):
+        aggregate = series.setdefault(tuple(row[column] for column in SERIES_COLUMNS) + (row['day'],),
+                                      {'runs': 0, 'failures': 0, 'durations': []})
+        aggregate['runs'] += 1
+        aggregate['failures'] += 1 if row['status'] else 0
+        if row['last_duration'] is not None:
+            aggregate['durations'].append(row['last_duration'])
+    daily_rows = []
+    for key, aggregate in series.items():
+        durations = sorted(aggregate['durations'])
+        daily_rows.append((key[-1],) + key[:-1] + (
+            aggregate['runs'], aggregate['failures'], sum(durations) if durations else None,
+            durations[0] if durations else None, durations[-1] if durations else None,
+            percentile(durations, 50), percentile(durations, 95)))
+    # the day can be downsampled already, if ENVCHECKER_HISTORY_RAW_DAYS was increased after that, so its rows
+    # are merged; percentiles can not be merged, the ones of the existing row are kept
+    connection.executemany(f"INSERT INTO daily (day, {', '.join(SERIES_COLUMNS)}, runs, failures, duration_sum, "
+                           f"duration_min, duration_max, duration_p50, duration_p95) "
+                           f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                           f"ON CONFLICT (check_key, report_name, namespace, app, day) DO UPDATE SET "
+                           f"runs = runs + excluded.runs, failures = failures + excluded.failures, "
+                           f"duration_sum = coalesce(duration_sum + excluded.duration_sum, duration_sum, "
+                           f"excluded.duration_sum), "
+                           f"duration_min = coalesce(min(duration_min, excluded.duration_min), duration_min, "
+                           f"excluded.duration_min), "
+                           f"duration_max = coalesce(max(duration_max, excluded.duration_max), duration_max, "
+                           f"excluded.duration_max), "
+                           f"duration_p50 = coalesce(duration_p50, excluded.duration_p50), "
+                           f"duration_p95 = coalesce(duration_p95, excluded.duration_p95)", daily_rows)
+    connection.execute('DELETE FROM results WHERE last_run < ?', (raw_cutoff_ms,))
+    connection.execute('DELETE FROM durations WHERE recorded < ?', (raw_cutoff_ms,))
+    connection.execute('DELETE FROM daily WHERE day < ?', (now_ms // DAY_MS - daily_days,))
+
+
+def load_durations(db_path: str = None) -> dict:
+    """
+    Smooths durations of every check by its runs (exponentially weighted, the latest run weighs EWMA_ALPHA).
+
+    Returns:
+        dict: check key to the smoothed duration in milliseconds, see check_history.order_checks.
+    """
+    durations = {}
+    connection = connect(db_path)
+    try:
+        for row in connection.execute('SELECT check_key, duration FROM durations ORDER BY recorded, run_id'):
+            previous = durations.get(row['check_key'])
+            durations[row['check_key']] = row['duration'] if previous is None else \
+                EWMA_ALPHA * row['duration'] + (1 - EWMA_ALPHA) * previous
+    finally:
+        connection.close()
+    return durations
+
+
+def _get_where(filters: dict, time_column: str, since) -> tuple:
+    conditions = [f'{time_column} >= ?']
+    params = [since]
+    for name in FILTERS:
+        if filters.get(name) is not None:
+            conditions.append(f'{name} = ?')
+            params.append(filters[name])
+    return ' AND '.join(conditions), params
+
+
+def _format_day(day: int) -> str:
+    return time.strftime('%Y-%m-%d', time.gmtime(day * DAY_MS // 1000))
+
+
+def get_trend(connection: sqlite3.Connection, days: int = 30, now_ms: int = None, **filters) -> list[dict]:
+    """
+    Daily runs, failures and durations of checks.
+
+    Args:
+        connection (sqlite3.Connection): see connect.
+        days (int): amount of the latest days.
+        now_ms (int): current time in milliseconds.
+        filters: report_name, namespace, app or path.
+
+    Returns:
+        list[dict]: one row per day ('day', 'runs', 'failures', 'failure_rate', 'mean_ms', 'max_ms'), the oldest first.
+    """
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    since_day = now_ms // DAY_MS - days + 1
+    raw_where, raw_params = _get_where(filters, 'last_run', since_day * DAY_MS)
+    daily_where, daily_params = _get_where(filters, 'day', since_day)
+    query = f"""
+        SELECT day, SUM(runs) AS runs, SUM(failures) AS failures, SUM(duration_sum) AS duration_sum,
+               SUM(duration_runs) AS duration_runs, MAX(duration_max) AS max_ms
+        FROM (
+            SELECT last_run / {DAY_MS} AS day, 1 AS runs, status != 0 AS failures, last_duration AS duration_sum,
+                   last_duration IS NOT NULL AS duration_runs, last_duration AS duration_max
+            FROM results WHERE {raw_where}
+            UNION ALL
+            SELECT day, runs, failures, duration_sum, CASE WHEN duration_sum IS NULL THEN 0 ELSE runs END,
+                   duration_max
+            FROM daily WHERE {daily_where}
+        ) GROUP BY day ORDER BY day
+    """
+    return [{
+        'day': _format_day(row['day']),
+        'runs': row['runs'],
+        'failures': row['failures'],
+        'failure_rate': row['failures'] / row['runs'],
+        'mean_ms': row['duration_sum'] / row['duration_runs'] if row['duration_runs'] else None,
+        'max_ms': row['max_ms']
+    } for row in connection.execute(query, raw_params + daily_params)]
+
+
+def get_flakiness(connection: sqlite3.Connection, days: int = 7, min_runs: int = 3, now_ms: int = None,
+                  **filters) -> list[dict]:
+    """
+    Finds series, which change status between consecutive runs.
+
+    Returns:
+        list[dict]: series labels with 'runs', 'failures', 'flips' and 'flip_rate' (flips per pair of consecutive
+        runs), sorted by flip rate descending. Series without flips are skipped.
+    """
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    where, params = _get_where(filters, 'last_run', now_ms - days * DAY_MS)
+    series = ', '.join(SERIES_COLUMNS)
+    query = f"""
+        SELECT {series}, COUNT(*) AS runs, SUM(status != 0) AS failures, SUM(flip) AS flips
+        FROM (
+            SELECT {series}, status, (status != 0) != (LAG(status) OVER (
+                PARTITION BY check_key, report_name, namespace, app ORDER BY last_run) != 0) AS flip
+            FROM results WHERE {where}
+        ) GROUP BY {series} HAVING runs >= ? AND flips > 0
+    """
+    rows = []
+    for row in connection.execute(query, params + [min_runs]):
+        rows.append({**{column: row[column] for column in SERIES_COLUMNS}, 'runs': row['runs'],
+                     'failures': row['failures'], 'flips': row['flips'], 'flip_rate': row['flips'] / (row['runs'] - 1)})
+    return sorted(rows, key=lambda r: (-r['flip_rate'], -r['runs']))
+
+
+def get_duration_percentiles(connection: sqlite3.Connection, days: int = 7, percentiles=DEFAULT_PERCENTILES,
+                             now_ms: int = None, **filters) -> list[dict]:
+    """
+    Calculates percentiles of durations of every series.
+
+    Returns:
+        list[dict]: series labels with 'runs' and 'p<N>' durations in milliseconds, the slowest p50 first.
+    """
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    where, params = _get_where(filters, 'last_run', now_ms - days * DAY_MS)
+    series = ', '.join(SERIES_COLUMNS)
+    rows = {}
+    query = f'SELECT {series}, last_duration FROM results WHERE {where} AND last_duration IS NOT NULL ' \
+            f'ORDER BY {series}, last_duration'
+    for row in connection.execute(query, params):
+        key = tuple(row[column] for column in SERIES_COLUMNS)
+        rows.setdefault(key, []).append(row['last_duration'])
+    result = []
+    for key, durations in rows.items():
+        result.append({**dict(zip(SERIES_COLUMNS, key)), 'runs': len(durations),
+                       **{f'p{p}': percentile(durations, p) for p in percentiles}})
+    return sorted(result, key=lambda r: -(r.get('p50') or 0))
+
+
+def _print_rows(rows: list[dict], columns: list[str]):
+    if not rows:
+        print('No results were recorded for the period')
+        return
+    values = [[_format_value(row[column]) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(v[i]) for v in values)) for i, column in enumerate(columns)]
+    for line in [columns] + values:
+        print('  '.join(value.ljust(width) for value, width in zip(line, widths)).rstrip())
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        return f'{value:.2f}'
+    return '' if value is None else str(value)
+
+
+QUERIES = {
+    'trend': (get_trend, ['day', 'runs', 'failures', 'failure_rate', 'mean_ms', 'max_ms']),
+    'flaky': (get_flakiness, ['path', 'report_name', 'namespace', 'app', 'runs', 'failures', 'flips', 'flip_rate']),
+    'percentiles': (get_duration_percentiles,
+                    ['path', 'report_name', 'namespace', 'app', 'runs'] + [f'p{p}' for p in DEFAULT_PERCENTILES]),
+}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == 'record':
+        record_result_file(sys.argv[2])
+        sys.exit(0)
+    if len(sys.argv) >= 4 and sys.argv[1] == 'order':
+        try:
+            with open(sys.argv[2], 'r') as f:
+                composite_checks = (yaml.safe_load(f) or {}).get('checks') or []
+            check_indices = [int(i) for i in sys.argv[4:]] if len(sys.argv) > 4 else list(range(len(composite_checks)))
+            check_durations = load_durations()
+            ordered = check_history.order_checks(composite_checks, check_indices, sys.argv[3], check_durations)
+        except (OSError, ValueError, yaml.YAMLError, sqlite3.Error) as e:
+            print(f'Cannot order checks: {e}', file=sys.stderr)
+            sys.exit(1)
+        # the first line is ordered indices, the second one is predicted duration in milliseconds (empty if unknown)
+        print(' '.join(str(i) for i in ordered))
+        run_duration = check_history.predict_run_duration(composite_checks, check_indices, check_durations)
+        print('' if run_duration is None else int(run_duration))
+        sys.exit(0)
+    if 2 <= len(sys.argv) <= 4 and sys.argv[1] in QUERIES:
+        query_function, query_columns = QUERIES[sys.argv[1]]
+        query_args = {}
+        if len(sys.argv) > 2:
+            query_args['days'] = int(sys.argv[2])
+        if len(sys.argv) > 3:
+            query_args['report_name'] = sys.argv[3].lower()
+        history_connection = connect()
+        _print_rows(query_function(history_connection, **query_args), query_columns)
+        history_connection.close()
+        sys.exit(0)
+    print('Usage: python result_history.py record <result_file_path>')
+    print('Or: python result_history.py <trend|flaky|percentiles> [days] [report_name]')
+    print('Or: python result_history.py order <composite_path> <file|spt> [check indices]')
+    sys.exit(1)
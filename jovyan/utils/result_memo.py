@@ -0,0 +1,155 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+import yaml
+
+import checkpoints
+import env_checker_utils
+
+# notebook opts in with metadata {"env-checker": {"cache_ttl": "12h"}}, composite check with 'cache_ttl' field
+ENV_CHECKER = 'env-checker'
+CACHE_TTL = 'cache_ttl'
+TTL_PATTERN = re.compile(r'^(\d+)([smhd]?)$')
+TTL_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def get_memo_dir(key: str) -> str:
+    return os.path.join(env_checker_utils.get_state_dir('memo'), key)
+
+
+def parse_ttl(value) -> int:
+    """
+    Parses TTL value: seconds or number with 's', 'm', 'h' or 'd' suffix, e.g. 3600 or '1h'.
+
+    Returns:
+        int: TTL in seconds, 0 if value is empty.
+    """
+    if value is None or value == '':
+        return 0
+    match = TTL_PATTERN.match(str(value).strip())
+    if not match:
+        raise ValueError(f'Invalid {CACHE_TTL} value: {value}, expected seconds or number with s, m, h or d suffix')
+    return int(match.group(1)) * TTL_UNITS[match.group(2)]
+
+
+def get_notebook_ttl(notebook_path: str) -> int:
+    with open(notebook_path, 'r') as f:
+        metadata = json.load(f).get('metadata') or {}
+    return parse_ttl((metadata.get(ENV_CHECKER) or {}).get(CACHE_TTL))
+
+
+def _update_with_files(digest, patterns: list):
+    for pattern in patterns:
+        paths = sorted(glob.glob(pattern, recursive=True))
+        if not paths:
+            # absent input is a state of inputs too
+            digest.update(f'{pattern}:absent'.encode('utf-8'))
+        for path in paths:
+            files = [path] if os.path.isfile(path) else sorted(
+                os.path.join(root, file) for root, _, names in os.walk(path) for file in names)
+            for file in files:
+                digest.update(file.encode('utf-8'))
+                with open(file, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(chunk)
+
+
+def get_memo_key(notebook_path: str, params: dict, matrix: dict, fingerprint) -> str:
+    """
+    Calculates cache key of check: notebook content, parameters, matrix and content of fingerprint files.
+
+    Args:
+        fingerprint: path or glob (or list of them) of inputs of check, e.g. '/etc/cloud-passport/*'.
+    """
+    digest = hashlib.sha256()
+    with open(notebook_path, 'rb') as f:
+        digest.update(f.read())
+    digest.update(json.dumps([params or {}, matrix or {}], sort_keys=True, default=str).encode('utf-8'))
+    if fingerprint:
+        _update_with_files(digest, [fingerprint] if isinstance(fingerprint, str) else list(fingerprint))
+    return digest.hexdigest()[:32]
+
+
+def restore(notebook_path: str, composite_ttl, params: dict, matrix: dict, fingerprint, result_file_path: str,
+            out_path: str, composite_index: int = None) -> tuple:
+    """
+    Restores executed notebook, its reports and check record from cache, if the check was executed within TTL.
+    Restored record keeps 'last_run' of metrics of real execution and gets 'cached: true' field
+    (and 'composite_index' of the check in current composite, if it is passed).
+
+    Returns:
+        tuple: TTL in seconds, cache key and result of restored check. TTL is 0 and key is empty if check is not
+            cached, result is empty if there is no actual cache entry.
+    """
+    ttl = parse_ttl(composite_ttl) if composite_ttl not in (None, '') else get_notebook_ttl(notebook_path)
+    if ttl <= 0:
+        return 0, '', ''
+    key = get_memo_key(notebook_path, params, matrix, fingerprint)
+    memo_dir = get_memo_dir(key)
+    saved = checkpoints.load_saved_record(memo_dir)
+    if saved is None or time.time() - saved['saved'] > ttl:
+        return ttl, key, ''
+    fields = {'cached': True}
+    if composite_index is not None:
+        fields['composite_index'] = composite_index
+    record = checkpoints.restore_record(memo_dir, result_file_path, out_path, **fields)
+    return ttl, key, str(record.get('result', '')) if record else ''
+
+
+def save(key: str, ttl: int, result_file_path: str, out_path: str) -> bool:
+    """
+    Saves the last check record of result.yaml and its artifacts to cache. Failed checks are not cached,
+    so the next run checks again whether the problem is fixed.
+
+    Returns:
+        bool: True if record was saved.
+    """
+    with open(result_file_path, 'r') as f:
+        checks = (yaml.safe_load(f) or {}).get('checks') or []
+    if not checks or str(checks[-1].get('result')) != 'True':
+        return False
+    # the same check can have another index in other composites
+    record = {k: v for k, v in checks[-1].items() if k != 'composite_index'}
+    checkpoints.save_record(get_memo_dir(key), record, out_path, ttl=ttl)
+    prune()
+    return True
+
+
+def prune():
+    # entries of changed notebooks or inputs are never hit again, so they are removed when their TTL is over
+    memo_root = env_checker_utils.get_state_dir('memo')
+    now = time.time()
+    for name in os.listdir(memo_root):
+        path = os.path.join(memo_root, name)
+        saved = checkpoints.load_saved_record(path)
+        if saved is None:
+            if os.path.isdir(path) and now - os.path.getmtime(path) > TTL_UNITS['d']:
+                shutil.rmtree(path, ignore_errors=True)
+        elif now - saved['saved'] > saved.get('ttl', 0):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) in (9, 10) and sys.argv[1] == 'restore':
+        try:
+            memo = restore(sys.argv[2], sys.argv[3], yaml.safe_load(sys.argv[4]), yaml.safe_load(sys.argv[5]),
+                           yaml.safe_load(sys.argv[6]), sys.argv[7], sys.argv[8],
+                           int(sys.argv[9]) if len(sys.argv) == 10 and sys.argv[9] else None)
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            print(f'Cannot restore check from cache: {e}', file=sys.stderr)
+            memo = (0, '', '')
+        print(' '.join(str(value) for value in memo))
+        sys.exit(0)
+    if len(sys.argv) == 6 and sys.argv[1] == 'save':
+        save(sys.argv[2], int(sys.argv[3]), sys.argv[4], sys.argv[5])
+        sys.exit(0)
+    print('Usage: python result_memo.py restore <notebook_path> <cache_ttl> <params> <matrix> <cache_fingerprint> '
+          '<result_file_path> <out_path> [composite_index]')
+    print('Or: python result_memo.py save <key> <ttl> <result_file_path> <out_path>')
+    sys.exit(1)
@@ -0,0 +1,371 @@
+"""
+Queue of run.sh invocations of the service pod. Every run gets its own id and workspace 'out/<run-id>/',
+so concurrent runs do not share result.yaml and do not remove files of each other.
+
+Runs wait in FIFO order for a free slot, amount of slots is ENVCHECKER_MAX_RUNS or is derived from CPU and memory
+limits of the pod (cgroup). Status of every run is kept in JSON file of the state dir and is served by
+runs_extension.py on /envchecker/runs. Statuses and logs of finished runs are kept for ENVCHECKER_RUNS_RETENTION_DAYS,
+but not more than ENVCHECKER_RUNS_HISTORY_SIZE of the latest ones, see prune_runs.
+
+Usage:
+    python run_manager.py submit [run.sh options] <COMPOSITE_FILE_PATH|NOTEBOOK_FILE_PATH>
+    python run_manager.py status <run_id>
+    python run_manager.py list
+    python run_manager.py cancel <run_id>
+"""
+import fcntl
+import json
+import math
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import time
+import uuid
+
+from contextlib import contextmanager
+from datetime import datetime
+
+import env_checker_utils
+
+RUNS = 'runs'
+OUT_DIR = '/home/jovyan/out'
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+MAX_RUNS_ENV = 'ENVCHECKER_MAX_RUNS'
+# memory, which is reserved for one run (papermill kernel with checks) when amount of slots is derived from limits
+RUN_MEMORY_ENV = 'ENVCHECKER_RUN_MEMORY_MB'
+DEFAULT_RUN_MEMORY_MB = 1024
+RUN_COMMAND_ENV = 'ENVCHECKER_RUN_COMMAND'
+DEFAULT_RUN_COMMAND = 'bash /home/jovyan/run.sh'
+RETENTION_DAYS_ENV = 'ENVCHECKER_RUNS_RETENTION_DAYS'
+DEFAULT_RETENTION_DAYS = 7
+HISTORY_SIZE_ENV = 'ENVCHECKER_RUNS_HISTORY_SIZE'
+DEFAULT_HISTORY_SIZE = 100
+CGROUP_ROOT = '/sys/fs/cgroup'
+POLL_INTERVAL = 1
+
+
+def get_runs_dir() -> str:
+    return env_checker_utils.get_state_dir(RUNS)
+
+
+def _read_cgroup_value(path: str) -> str:
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def get_cpu_limit(cgroup_root: str = CGROUP_ROOT) -> float:
+    """
+    Returns CPU limit of the pod in cores (cgroup v2 'cpu.max' or v1 CFS quota), amount of CPUs if it is not limited.
+    """
+    cpu_max = _read_cgroup_value(os.path.join(cgroup_root, 'cpu.max'))
+    if cpu_max:
+        quota, _, period = cpu_max.partition(' ')
+        if quota != 'max':
+            return int(quota) / int(period or 100000)
+    quota = _read_cgroup_value(os.path.join(cgroup_root, 'cpu', 'cpu.cfs_quota_us'))
+    period = _read_cgroup_value(os.path.join(cgroup_root, 'cpu', 'cpu.cfs_period_us'))
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return float(os.cpu_count() or 1)
+
+
+def get_memory_limit_mb(cgroup_root: str = CGROUP_ROOT) -> float:
+    """
+    Returns memory limit of the pod in MiB (cgroup v2 'memory.max' or v1 'memory.limit_in_bytes'),
+    None if it is not limited.
+    """
+    memory_max = _read_cgroup_value(os.path.join(cgroup_root, 'memory.max'))
+    if memory_max is None:
+        memory_max = _read_cgroup_value(os.path.join(cgroup_root, 'memory', 'memory.limit_in_bytes'))
+    # cgroup v1 reports unlimited memory as a huge number close to 2^63
+    if not memory_max or memory_max == 'max' or int(memory_max) >= 2 ** 60:
+        return None
+    return int(memory_max) / 2 ** 20
+
+
+def get_max_runs(cgroup_root: str = CGROUP_ROOT) -> int:
+    """
+    Returns max amount of concurrent runs. ENVCHECKER_MAX_RUNS is used if it is set, otherwise every run gets
+    one CPU core and ENVCHECKER_RUN_MEMORY_MB of memory limits of the pod, but at least one run is executed.
+    """
+    max_runs = os.getenv(MAX_RUNS_ENV)
+    if max_runs:
+        return max(1, int(max_runs))
+    runs = math.floor(get_cpu_limit(cgroup_root))
+    memory_mb = get_memory_limit_mb(cgroup_root)
+    if memory_mb is not None:
+        runs = min(runs, math.floor(memory_mb / int(os.getenv(RUN_MEMORY_ENV) or DEFAULT_RUN_MEMORY_MB)))
+    return max(1, runs)
+
+
+@contextmanager
+def _locked(lock_path: str):
+    with open(lock_path, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _is_alive(pid) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _record_path(run_id: str) -> str:
+    return os.path.join(get_runs_dir(), f'{run_id}.json')
+
+
+def _save_run(record: dict):
+    path = _record_path(record['run_id'])
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(record, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def load_run(run_id: str) -> dict:
+    """
+    Returns status record of run, None if run is unknown. Active run, which worker is not alive anymore
+    (e.g. pod was restarted), is reported as failed.
+    """
+    if not run_id or os.path.basename(run_id) != run_id:
+        return None
+    try:
+        with open(_record_path(run_id), 'r') as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if record['status'] in ACTIVE_STATUSES and record.get('pid') and not _is_alive(record['pid']):
+        record.update(status=FAILED, error='run worker is not alive')
+    return record
+
+
+def list_runs() -> list[dict]:
+    """
+    Returns status records of all runs in order of their submission.
+    """
+    runs = [load_run(name[:-len('.json')]) for name in os.listdir(get_runs_dir()) if name.endswith('.json')]
+    return sorted([run for run in runs if run], key=lambda run: (run['submitted'], run['run_id']))
+
+
+def prune_runs(retention_days: float = None, history_size: int = None) -> list[str]:
+    """
+    Removes status records and logs of finished runs, which were finished more than retention_days ago or are not
+    among history_size latest finished runs. Output of runs in 'out/<run-id>/' is not removed.
+
+    Args:
+        retention_days (float): ENVCHECKER_RUNS_RETENTION_DAYS or 7 by default.
+        history_size (int): ENVCHECKER_RUNS_HISTORY_SIZE or 100 by default.
+
+    Returns:
+        list[str]: ids of removed runs.
+    """
+    if retention_days is None:
+        retention_days = float(os.getenv(RETENTION_DAYS_ENV) or DEFAULT_RETENTION_DAYS)
+    if history_size is None:
+        history_size = int(os.getenv(HISTORY_SIZE_ENV) or DEFAULT_HISTORY_SIZE)
+    finished = [run for run in list_runs() if run['status'] not in ACTIVE_STATUSES]
+    # runs of dead workers have no finish time
+    finished.sort(key=lambda run: run.get('finished') or run['submitted'], reverse=True)
+    expired_before = time.time() - retention_days * 24 * 3600
+    removed = []
+    for position, run in enumerate(finished):
+        if position < history_size and (run.get('finished') or run['submitted']) >= expired_before:
+            continue
+        for extension in ('.json', '.log'):
+            try:
+                os.remove(os.path.join(get_runs_dir(), f"{run['run_id']}{extension}"))
+            except FileNotFoundError:
+                pass
+        removed.append(run['run_id'])
+    return removed
+
+
+def get_workspace_args(args: list[str], run_id: str) -> list[str]:
+    """
+    Puts output of run to 'out/<run-id>/' (or 'out/<run-id>/<subfolder>' if '-o' is passed) by '-o' option.
+    """
+    subfolder = None
+    rest = []
+    args = iter(args)
+    for arg in args:
+        if arg == '-o':
+            subfolder = next(args, None)
+        elif arg.startswith('-o') and not arg.startswith('--'):
+            subfolder = arg[2:]
+        else:
+            rest.append(arg)
+    workspace = f'{run_id}/{subfolder.strip("/")}' if subfolder else run_id
+    # getopts stops at the first operand, so the option is put first
+    return ['-o', workspace] + rest
+
+
+def submit(args: list[str]) -> dict:
+    """
+    Queues run of run.sh with given arguments and starts its worker in background.
+
+    Args:
+        args (list[str]): options and composite or notebook path as they are passed to run.sh.
+
+    Returns:
+        dict: status record of queued run.
+    """
+    run_id = f'{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}'
+    args = get_workspace_args(list(args), run_id)
+    record = {
+        'run_id': run_id,
+        'status': QUEUED,
+        'args': args,
+        'out_path': os.path.join(OUT_DIR, args[1]),
+        'submitted': time.time(),
+        'started': None,
+        'finished': None,
+        'pid': None,
+        'exit_code': None,
+        'overall_result': None,
+    }
+    # worker waits for the lock, so it always sees the record with its pid
+    with _locked(_queue_lock_path()):
+        # old runs are pruned when a new one is queued, so the state dir does not grow with every run
+        prune_runs()
+        with open(os.path.join(get_runs_dir(), f'{run_id}.log'), 'a') as log:
+            worker = subprocess.Popen([sys.executable, os.path.abspath(__file__), 'execute', run_id],
+                                      stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                                      start_new_session=True)
+        record['pid'] = worker.pid
+        _save_run(record)
+    return record
+
+
+def _try_acquire_slot(max_runs: int):
+    slots_dir = env_checker_utils.get_state_dir(RUNS, 'slots')
+    for slot in range(max_runs):
+        lock = open(os.path.join(slots_dir, f'slot_{slot}.lock'), 'a')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return lock
+        except BlockingIOError:
+            lock.close()
+    return None
+
+
+def _queue_lock_path() -> str:
+    # serializes changes of run statuses between workers, API and CLI
+    return os.path.join(get_runs_dir(), 'queue.lock')
+
+
+def _wait_for_slot(run_id: str):
+    """
+    Waits until run is the first one in queue and a slot is free. The slot is held by the worker
+    (flock is released by OS even if worker is killed), so slots of crashed runs are not leaked.
+    """
+    max_runs = get_max_runs()
+    while True:
+        with _locked(_queue_lock_path()):
+            record = load_run(run_id)
+            if record['status'] != QUEUED:
+                return None, record
+            first = next(run for run in list_runs() if run['status'] == QUEUED)
+            if first['run_id'] == run_id:
+                slot = _try_acquire_slot(max_runs)
+                if slot is not None:
+                    record.update(status=RUNNING, started=time.time())
+                    _save_run(record)
+                    return slot, record
+        time.sleep(POLL_INTERVAL)
+
+
+def _read_overall_result(out_path: str):
+    try:
+        with open(os.path.join(out_path, 'result.txt'), 'r') as f:
+            return int(f.read().split()[-1])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def execute(run_id: str) -> int:
+    """
+    Worker of run: waits for its turn in queue, executes run.sh and records the result.
+    """
+    slot, record = _wait_for_slot(run_id)
+    if slot is None:
+        return 1
+    with slot:
+        command = shlex.split(os.getenv(RUN_COMMAND_ENV) or DEFAULT_RUN_COMMAND) + record['args']
+        # checkpoints, shards and traces of run.sh are keyed by ENVCHECKER_RUN_ID
+        env = dict(os.environ, ENVCHECKER_RUN_ID=run_id)
+        exit_code = subprocess.call(command, env=env)
+    with _locked(_queue_lock_path()):
+        record = load_run(run_id)
+        overall_result = _read_overall_result(record['out_path'])
+        if record['status'] != CANCELLED:
+            record['status'] = SUCCEEDED if exit_code == 0 and not overall_result else FAILED
+        record.update(finished=record.get('finished') or time.time(), exit_code=exit_code,
+                      overall_result=overall_result)
+        _save_run(record)
+    return exit_code
+
+
+def cancel(run_id: str) -> dict:
+    """
+    Cancels queued run or terminates running one with its run.sh process group. Returns None if run is unknown.
+    """
+    with _locked(_queue_lock_path()):
+        record = load_run(run_id)
+        if record is None or record['status'] not in ACTIVE_STATUSES:
+            return record
+        pid = record.get('pid')
+        record.update(status=CANCELLED, finished=time.time())
+        _save_run(record)
+    if record.get('started') and _is_alive(pid):
+        # worker is the leader of its session, so run.sh, papermill and kernels are terminated too,
+        # the worker itself is terminated as well and the record is finalized here
+        try:
+            os.killpg(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    return record
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == 'submit':
+        print(json.dumps(submit(sys.argv[2:]), indent=4))
+        sys.exit(0)
+    if len(sys.argv) == 3 and sys.argv[1] in ('status', 'cancel'):
+        run = load_run(sys.argv[2]) if sys.argv[1] == 'status' else cancel(sys.argv[2])
+        if run is None:
+            print(f'Run {sys.argv[2]} is not found')
+            sys.exit(1)
+        print(json.dumps(run, indent=4))
+        sys.exit(0)
+    if len(sys.argv) == 2 and sys.argv[1] == 'list':
+        print(f'max concurrent runs: {get_max_runs()}')
+        for run in list_runs():
+            print(f"{run['run_id']:<24}{run['status']:<12}{run['out_path']}")
+        sys.exit(0)
+    if len(sys.argv) == 3 and sys.argv[1] == 'execute':
+        sys.exit(execute(sys.argv[2]))
+    print('Usage: python run_manager.py submit [run.sh options] <COMPOSITE_FILE_PATH|NOTEBOOK_FILE_PATH>\n'
+          '       python run_manager.py status|cancel <run_id>\n'
+          '       python run_manager.py list')
+    sys.exit(1)
@@ -0,0 +1,70 @@
+"""
+Jupyter server extension, which lets users and API clients queue run.sh runs of the pod and get their statuses.
+Runs are executed by run_manager.py in their own workspaces 'out/<run-id>/' with limited concurrency.
+Loaded by installation/python/jupyter_server_config.py.
+
+    GET    /envchecker/runs            statuses of all runs
+    POST   /envchecker/runs            queues run, body: {"args": [<run.sh options and file path>]}
+    GET    /envchecker/runs/<run_id>   status of run
+    DELETE /envchecker/runs/<run_id>   cancels run
+"""
+import json
+
+from jupyter_server.base.handlers import APIHandler
+from jupyter_server.utils import url_path_join
+from tornado import web
+from tornado.ioloop import IOLoop
+
+import run_manager
+
+RUNS_PATH = 'envchecker/runs'
+
+
+def _run_in_executor(function, *args):
+    # status records are files of the state dir, they are read and written outside of IOLoop of the server
+    return IOLoop.current().run_in_executor(None, function, *args)
+
+
+class RunsHandler(APIHandler):
+    @web.authenticated
+    async def get(self):
+        runs = await _run_in_executor(run_manager.list_runs)
+        self.finish(json.dumps({'max_runs': run_manager.get_max_runs(), 'runs': runs}))
+
+    @web.authenticated
+    async def post(self):
+        args = (self.get_json_body() or {}).get('args')
+        if not args or not isinstance(args, list) or not all(isinstance(arg, str) for arg in args):
+            raise web.HTTPError(400, 'args must be a non-empty list of run.sh arguments')
+        run = await _run_in_executor(run_manager.submit, args)
+        self.set_status(201)
+        self.finish(json.dumps(run))
+
+
+class RunHandler(APIHandler):
+    def _get_run(self, run) -> dict:
+        if run is None:
+            raise web.HTTPError(404, 'Run is not found')
+        return run
+
+    @web.authenticated
+    async def get(self, run_id):
+        self.finish(json.dumps(self._get_run(await _run_in_executor(run_manager.load_run, run_id))))
+
+    @web.authenticated
+    async def delete(self, run_id):
+        self.finish(json.dumps(self._get_run(await _run_in_executor(run_manager.cancel, run_id))))
+
+
+def _jupyter_server_extension_points():
+    return [{'module': 'runs_extension'}]
+
+
+def _load_jupyter_server_extension(serverapp):
+    base_url = serverapp.web_app.settings['base_url']
+    serverapp.web_app.add_handlers('.*$', [
+        (url_path_join(base_url, RUNS_PATH), RunsHandler),
+        (url_path_join(base_url, RUNS_PATH, r'([\w.-]+)'), RunHandler),
+    ])
+    serverapp.log.info(f'Env-checker runs are served on /{RUNS_PATH}, '
+                       f'max concurrent runs: {run_manager.get_max_runs()}')
@@ -0,0 +1,230 @@
+import json
+import os
+import re
+import secrets
+import sys
+import time
+
+from datetime import datetime, timezone
+
+import requests
+import yaml
+
+import phase_timing
+
+# span ids of run and checks are assigned by run.sh and passed to notebook kernels in TRACEPARENT variable (W3C format)
+TRACEPARENT_ENV = 'TRACEPARENT'
+TRACEPARENT_PATTERN = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$')
+SPAN_ID = 'span_id'
+TRACE_FILE_NAME = 'traces.jsonl'
+DEFAULT_SERVICE_NAME = 'env-checker'
+SCOPE_NAME = 'env-checker.run.sh'
+EXPORT_TIMEOUT = 10
+
+SPAN_KIND_INTERNAL = 1
+STATUS_CODE_ERROR = 2
+MAX_SOURCE_LENGTH = 200
+
+
+def parse_traceparent(traceparent: str) -> tuple:
+    """
+    Returns trace id and span id of W3C traceparent header, (None, None) if it is invalid.
+    """
+    match = TRACEPARENT_PATTERN.match((traceparent or '').strip())
+    return match.groups() if match else (None, None)
+
+
+def new_span_id() -> str:
+    return secrets.token_hex(8)
+
+
+def _attribute_value(value) -> dict:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def make_span(trace_id: str, span_id: str, parent_span_id: str, name: str, start_ns: int, end_ns: int,
+              attributes: dict = None, error: str = None) -> dict:
+    """
+    Builds span in OTLP JSON encoding. Attributes with None values are skipped.
+    """
+    span = {
+        'traceId': trace_id,
+        'spanId': span_id,
+        'name': name,
+        'kind': SPAN_KIND_INTERNAL,
+        'startTimeUnixNano': str(int(start_ns)),
+        'endTimeUnixNano': str(int(max(start_ns, end_ns))),
+        'attributes': [{'key': key, 'value': _attribute_value(value)}
+                       for key, value in (attributes or {}).items() if value is not None],
+    }
+    if parent_span_id:
+        span['parentSpanId'] = parent_span_id
+    if error is not None:
+        span['status'] = {'code': STATUS_CODE_ERROR, 'message': error}
+    return span
+
+
+def _papermill_time_ns(value: str) -> int:
+    # papermill writes naive ISO timestamps in UTC
+    return int(datetime.fromisoformat(value.rstrip('Z')).replace(tzinfo=timezone.utc).timestamp() * 1e9)
+
+
+def get_cell_spans(executed_notebook_path: str, trace_id: str, parent_span_id: str) -> list[dict]:
+    """
+    Builds span per executed cell from papermill metadata of executed notebook.
+    """
+    try:
+        with open(executed_notebook_path, 'r') as f:
+            nb = json.load(f)
+    except (OSError, ValueError):
+        return []
+    spans = []
+    for index, cell in enumerate(nb.get('cells', [])):
+        papermill = cell.get('metadata', {}).get('papermill', {})
+        if cell.get('cell_type') != 'code' or not papermill.get('start_time') or not papermill.get('end_time'):
+            continue
+        source = ''.join(cell.get('source', ''))
+        first_line = source.strip().splitlines()[0][:MAX_SOURCE_LENGTH] if source.strip() else ''
+        spans.append(make_span(
+            trace_id, new_span_id(), parent_span_id, f'cell {index}',
+            _papermill_time_ns(papermill['start_time']), _papermill_time_ns(papermill['end_time']),
+            {'notebook.cell.index': index, 'notebook.cell.source': first_line,
+             'notebook.cell.tags': ','.join(cell.get('metadata', {}).get('tags', [])) or None},
+            'cell raised exception' if papermill.get('exception') else None
+        ))
+    return spans
+
+
+def get_check_spans(check: dict, trace_id: str, root_span_id: str) -> list[dict]:
+    """
+    Builds spans of check record of result.yaml: check span, its phases and cells of executed notebook.
+    Checks are timed by their phases, so '--phases=true' is required (it is enabled by '--tracing=true').
+    """
+    phases = [phase for phase in check.get(phase_timing.PHASES) or [] if phase.get('start') is not None]
+    if not check.get(SPAN_ID) or not phases:
+        return []
+    check_span_id = check[SPAN_ID]
+    start_ms = min(phase['start'] for phase in phases)
+    end_ms = max(phase['start'] + (phase.get('duration_ms') or 0) for phase in phases)
+    result = str(check.get('result'))
+    spans = [make_span(
+        trace_id, check_span_id, root_span_id, os.path.basename(check.get('path', 'check')),
+        start_ms * 1e6, end_ms * 1e6,
+        {'envchecker.check.path': check.get('path'), 'envchecker.check.result': result,
+         'envchecker.check.matrix': json.dumps(check['matrix']) if check.get('matrix') else None},
+        None if result == 'True' else f'check result is {result}'
+    )]
+    papermill = None
+    for phase in phases:
+        span_id = new_span_id()
+        exit_code = phase.get('exit_code')
+        spans.append(make_span(
+            trace_id, span_id, check_span_id, phase['phase'],
+            phase['start'] * 1e6, (phase['start'] + (phase.get('duration_ms') or 0)) * 1e6,
+            {'envchecker.phase.peak_rss_kb': phase.get('peak_rss_kb'),
+             'envchecker.phase.processes': phase.get('processes'), 'envchecker.phase.exit_code': exit_code},
+            f'exit code {exit_code}' if exit_code else None
+        ))
+        if phase['phase'] == 'papermill':
+            papermill = (span_id, phase)
+    if papermill:
+        span_id, phase = papermill
+        kernel_start = next((p for p in check.get(phase_timing.PHASES) or []
+                             if p.get('phase') == phase_timing.KERNEL_START_PHASE), None)
+        if kernel_start:
+            spans.append(make_span(trace_id, new_span_id(), span_id, kernel_start['phase'], phase['start'] * 1e6,
+                                   (phase['start'] + kernel_start['duration_ms']) * 1e6))
+        notebook = next((out for out in check.get('outs', []) if str(out).endswith('.ipynb')), None)
+        if notebook:
+            spans.extend(get_cell_spans(notebook, trace_id, span_id))
+    return spans
+
+
+def build_trace(result_file_path: str, traceparent: str, started_at_us: int, name: str = 'run.sh',
+                parent_span_id: str = None) -> dict:
+    """
+    Builds OTLP export request with spans of run: root span of run.sh invocation, checks, phases and cells.
+
+    Args:
+        result_file_path (str): path to result.yaml of run.
+        traceparent (str): traceparent of run, root span id is taken from it.
+        started_at_us (int): start of run in epoch microseconds.
+        name (str): name of root span.
+        parent_span_id (str): span id of caller (TRACEPARENT passed to run.sh), if run is a part of another trace.
+
+    Returns:
+        dict: ExportTraceServiceRequest in OTLP JSON encoding.
+    """
+    trace_id, root_span_id = parse_traceparent(traceparent)
+    if trace_id is None:
+        raise ValueError(f'Invalid traceparent: {traceparent}')
+    with open(result_file_path, 'r') as f:
+        result = yaml.safe_load(f) or {}
+    checks = result.get('checks') or []
+    spans = [make_span(trace_id, root_span_id, parent_span_id, name, started_at_us * 1e3, time.time_ns(),
+                       {'envchecker.out_path': os.path.dirname(result_file_path), 'envchecker.checks': len(checks)})]
+    for check in checks:
+        spans.extend(get_check_spans(check, trace_id, root_span_id))
+    return {'resourceSpans': [{
+        'resource': {'attributes': [{'key': 'service.name', 'value': _attribute_value(
+            os.getenv('OTEL_SERVICE_NAME') or DEFAULT_SERVICE_NAME)}]},
+        'scopeSpans': [{'scope': {'name': SCOPE_NAME}, 'spans': spans}]
+    }]}
+
+
+def get_otlp_endpoint() -> str:
+    endpoint = os.getenv('OTEL_EXPORTER_OTLP_TRACES_ENDPOINT')
+    if endpoint:
+        return endpoint
+    endpoint = os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT')
+    return endpoint.rstrip('/') + '/v1/traces' if endpoint else None
+
+
+def get_otlp_headers() -> dict:
+    headers = {'Content-Type': 'application/json'}
+    for pair in (os.getenv('OTEL_EXPORTER_OTLP_HEADERS') or '').split(','):
+        if '=' in pair:
+            key, value = pair.split('=', 1)
+            headers[key.strip()] = value.strip()
+    return headers
+
+
+def export_trace(trace: dict, trace_file_path: str, endpoint: str = None) -> bool:
+    """
+    Appends trace to JSON lines file (OTLP JSON, readable by 'otlpjsonfile' receiver of OpenTelemetry collector)
+    and sends it to OTLP/HTTP endpoint, if it is configured.
+
+    Returns:
+        bool: False if trace could not be sent to endpoint.
+    """
+    with open(trace_file_path, 'a') as f:
+        f.write(json.dumps(trace) + '\n')
+    if not endpoint:
+        return True
+    try:
+        response = requests.post(endpoint, data=json.dumps(trace), headers=get_otlp_headers(), timeout=EXPORT_TIMEOUT)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f'Cannot export trace to {endpoint}: {e}', file=sys.stderr)
+        return False
+    return True
+
+
+if __name__ == '__main__':
+    if len(sys.argv) in (5, 6) and sys.argv[1] == 'export':
+        result_file_path = sys.argv[2]
+        _, caller_span_id = parse_traceparent(sys.argv[5]) if len(sys.argv) == 6 else (None, None)
+        trace = build_trace(result_file_path, sys.argv[3], int(sys.argv[4]), parent_span_id=caller_span_id)
+        trace_file_path = os.path.join(os.path.dirname(result_file_path), TRACE_FILE_NAME)
+        exported = export_trace(trace, trace_file_path, get_otlp_endpoint())
+        spans = trace['resourceSpans'][0]['scopeSpans'][0]['spans']
+        print(f'trace {parse_traceparent(sys.argv[3])[0]}: {len(spans)} spans are written to {trace_file_path}')
+        sys.exit(0 if exported else 1)
+    print('Usage: python tracing.py export <result_file_path> <traceparent> <started_at_us> [<caller_traceparent>]')
+    sys.exit(1)